@@ -115,15 +115,29 @@ function DailyMoodQuestionnaire() {
                     headers: {
                         'Content-Type': 'application/json',
                     },
-                    body: JSON.stringify({ userId }),
-                    timeout: 60000 // 60 second timeout
+                    // Job mode: the server generates questions in the background and we poll for them
+                    body: JSON.stringify({ userId, mode: 'job' })
                 });
                 
                 if (!response.ok) {
                     throw new Error(`Failed to fetch questions: ${response.status}`);
                 }
                 
-                const data = await response.json();
+                let data = await response.json();
+                
+                const jobUrl = `http://localhost:5001${data.status_url}`;
+                const pollStarted = Date.now();
+                while (data.status === 'pending' || data.status === 'running') {
+                    if (Date.now() - pollStarted > 90000) {
+                        throw new Error('Timed out waiting for questions');
+                    }
+                    await new Promise(resolve => setTimeout(resolve, 1000));
+                    const jobResponse = await fetch(jobUrl);
+                    if (!jobResponse.ok) {
+                        throw new Error(`Failed to fetch questions: ${jobResponse.status}`);
+                    }
+                    data = await jobResponse.json();
+                }
                 console.log('Received data from server:', data);
                 
                 if (data.status !== 'success') {
@@ -11,6 +11,20 @@ from server.models.collection import Collection
 from server.models.review import Review
 from server.models.friend_request import FriendRequest
 from server.models.tag import Tag
+from server.models.location_tombstone import LocationTombstone
+from server.models.seed_checkpoint import SeedCheckpoint
+from server.models.mood_question_set import MoodQuestionSet
+from server.models.index_generation import IndexGeneration
+
+# Register model event hooks (aura materialization, review aggregates, delete tombstones)
+import server.utils.aura
+import server.utils.review_stats
+import server.utils.location_changes
+from server.commands import register_commands
+from server.utils.query_budget import init_query_budget
+from server.utils.response_cache import init_response_cache
+from server.utils.places_cache import init_places_cache
+from server.utils.background_jobs import init_job_queue
 
 # Import routes
 from server.routes.auth_routes import register_resources as register_auth_routes
@@ -27,6 +41,11 @@ def create_app(config_class=Config, instance_path=None):
     # Initialize extensions
     db.init_app(app)
     migrate.init_app(app, db)
+    register_commands(app)
+    init_query_budget(app)
+    init_response_cache(app)
+    init_places_cache(app)
+    init_job_queue(app)
     
     # Enhanced CORS configuration
     CORS(app, resources={r"/api/*": {"origins": "*", "allow_headers": ["Content-Type", "Authorization"]}})
@@ -0,0 +1,74 @@
+import time
+import click
+from flask.cli import AppGroup
+
+aura_cli = AppGroup('aura', help='Precompute and maintain location auras.')
+locations_cli = AppGroup('locations', help='Maintain derived location data.')
+mood_cli = AppGroup('mood', help='Daily mood questionnaire maintenance.')
+
+
+@aura_cli.command('materialize')
+@click.option('--batch-size', default=500, show_default=True, help='Locations updated per commit.')
+def materialize_command(batch_size):
+    """Fill aura columns for every location that doesn't have one yet."""
+    from server.utils.aura import materialize_missing_auras, materialize_missing_vectors
+
+    print("🎨 Materializing location auras...")
+    started = time.perf_counter()
+    total = materialize_missing_auras(batch_size=batch_size)
+    vectors = materialize_missing_vectors(batch_size=batch_size)
+    elapsed = time.perf_counter() - started
+    print(f"✅ Materialized {total} auras and {vectors} aura vectors in {elapsed:.2f}s")
+
+
+@aura_cli.command('rescore')
+@click.option('--chunk-size', default=200, show_default=True, help='Locations scored per worker task.')
+@click.option('--workers', default=None, type=int, help='Worker processes (defaults to CPU count, 1 runs inline).')
+def rescore_command(chunk_size, workers):
+    """Recompute review-based auras for every reviewed location."""
+    from server.utils.aura import rescore_auras
+
+    print("🔁 Rescoring location auras from reviews...")
+    started = time.perf_counter()
+    total = rescore_auras(chunk_size=chunk_size, workers=workers)
+    elapsed = time.perf_counter() - started
+    rate = total / elapsed if elapsed else 0
+    print(f"✅ Rescored {total} auras in {elapsed:.2f}s ({rate:.0f} locations/s)")
+
+
+@locations_cli.command('backfill-review-stats')
+def backfill_review_stats_command():
+    """Recompute review_count and avg_user_rating from the reviews table."""
+    from server.utils.review_stats import backfill_review_stats
+
+    print("📊 Backfilling location review stats...")
+    started = time.perf_counter()
+    total = backfill_review_stats()
+    elapsed = time.perf_counter() - started
+    print(f"✅ Updated {total} locations in {elapsed:.2f}s")
+
+
+@mood_cli.command('warm-pool')
+@click.option('--size', default=None, type=int, help='Question sets per color family (defaults to MOOD_POOL_SIZE).')
+@click.option('--date', 'day', default=None, type=click.DateTime(formats=['%Y-%m-%d']), help='Day to generate for (defaults to today).')
+def warm_pool_command(size, day):
+    """
+    Pre-generate the day's mood question sets for every aura color family.
+    Meant to run daily from cron, e.g. just after midnight.
+    """
+    from server.routes.openai.openai_routes import generate_mood_questions
+    from server.utils.mood_pool import MOOD_POOL_SIZE, warm_mood_pool
+
+    day = day.date() if day else None
+    print("🔮 Warming the daily mood question pool...")
+    started = time.perf_counter()
+    total = warm_mood_pool(generate_mood_questions, day=day, size=size or MOOD_POOL_SIZE)
+    elapsed = time.perf_counter() - started
+    print(f"✅ Generated {total} question sets in {elapsed:.2f}s")
+
+
+def register_commands(app):
+    """Attach the custom CLI groups to the app"""
+    app.cli.add_command(aura_cli)
+    app.cli.add_command(locations_cli)
+    app.cli.add_command(mood_cli)
@@ -6,4 +6,25 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev'
     basedir = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
     SQLALCHEMY_DATABASE_URI = f'sqlite:///{os.path.join(basedir, "instance", "app.db")}'
-    SQLALCHEMY_TRACK_MODIFICATIONS = False
\ No newline at end of file
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Per-endpoint SQL statement budgets (see server/utils/query_budget.py)
+    QUERY_BUDGET_ENABLED = os.environ.get('QUERY_BUDGET_ENABLED') == '1'
+    QUERY_BUDGET_STRICT = os.environ.get('QUERY_BUDGET_STRICT') == '1'
+
+    # Response cache for read-heavy GETs (see server/utils/response_cache.py)
+    # Backend is 'memory' (per process), 'redis' (needs the redis package) or 'none'
+    RESPONSE_CACHE_BACKEND = os.environ.get('RESPONSE_CACHE_BACKEND', 'memory')
+    RESPONSE_CACHE_REDIS_URL = os.environ.get('RESPONSE_CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 1024))
+    RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL', 300))
+
+    # On-disk cache of Google Places responses (see server/utils/places_cache.py)
+    PLACES_CACHE_ENABLED = os.environ.get('PLACES_CACHE_ENABLED', '1') == '1'
+    PLACES_CACHE_PATH = os.environ.get('PLACES_CACHE_PATH') or os.path.join(basedir, 'instance', 'places_cache.db')
+    PLACES_CACHE_SEARCH_TTL = int(os.environ.get('PLACES_CACHE_SEARCH_TTL', 86400))
+    PLACES_CACHE_DETAILS_TTL = int(os.environ.get('PLACES_CACHE_DETAILS_TTL', 604800))
+
+    # Background pool for slow OpenAI work (see server/utils/background_jobs.py)
+    BACKGROUND_JOB_WORKERS = int(os.environ.get('BACKGROUND_JOB_WORKERS', 4))
+    BACKGROUND_JOB_RESULT_TTL = int(os.environ.get('BACKGROUND_JOB_RESULT_TTL', 600))
@@ -1,7 +1,9 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_restful import Api
+from server.utils.etag import conditional_get
 
 db = SQLAlchemy()
 migrate = Migrate()
-api = Api() 
\ No newline at end of file
+# Every registered Resource answers conditional GETs (ETag / If-None-Match)
+api = Api(decorators=[conditional_get]) 
\ No newline at end of file
@@ -6,6 +6,17 @@ class FriendRequest(db.Model):
     Model for friend requests between users
     """
     __tablename__ = 'friend_requests'
+    __table_args__ = (
+        # Pending request lists filter on one side of the request plus status
+        db.Index('ix_friend_requests_receiver_status', 'receiver_id', 'status'),
+        db.Index('ix_friend_requests_sender_status', 'sender_id', 'status'),
+        # At most one pending request per direction; settles racing submissions
+        db.Index(
+            'uq_friend_requests_pending_pair', 'sender_id', 'receiver_id', unique=True,
+            sqlite_where=db.text("status = 'pending'"),
+            postgresql_where=db.text("status = 'pending'")
+        ),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     sender_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
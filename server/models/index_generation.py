@@ -0,0 +1,17 @@
+from datetime import datetime
+from server.extensions import db
+
+class IndexGeneration(db.Model):
+    """
+    Change counter for tables that processes mirror in memory (see
+    server/utils/index_generation.py). Bumped by writes that skip the
+    session hooks, such as CLI commands and the seeder.
+    """
+    __tablename__ = 'index_generations'
+
+    name = db.Column(db.String(50), primary_key=True)
+    generation = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<IndexGeneration {self.name} {self.generation}>'
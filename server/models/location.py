@@ -2,10 +2,19 @@ from server.extensions import db
 from server.models.location_tag import location_tags
 from datetime import datetime
 from sqlalchemy.orm import validates
+from server.utils.aura_colors import three_aura_colors
 import re
 
 class Location(db.Model):
     __tablename__ = 'locations'
+    __table_args__ = (
+        # Composite index so bounding-box radius prefilters can range-scan coordinates
+        db.Index('ix_locations_lat_lng', 'latitude', 'longitude'),
+        # Suggestion ranking sorts on rating then review count
+        db.Index('ix_locations_rating_review_count', 'rating', 'review_count'),
+        # Delta sync (/api/locations/changes) range-scans on updated_at
+        db.Index('ix_locations_updated_at', 'updated_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(255), nullable=False)
@@ -23,6 +32,10 @@ class Location(db.Model):
     user_ratings_total = db.Column(db.Integer, nullable=True)
     area = db.Column(db.String(100), nullable=True)
     
+    # Review aggregates, maintained by server/utils/review_stats.py
+    review_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    avg_user_rating = db.Column(db.Float, nullable=True)
+    
     # Direct aura fields for simpler access
     aura_name = db.Column(db.String(100), nullable=True)
     aura_color = db.Column(db.String(255), nullable=True)  # Store gradient CSS
@@ -30,12 +43,14 @@ class Location(db.Model):
     aura_color2 = db.Column(db.String(7), nullable=True)   # Second hex color
     aura_color3 = db.Column(db.String(7), nullable=True)   # Third hex color
     aura_shape = db.Column(db.String(50), nullable=True)   # Shape name: soft, pulse, flowing, sparkle
+    aura_vector = db.Column(db.LargeBinary, nullable=True)  # float32 colors + shape, see server/utils/aura_vectors.py
     
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Define the many-to-many relationship with tags (auras)
-    tags = db.relationship('Tag', secondary=location_tags, lazy='subquery',
+    # Plain lazy loading; endpoints that serialize tags opt in with selectinload
+    tags = db.relationship('Tag', secondary=location_tags, lazy='select',
                           back_populates='locations')
     
     # Define the one-to-many relationship with reviews
@@ -95,6 +110,19 @@ class Location(db.Model):
     def __repr__(self):
         return f'<Location {self.name} at {self.latitude},{self.longitude}>'
     
+    def to_summary_dict(self):
+        """Identifying fields and the materialized aura, without touching tags"""
+        return {
+            'id': self.id,
+            'name': self.name,
+            'place_type': self.place_type,
+            'area': self.area,
+            'address': self.address,
+            'aura_name': self.aura_name,
+            'aura_color': self.aura_color,
+            'aura_shape': self.aura_shape
+        }
+
     def to_dict(self):
         """Convert location to dictionary for API responses"""
         location_dict = {
@@ -111,6 +139,8 @@ class Location(db.Model):
             'price_level': self.price_level,
             'user_ratings_total': self.user_ratings_total,
             'area': self.area,
+            'review_count': self.review_count or 0,
+            'avg_user_rating': self.avg_user_rating,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
@@ -141,50 +171,14 @@ class Location(db.Model):
                 'shape': aura_tag.shape
             }
             
-            # Extract aura colors for frontend
+            # Extract aura colors for frontend (a missing third color is a blend of the first two)
             if aura_tag.color and 'gradient' in aura_tag.color:
-                # Extract hex colors from gradient string
-                color_matches = re.findall(r'#[0-9A-Fa-f]{6}|#[0-9A-Fa-f]{3}', aura_tag.color)
-                if len(color_matches) >= 3:
-                    location_dict['aura_color1'] = color_matches[0]
-                    location_dict['aura_color2'] = color_matches[1]
-                    location_dict['aura_color3'] = color_matches[2]
-                elif len(color_matches) >= 2:
-                    location_dict['aura_color1'] = color_matches[0]
-                    location_dict['aura_color2'] = color_matches[1]
-                    # Generate a third color that's a blend of the first two
-                    location_dict['aura_color3'] = self._blend_colors(color_matches[0], color_matches[1])
-                elif len(color_matches) == 1:
-                    location_dict['aura_color1'] = color_matches[0]
-                    location_dict['aura_color2'] = color_matches[0]
-                    location_dict['aura_color3'] = color_matches[0]
+                colors = three_aura_colors(aura_tag.color, blend=True)
+                if colors:
+                    location_dict['aura_color1'], location_dict['aura_color2'], location_dict['aura_color3'] = colors
             
             # Always set raw aura_color
             location_dict['aura_color'] = aura_tag.color
         
         return location_dict
-    
-    def _blend_colors(self, color1, color2):
-        """Helper method to blend two hex colors"""
-        # Remove # if present
-        color1 = color1.replace('#', '')
-        color2 = color2.replace('#', '')
-        
-        # Handle both 3-digit and 6-digit formats
-        if len(color1) == 3:
-            color1 = ''.join([c*2 for c in color1])
-        if len(color2) == 3:
-            color2 = ''.join([c*2 for c in color2])
-        
-        # Convert to RGB
-        r1, g1, b1 = int(color1[0:2], 16), int(color1[2:4], 16), int(color1[4:6], 16)
-        r2, g2, b2 = int(color2[0:2], 16), int(color2[2:4], 16), int(color2[4:6], 16)
-        
-        # Calculate average
-        r = (r1 + r2) // 2
-        g = (g1 + g2) // 2
-        b = (b1 + b2) // 2
-        
-        # Convert back to hex
-        return f'#{r:02x}{g:02x}{b:02x}'
    
\ No newline at end of file
@@ -0,0 +1,16 @@
+from datetime import datetime
+from server.extensions import db
+
+class LocationTombstone(db.Model):
+    """
+    Record of a deleted location, so delta-sync clients
+    (/api/locations/changes) can drop it from their local copy
+    """
+    __tablename__ = 'location_tombstones'
+
+    id = db.Column(db.Integer, primary_key=True)
+    location_id = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'<LocationTombstone {self.location_id} deleted at {self.deleted_at}>'
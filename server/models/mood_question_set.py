@@ -0,0 +1,35 @@
+import json
+from datetime import datetime
+from server.extensions import db
+from sqlalchemy import ForeignKey
+from . import BaseModel
+
+# Which pooled question sets each user has already been served
+mood_question_deliveries = db.Table('mood_question_deliveries',
+    db.Column('user_id', db.Integer, ForeignKey('users.id'), primary_key=True),
+    db.Column('question_set_id', db.Integer, ForeignKey('mood_question_sets.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('delivered_at', db.DateTime, default=datetime.utcnow),
+    extend_existing=True
+)
+
+
+class MoodQuestionSet(BaseModel):
+    """
+    One generated set of daily mood questions, pooled per day and aura color
+    family (see server/utils/mood_pool.py)
+    """
+    __tablename__ = 'mood_question_sets'
+    __table_args__ = (
+        db.Index('ix_mood_question_sets_day_family', 'day', 'color_family'),
+    )
+
+    day = db.Column(db.Date, nullable=False)
+    color_family = db.Column(db.String(20), nullable=False)
+    questions_json = db.Column(db.Text, nullable=False)
+
+    @property
+    def questions(self):
+        return json.loads(self.questions_json)
+
+    def __repr__(self):
+        return f'<MoodQuestionSet {self.day} {self.color_family}>'
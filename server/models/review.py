@@ -11,7 +11,8 @@ class Review(BaseModel):
     body = db.Column(db.String(1000), nullable=False)
     rating = db.Column(db.Integer, nullable=False)
     user_id = db.Column(db.Integer, ForeignKey('users.id'))
-    location_id = db.Column(db.Integer, ForeignKey('locations.id'))
+    # Indexed for the per-location aggregates and the rescore EXISTS check
+    location_id = db.Column(db.Integer, ForeignKey('locations.id'), index=True)
 
     user = db.relationship('User', back_populates='reviews')
     location = db.relationship('Location', back_populates='reviews')
@@ -40,8 +41,18 @@ class Review(BaseModel):
             raise ValueError(f'{key} cannot be empty')
         return value
 
-    def to_dict(self):
-        """Convert review to dictionary for JSON response"""
+    def to_dict(self, location_detail=True):
+        """
+        Convert review to dictionary for JSON response. With `location_detail`
+        off the location is only summarized (see Location.to_summary_dict).
+        """
+        if self.location is None:
+            location_dict = None
+        elif location_detail:
+            location_dict = self.location.to_dict()
+        else:
+            location_dict = self.location.to_summary_dict()
+
         return {
             'id': self.id,
             'body': self.body,
@@ -50,6 +61,7 @@ class Review(BaseModel):
             'location_id': self.location_id,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            'user': self.user.to_dict() if self.user else None,
-            'location': self.location.to_dict() if self.location else None
+            # Only a summary of the author; User.to_dict embeds reviews and would recurse
+            'user': {'id': self.user.id, 'username': self.user.username} if self.user else None,
+            'location': location_dict
         }
@@ -0,0 +1,21 @@
+from datetime import datetime
+from server.extensions import db
+
+class SeedCheckpoint(db.Model):
+    """
+    A finished (area, place_type) search of the Google Places seeder, so a
+    restarted seed can skip it
+    """
+    __tablename__ = 'seed_checkpoints'
+    __table_args__ = (
+        db.UniqueConstraint('area', 'place_type', name='uq_seed_checkpoints_area_place_type'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    area = db.Column(db.String(100), nullable=False)
+    place_type = db.Column(db.String(100), nullable=False)
+    locations_added = db.Column(db.Integer, nullable=False, default=0)
+    completed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<SeedCheckpoint {self.area} / {self.place_type}>'
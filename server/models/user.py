@@ -2,7 +2,8 @@ from server.extensions import db
 from . import BaseModel
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
-from sqlalchemy.orm import validates
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import selectinload, validates
 import re
 
 # Define the friendship association table
@@ -83,57 +84,85 @@ class User(BaseModel):
     def check_password(self, password):
         return check_password_hash(self.hashed_password, password)
     
+    def friendship_links(self, user):
+        """
+        The (user_id, friend_id) rows linking the two users, in either
+        direction. One primary key lookup, rather than loading the whole
+        dynamic friends list for each membership check.
+        """
+        rows = db.session.execute(
+            select(friendships.c.user_id, friendships.c.friend_id).where(or_(
+                and_(friendships.c.user_id == self.id, friendships.c.friend_id == user.id),
+                and_(friendships.c.user_id == user.id, friendships.c.friend_id == self.id)
+            ))
+        ).all()
+        return {tuple(row) for row in rows}
+
     def add_friend(self, user):
         """Add a user to friends list"""
-        if user not in self.friends:
-            self.friends.append(user)
-            # Ensure the relationship is bidirectional
-            if self not in user.friends:
-                user.friends.append(self)
-            return True
-        return False
+        links = self.friendship_links(user)
+        if (self.id, user.id) in links:
+            return False
+        self.friends.append(user)
+        # Ensure the relationship is bidirectional
+        if (user.id, self.id) not in links:
+            user.friends.append(self)
+        return True
     
     def remove_friend(self, user):
         """Remove a user from friends list"""
-        if user in self.friends:
-            self.friends.remove(user)
-            # Ensure the relationship is bidirectional
-            if self in user.friends:
-                user.friends.remove(self)
-            return True
-        return False
+        links = self.friendship_links(user)
+        if (self.id, user.id) not in links:
+            return False
+        self.friends.remove(user)
+        # Ensure the relationship is bidirectional
+        if (user.id, self.id) in links:
+            user.friends.remove(self)
+        return True
 
-    def to_dict(self):
-        """Convert user to dictionary for JSON response"""
-        try:
-            user_dict = {
-                'id': self.id,
-                'username': self.username,
-                'email': self.email,
-                'aura_color': self.aura_color or None,
-                'aura_shape': self.aura_shape or None,
-                'response_speed': self.response_speed or None,
-                'aura_color1': self.aura_color1 or None,
-                'aura_color2': self.aura_color2 or None,
-                'aura_color3': self.aura_color3 or None,
-                'created_at': self.created_at.isoformat() if self.created_at else None,
-                'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-                'reviews': [review.to_dict() for review in self.reviews] if self.reviews else [],
-                'collections': [collection.to_dict() for collection in self.collections] if self.collections else []
-            }
-            # Make sure the ID is included as a string for consistent handling
-            user_dict['id_str'] = str(self.id)
-            return user_dict
-        except Exception as e:
-            print(f"Error in to_dict: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            # Return a minimal dictionary with just the essential fields
-            return {
-                'id': self.id,
-                'username': self.username,
-                'email': self.email,
-                'id_str': str(self.id)
-            }
+    @classmethod
+    def profile_query(cls):
+        """
+        User query that loads everything to_dict() embeds up front: reviews
+        joined to their locations, and collections with their location ids,
+        so a profile costs the same handful of statements at any size.
+        """
+        from server.models.collection import Collection
+        from server.models.location import Location
+        from server.models.review import Review
 
-    
+        return cls.query.options(
+            selectinload(cls.reviews).joinedload(Review.location),
+            selectinload(cls.collections).selectinload(Collection.locations).load_only(Location.id)
+        )
+
+    def to_summary_dict(self):
+        """
+        The user's own columns only. Login, signup and aura updates return
+        this, so the response stays the same size however much the user has.
+        """
+        return {
+            'id': self.id,
+            'id_str': str(self.id),
+            'username': self.username,
+            'email': self.email,
+            'aura_color': self.aura_color or None,
+            'aura_shape': self.aura_shape or None,
+            'response_speed': self.response_speed or None,
+            'aura_color1': self.aura_color1 or None,
+            'aura_color2': self.aura_color2 or None,
+            'aura_color3': self.aura_color3 or None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+    def to_dict(self):
+        """
+        Profile: the summary plus one level of related rows. Reviews carry a
+        location summary and collections only their location count; nothing
+        embeds a user again. Load the user with profile_query() first.
+        """
+        user_dict = self.to_summary_dict()
+        user_dict['reviews'] = [review.to_dict(location_detail=False) for review in self.reviews]
+        user_dict['collections'] = [collection.to_dict() for collection in self.collections]
+        return user_dict
@@ -15,6 +15,7 @@ from .auth_routes import register_resources as register_auth_routes
 from .user_routes import register_resources as register_user_routes
 from .discover_routes import register_resources as register_discover_routes
 from .collection_routes import register_resources as register_collection_routes
+from .review_routes import register_resources as register_review_routes
 from .friend_routes import initialize_routes as register_friend_routes
 from .openai.openai_routes import register_resources as register_openai_routes
 
@@ -25,6 +26,7 @@ def init_app(app):
     register_user_routes(api)
     register_discover_routes(api)
     register_collection_routes(api)
+    register_review_routes(api)
     register_friend_routes(api)
     register_openai_routes(api)
     
@@ -32,8 +34,9 @@ def init_app(app):
     # Add them here if needed
     
     # Manually register location routes
-    from .location_routes import LocationList, LocationById, LocationAura, FetchNearbyLocations
+    from .location_routes import LocationList, LocationChanges, LocationById, LocationAura, FetchNearbyLocations
     api.add_resource(LocationList, '/api/locations')
+    api.add_resource(LocationChanges, '/api/locations/changes')
     api.add_resource(LocationById, '/api/locations/<int:location_id>')
     api.add_resource(LocationAura, '/api/locations/<int:location_id>/aura')
     api.add_resource(FetchNearbyLocations, '/api/fetch-nearby-locations')
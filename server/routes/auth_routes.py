@@ -23,7 +23,7 @@ class SignUp(Resource):
         db.session.add(user)
         db.session.commit()
         
-        user_dict = user.to_dict()
+        user_dict = user.to_summary_dict()
         print(f"New user created: {user.id} - {user.username}")
         print(f"User data returned: {user_dict}")
         return user_dict, 201
@@ -34,7 +34,7 @@ class Login(Resource):
         user = User.query.filter_by(email=data['email']).first()
         
         if user and user.check_password(data['password']):
-            user_dict = user.to_dict()
+            user_dict = user.to_summary_dict()
             print(f"User logged in: {user.id} - {user.username}")
             print(f"User data returned: {user_dict}")
             return user_dict, 200
@@ -1,63 +1,87 @@
 from flask import request, jsonify
 from flask_restful import Resource
 from server.extensions import api
-from server.models.collection import Collection
+from server.models.collection import Collection, collection_locations
 from server.models.location import Location
 from server.extensions import db
+from sqlalchemy import insert
+from sqlalchemy.orm import selectinload
+from server.utils.aura_colors import parse_aura_colors
+from server.utils.response_cache import cached_response
+
+# Collections serialized with their locations need both relationships;
+# load them in two batched queries instead of one lazy load per row
+COLLECTION_WITH_LOCATIONS = selectinload(Collection.locations).selectinload(Location.tags)
+
+# Tables a serialized collection (with its locations and their auras) is built from
+COLLECTION_TABLES = ('collections', 'collection_locations', 'locations', 'tags', 'location_tags')
+
+AURA_COLOR_KEYS = ('aura_color1', 'aura_color2', 'aura_color3')
+
+
+def add_aura_colors(collection_data, stops=3):
+    """
+    Set aura_color1..N on each serialized location from its aura gradient,
+    and give the collection the first location's colors. `stops` is how
+    many color fields to fill; a missing third color repeats the second.
+    """
+    locations = collection_data['locations']
+    if not locations:
+        return collection_data
+    keys = AURA_COLOR_KEYS[:stops]
+    first_location = locations[0]
+    
+    for i, location in enumerate(locations):
+        aura = location.get('aura')
+        if not aura:
+            continue
+        
+        color = aura.get('color')
+        if color and 'gradient' in color:
+            colors = parse_aura_colors(color)
+            if len(colors) >= 2:
+                values = (colors[0], colors[1], colors[2] if len(colors) >= 3 else colors[1])
+                location.update(zip(keys, values))
+                
+                # The first location's aura doubles as the collection's
+                if i == 0:
+                    collection_data.update(zip(keys, values))
+                    collection_data['aura_color'] = color
+        
+        # Set raw aura color for fallback
+        location['aura_color'] = aura.get('color', '')
+    
+    # If the first location's aura object had no usable gradient, fall back to its own color fields
+    if first_location.get('aura_color1') and first_location.get('aura_color2') and not collection_data.get('aura_color1'):
+        collection_data['aura_color1'] = first_location['aura_color1']
+        collection_data['aura_color2'] = first_location['aura_color2']
+        if stops == 3:
+            collection_data['aura_color3'] = first_location.get('aura_color3', first_location['aura_color2'])
+    
+    if first_location.get('aura_color') and not collection_data.get('aura_color'):
+        collection_data['aura_color'] = first_location['aura_color']
+    
+    return collection_data
 
 
 class CollectionByID(Resource):
     
+    @cached_response(*COLLECTION_TABLES)
     def get(self, user_id, collection_id=None):
         # If collection_id is provided, return that specific collection with its locations
         if collection_id:
-            collection = Collection.query.filter_by(id=collection_id, user_id=user_id).first_or_404()
+            collection = Collection.query.options(COLLECTION_WITH_LOCATIONS).filter_by(id=collection_id, user_id=user_id).first_or_404()
             
             # Get the collection data with locations
             collection_data = collection.to_dict(include_locations=True)
             
-            # Enhanced location data with aura colors for frontend display
-            if collection_data['locations']:
-                # Add the first location's aura to the collection itself
-                first_location = collection_data['locations'][0]
-                
-                # Process all locations
-                for i, location in enumerate(collection_data['locations']):
-                    # Check if location has aura data in the aura object
-                    if 'aura' in location and location['aura']:
-                        aura = location['aura']
-                        
-                        # If aura has a color field that includes a gradient
-                        if 'color' in aura and aura['color'] and 'gradient' in aura['color']:
-                            # Extract hex colors from gradient
-                            import re
-                            color_matches = re.findall(r'#[0-9A-Fa-f]{6}|#[0-9A-Fa-f]{3}', aura['color'])
-                            if len(color_matches) >= 2:
-                                collection_data['locations'][i]['aura_color1'] = color_matches[0]
-                                collection_data['locations'][i]['aura_color2'] = color_matches[1]
-                                
-                                # If this is the first location, also set it on the collection
-                                if i == 0:
-                                    collection_data['aura_color1'] = color_matches[0]
-                                    collection_data['aura_color2'] = color_matches[1]
-                                    collection_data['aura_color'] = aura.get('color', '')
-                        
-                        # Set raw aura color for fallback
-                        collection_data['locations'][i]['aura_color'] = aura.get('color', '')
-                        
-                # If we didn't get aura colors from the first location's aura object, 
-                # check if the first location itself has the aura colors set
-                if first_location.get('aura_color1') and first_location.get('aura_color2') and not collection_data.get('aura_color1'):
-                    collection_data['aura_color1'] = first_location['aura_color1']
-                    collection_data['aura_color2'] = first_location['aura_color2']
-                
-                if first_location.get('aura_color') and not collection_data.get('aura_color'):
-                    collection_data['aura_color'] = first_location['aura_color']
+            # Copy each location's aura colors onto it, and the first one's onto the collection
+            add_aura_colors(collection_data, stops=2)
             
             return collection_data, 200
         
         # Otherwise return all collections for the user without locations
-        collections = Collection.query.filter_by(user_id=user_id).all()
+        collections = Collection.query.options(COLLECTION_WITH_LOCATIONS).filter_by(user_id=user_id).all()
         
         # Add locations to each collection to get the aura
         collections_data = []
@@ -75,8 +99,7 @@ class CollectionByID(Resource):
                     # If aura has a color field that includes a gradient
                     if 'color' in aura and aura['color'] and 'gradient' in aura['color']:
                         # Extract hex colors from gradient
-                        import re
-                        color_matches = re.findall(r'#[0-9A-Fa-f]{6}|#[0-9A-Fa-f]{3}', aura['color'])
+                        color_matches = parse_aura_colors(aura['color'])
                         if len(color_matches) >= 2:
                             collection_data['aura_color1'] = color_matches[0]
                             collection_data['aura_color2'] = color_matches[1]
@@ -154,42 +177,8 @@ class CollectionByID(Resource):
                     # Return the updated collection with locations and aura info
                     collection_data = collection.to_dict(include_locations=True)
                     
-                    # Add the first location's aura to the collection if available
-                    if collection_data['locations']:
-                        first_location = collection_data['locations'][0]
-                        
-                        # Process all locations
-                        for i, location in enumerate(collection_data['locations']):
-                            # Check if location has aura data in the aura object
-                            if 'aura' in location and location['aura']:
-                                aura = location['aura']
-                                
-                                # If aura has a color field that includes a gradient
-                                if 'color' in aura and aura['color'] and 'gradient' in aura['color']:
-                                    # Extract hex colors from gradient
-                                    import re
-                                    color_matches = re.findall(r'#[0-9A-Fa-f]{6}|#[0-9A-Fa-f]{3}', aura['color'])
-                                    if len(color_matches) >= 2:
-                                        collection_data['locations'][i]['aura_color1'] = color_matches[0]
-                                        collection_data['locations'][i]['aura_color2'] = color_matches[1]
-                                        
-                                        # If this is the first location, also set it on the collection
-                                        if i == 0:
-                                            collection_data['aura_color1'] = color_matches[0]
-                                            collection_data['aura_color2'] = color_matches[1]
-                                            collection_data['aura_color'] = aura.get('color', '')
-                                
-                                # Set raw aura color for fallback
-                                collection_data['locations'][i]['aura_color'] = aura.get('color', '')
-                        
-                        # If we didn't get aura colors from the first location's aura object, 
-                        # check if the first location itself has the aura colors set
-                        if first_location.get('aura_color1') and first_location.get('aura_color2') and not collection_data.get('aura_color1'):
-                            collection_data['aura_color1'] = first_location['aura_color1']
-                            collection_data['aura_color2'] = first_location['aura_color2']
-                        
-                        if first_location.get('aura_color') and not collection_data.get('aura_color'):
-                            collection_data['aura_color'] = first_location['aura_color']
+                    # Copy each location's aura colors onto it, and the first one's onto the collection
+                    add_aura_colors(collection_data, stops=2)
                     
                     return collection_data, 200
                 else:
@@ -236,56 +225,8 @@ class CollectionAddLocation(Resource):
         # Get the updated collection with locations
         collection_data = collection.to_dict(include_locations=True)
         
-        # Add the first location's aura to the collection if available
-        if collection_data['locations']:
-            first_location = collection_data['locations'][0]
-            
-            # Process all locations
-            for i, location in enumerate(collection_data['locations']):
-                # Check if location has aura data in the aura object
-                if 'aura' in location and location['aura']:
-                    aura = location['aura']
-                    
-                    # If aura has a color field that includes a gradient
-                    if 'color' in aura and aura['color'] and 'gradient' in aura['color']:
-                        # Extract hex colors from gradient
-                        import re
-                        color_matches = re.findall(r'#[0-9A-Fa-f]{6}|#[0-9A-Fa-f]{3}', aura['color'])
-                        if len(color_matches) >= 3:
-                            collection_data['locations'][i]['aura_color1'] = color_matches[0]
-                            collection_data['locations'][i]['aura_color2'] = color_matches[1]
-                            collection_data['locations'][i]['aura_color3'] = color_matches[2]
-                            
-                            # If this is the first location, also set it on the collection
-                            if i == 0:
-                                collection_data['aura_color1'] = color_matches[0]
-                                collection_data['aura_color2'] = color_matches[1]
-                                collection_data['aura_color3'] = color_matches[2]
-                                collection_data['aura_color'] = aura.get('color', '')
-                        elif len(color_matches) >= 2:
-                            collection_data['locations'][i]['aura_color1'] = color_matches[0]
-                            collection_data['locations'][i]['aura_color2'] = color_matches[1]
-                            collection_data['locations'][i]['aura_color3'] = color_matches[1]  # Duplicate the second color as fallback
-                            
-                            # If this is the first location, also set it on the collection
-                            if i == 0:
-                                collection_data['aura_color1'] = color_matches[0]
-                                collection_data['aura_color2'] = color_matches[1]
-                                collection_data['aura_color3'] = color_matches[1]  # Duplicate the second color as fallback
-                                collection_data['aura_color'] = aura.get('color', '')
-                    
-                    # Set raw aura color for fallback
-                    collection_data['locations'][i]['aura_color'] = aura.get('color', '')
-            
-            # If we didn't get aura colors from the first location's aura object, 
-            # check if the first location itself has the aura colors set
-            if first_location.get('aura_color1') and first_location.get('aura_color2') and not collection_data.get('aura_color1'):
-                collection_data['aura_color1'] = first_location['aura_color1']
-                collection_data['aura_color2'] = first_location['aura_color2']
-                collection_data['aura_color3'] = first_location.get('aura_color3', first_location['aura_color2'])  # Use aura_color3 if available, otherwise fallback to color2
-            
-            if first_location.get('aura_color') and not collection_data.get('aura_color'):
-                collection_data['aura_color'] = first_location['aura_color']
+        # Copy each location's aura colors onto it, and the first one's onto the collection
+        add_aura_colors(collection_data)
         
         return collection_data, 200
 
@@ -314,119 +255,23 @@ class CollectionRemoveLocation(Resource):
         # Return the updated collection with locations
         collection_data = collection.to_dict(include_locations=True)
         
-        # Add the first location's aura to the collection if available
-        if collection_data['locations']:
-            first_location = collection_data['locations'][0]
-            
-            # Process all locations
-            for i, location in enumerate(collection_data['locations']):
-                # Check if location has aura data in the aura object
-                if 'aura' in location and location['aura']:
-                    aura = location['aura']
-                    
-                    # If aura has a color field that includes a gradient
-                    if 'color' in aura and aura['color'] and 'gradient' in aura['color']:
-                        # Extract hex colors from gradient
-                        import re
-                        color_matches = re.findall(r'#[0-9A-Fa-f]{6}|#[0-9A-Fa-f]{3}', aura['color'])
-                        if len(color_matches) >= 3:
-                            collection_data['locations'][i]['aura_color1'] = color_matches[0]
-                            collection_data['locations'][i]['aura_color2'] = color_matches[1]
-                            collection_data['locations'][i]['aura_color3'] = color_matches[2]
-                            
-                            # If this is the first location, also set it on the collection
-                            if i == 0:
-                                collection_data['aura_color1'] = color_matches[0]
-                                collection_data['aura_color2'] = color_matches[1]
-                                collection_data['aura_color3'] = color_matches[2]
-                                collection_data['aura_color'] = aura.get('color', '')
-                        elif len(color_matches) >= 2:
-                            collection_data['locations'][i]['aura_color1'] = color_matches[0]
-                            collection_data['locations'][i]['aura_color2'] = color_matches[1]
-                            collection_data['locations'][i]['aura_color3'] = color_matches[1]  # Duplicate the second color as fallback
-                            
-                            # If this is the first location, also set it on the collection
-                            if i == 0:
-                                collection_data['aura_color1'] = color_matches[0]
-                                collection_data['aura_color2'] = color_matches[1]
-                                collection_data['aura_color3'] = color_matches[1]  # Duplicate the second color as fallback
-                                collection_data['aura_color'] = aura.get('color', '')
-                    
-                    # Set raw aura color for fallback
-                    collection_data['locations'][i]['aura_color'] = aura.get('color', '')
-            
-            # If we didn't get aura colors from the first location's aura object, 
-            # check if the first location itself has the aura colors set
-            if first_location.get('aura_color1') and first_location.get('aura_color2') and not collection_data.get('aura_color1'):
-                collection_data['aura_color1'] = first_location['aura_color1']
-                collection_data['aura_color2'] = first_location['aura_color2']
-                collection_data['aura_color3'] = first_location.get('aura_color3', first_location['aura_color2'])  # Use aura_color3 if available, otherwise fallback to color2
-            
-            if first_location.get('aura_color') and not collection_data.get('aura_color'):
-                collection_data['aura_color'] = first_location['aura_color']
+        # Copy each location's aura colors onto it, and the first one's onto the collection
+        add_aura_colors(collection_data)
         
         return collection_data, 200
 
 class SingleCollection(Resource):
     """Resource for fetching a single collection with all its locations"""
     
+    @cached_response(*COLLECTION_TABLES)
     def get(self, collection_id):
-        collection = Collection.query.get_or_404(collection_id)
+        collection = Collection.query.options(COLLECTION_WITH_LOCATIONS).get_or_404(collection_id)
         
         # Get the collection data with locations
         collection_data = collection.to_dict(include_locations=True)
         
-        # Enhanced location data with aura colors for frontend display
-        if collection_data['locations']:
-            # Add the first location's aura to the collection itself
-            first_location = collection_data['locations'][0]
-            
-            # Process all locations
-            for i, location in enumerate(collection_data['locations']):
-                # Check if location has aura data in the aura object
-                if 'aura' in location and location['aura']:
-                    aura = location['aura']
-                    
-                    # If aura has a color field that includes a gradient
-                    if 'color' in aura and aura['color'] and 'gradient' in aura['color']:
-                        # Extract hex colors from gradient
-                        import re
-                        color_matches = re.findall(r'#[0-9A-Fa-f]{6}|#[0-9A-Fa-f]{3}', aura['color'])
-                        if len(color_matches) >= 3:
-                            collection_data['locations'][i]['aura_color1'] = color_matches[0]
-                            collection_data['locations'][i]['aura_color2'] = color_matches[1]
-                            collection_data['locations'][i]['aura_color3'] = color_matches[2]
-                            
-                            # If this is the first location, also set it on the collection
-                            if i == 0:
-                                collection_data['aura_color1'] = color_matches[0]
-                                collection_data['aura_color2'] = color_matches[1]
-                                collection_data['aura_color3'] = color_matches[2]
-                                collection_data['aura_color'] = aura.get('color', '')
-                        elif len(color_matches) >= 2:
-                            collection_data['locations'][i]['aura_color1'] = color_matches[0]
-                            collection_data['locations'][i]['aura_color2'] = color_matches[1]
-                            collection_data['locations'][i]['aura_color3'] = color_matches[1]  # Duplicate the second color as fallback
-                            
-                            # If this is the first location, also set it on the collection
-                            if i == 0:
-                                collection_data['aura_color1'] = color_matches[0]
-                                collection_data['aura_color2'] = color_matches[1]
-                                collection_data['aura_color3'] = color_matches[1]  # Duplicate the second color as fallback
-                                collection_data['aura_color'] = aura.get('color', '')
-                    
-                    # Set raw aura color for fallback
-                    collection_data['locations'][i]['aura_color'] = aura.get('color', '')
-            
-            # If we didn't get aura colors from the first location's aura object, 
-            # check if the first location itself has the aura colors set
-            if first_location.get('aura_color1') and first_location.get('aura_color2') and not collection_data.get('aura_color1'):
-                collection_data['aura_color1'] = first_location['aura_color1']
-                collection_data['aura_color2'] = first_location['aura_color2']
-                collection_data['aura_color3'] = first_location.get('aura_color3', first_location['aura_color2'])  # Use aura_color3 if available, otherwise fallback to color2
-            
-            if first_location.get('aura_color') and not collection_data.get('aura_color'):
-                collection_data['aura_color'] = first_location['aura_color']
+        # Copy each location's aura colors onto it, and the first one's onto the collection
+        add_aura_colors(collection_data)
         
         return collection_data, 200
 
@@ -494,15 +339,10 @@ class CopyCollection(Resource):
                 if existing_loc:
                     print(f"Location {loc.name} already exists, adding to collection")
                     # If the location exists, just add it to the new collection
-                    from sqlalchemy import text
-                    insert_query = text("""
-                        INSERT INTO collection_locations (collection_id, location_id)
-                        VALUES (:collection_id, :location_id)
-                    """)
-                    db.session.execute(insert_query, {
-                        "collection_id": new_collection.id,
-                        "location_id": existing_loc.id
-                    })
+                    db.session.execute(collection_locations.insert().values(
+                        collection_id=new_collection.id,
+                        location_id=existing_loc.id
+                    ))
                 else:
                     print(f"Creating new location {loc.name}")
                     
@@ -539,44 +379,29 @@ class CopyCollection(Resource):
                         print(f"Created new location with ID: {new_loc.id}")
                         
                         # Link the new location to the collection
-                        link_query = text("""
-                            INSERT INTO collection_locations (collection_id, location_id)
-                            VALUES (:collection_id, :location_id)
-                        """)
-                        db.session.execute(link_query, {
-                            "collection_id": new_collection.id,
-                            "location_id": new_loc.id
-                        })
+                        db.session.execute(collection_locations.insert().values(
+                            collection_id=new_collection.id,
+                            location_id=new_loc.id
+                        ))
                     except Exception as loc_error:
                         print(f"Error creating location: {str(loc_error)}")
                         print(f"Will try raw SQL approach instead")
                         
                         # Fall back to raw SQL approach
-                        insert_query = text("""
-                            INSERT INTO locations (
-                                name, latitude, longitude, aura_color, aura_shape
-                            ) VALUES (
-                                :name, :latitude, :longitude, :aura_color, :aura_shape
-                            ) RETURNING id
-                        """)
-                        result = db.session.execute(insert_query, {
-                            "name": loc.name,
-                            "latitude": 0.0 if loc.latitude is None else float(loc.latitude),
-                            "longitude": 0.0 if loc.longitude is None else float(loc.longitude),
-                            "aura_color": loc.aura_color if hasattr(loc, 'aura_color') else None,
-                            "aura_shape": loc.aura_shape if hasattr(loc, 'aura_shape') else None
-                        })
-                        new_loc_id = result.fetchone()[0]
+                        insert_query = insert(Location).values(
+                            name=loc.name,
+                            latitude=0.0 if loc.latitude is None else float(loc.latitude),
+                            longitude=0.0 if loc.longitude is None else float(loc.longitude),
+                            aura_color=loc.aura_color if hasattr(loc, 'aura_color') else None,
+                            aura_shape=loc.aura_shape if hasattr(loc, 'aura_shape') else None
+                        ).returning(Location.id)
+                        new_loc_id = db.session.execute(insert_query).scalar_one()
                         
                         # Link the location to the collection
-                        link_query = text("""
-                            INSERT INTO collection_locations (collection_id, location_id)
-                            VALUES (:collection_id, :location_id)
-                        """)
-                        db.session.execute(link_query, {
-                            "collection_id": new_collection.id,
-                            "location_id": new_loc_id
-                        })
+                        db.session.execute(collection_locations.insert().values(
+                            collection_id=new_collection.id,
+                            location_id=new_loc_id
+                        ))
             
             db.session.commit()
             print(f"Successfully copied collection with all locations")
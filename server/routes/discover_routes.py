@@ -4,15 +4,28 @@ from server.extensions import api
 from server.models.location import Location
 from server.models.tag import Tag
 from server.models.user import User
+from server.models.collection import Collection
 from server.extensions import db
 from sqlalchemy import func, and_
+from sqlalchemy.orm import selectinload
 from datetime import datetime, timedelta
 import re
 from server.models.location_tag import location_tags
-import math
+from server.utils.spatial import location_index, bounding_box
+from server.utils.aura_index import aura_index
+from server.utils.response_cache import cached_response
+from server.utils.distance import haversine
+from server.utils.aura import DEFAULT_AURA, user_aura_vector
+from server.utils.aura_vectors import aura_vector, decode_aura_vectors, encode_aura_vector, rank_by_aura
 import os
 import random
 
+# Largest radius result filtered by id; SQLite binds at most 32766 parameters
+MAX_ID_FILTER = 10000
+
+# Most locations a single discover request returns, also the default
+MAX_DISCOVER_RESULTS = 500
+
 # NYC borough boundaries (approximate)
 NYC_BOUNDS = {
     'manhattan': {
@@ -214,152 +227,119 @@ def analyze_place_and_create_aura(place_info):
     }
 
 class DiscoverLocations(Resource):
+    @cached_response('locations', 'tags', 'location_tags', 'users')
     def get(self):
         user_id = request.args.get('user_id', type=int)
         latitude = request.args.get('latitude', type=float)
         longitude = request.args.get('longitude', type=float)
         radius = request.args.get('radius', type=int, default=5000)  # Default 5km
         place_type = request.args.get('place_type')
+        limit = request.args.get('limit', default=MAX_DISCOVER_RESULTS, type=int)
+        limit = max(1, min(limit, MAX_DISCOVER_RESULTS))
         
         # Validate required parameters
         if not all([latitude, longitude]):
             return {"error": "Missing required parameters (latitude, longitude)"}, 400
         
-        # Get user preferences if user_id is provided
-        user_preferences = None
+        # Rank by the user's aura when they have one
+        user_vector = None
         if user_id:
             user = User.query.get(user_id)
             if user:
-                # Assuming user.preferences contains aura preferences
-                user_preferences = user.preferences
-        
-        # Query locations
-        query = Location.query
+                user_vector = user_aura_vector(user)
         
+        # Ask the in-memory grid index which locations fall inside the radius
+        nearby = location_index.query_radius(latitude, longitude, radius)
+        if not nearby:
+            return [], 200
+
+        # Only read the rows the index placed within the radius. Huge radii
+        # would overflow the driver's bound parameter limit, so they fall back
+        # to the bounding box (served by ix_locations_lat_lng)
+        if len(nearby) <= MAX_ID_FILTER:
+            filters = [Location.id.in_(list(nearby))]
+        else:
+            min_lat, max_lat, min_lng, max_lng = bounding_box(latitude, longitude, radius)
+            filters = [
+                Location.latitude.between(min_lat, max_lat),
+                Location.longitude.between(min_lng, max_lng)
+            ]
+
         # Filter by place type if provided
         if place_type:
-            query = query.filter(Location.place_type == place_type)
-        
-        # Get all locations (we'll filter by distance later)
-        all_locations = query.all()
-        
-        # Filter locations within radius and calculate distance
+            filters.append(Location.place_type == place_type)
+
+        if user_vector is not None:
+            return self.rank_by_aura_match(user_vector, nearby, filters, limit), 200
+
         locations_in_radius = []
-        for location in all_locations:
-            # Calculate distance using Haversine formula
-            distance = self.calculate_distance(
-                latitude, longitude,
-                location.latitude, location.longitude
-            )
-            
-            # Only include locations within the specified radius
-            if distance <= radius:
-                location_dict = location.to_dict()
-                location_dict['distance'] = distance
-                
-                # Add aura information
-                if location.tags:
-                    # Use the first tag as the aura
-                    aura_tag = location.tags[0]
-                    location_dict['aura'] = {
-                        'name': aura_tag.name,
-                        'color': aura_tag.color,
-                        'shape': aura_tag.shape
-                    }
-                else:
-                    # If no aura exists, create one based on available data
-                    aura_data = analyze_place_and_create_aura({
-                        'name': location.name,
-                        'types': [location.place_type] if location.place_type else [],
-                        'rating': location.rating or 0
-                    })
-                    
-                    # Create a new Tag object
-                    aura_tag = Tag(
-                        name=aura_data['name'],
-                        color=aura_data['color'],
-                        shape=aura_data['shape']
-                    )
-                    
-                    # Save the tag and associate with location
-                    db.session.add(aura_tag)
-                    db.session.flush()
-                    location.tags.append(aura_tag)
-                    db.session.commit()
-                    
-                    location_dict['aura'] = aura_data
-                
-                locations_in_radius.append(location_dict)
-        
-        # If user preferences exist, calculate aura match score and sort
-        if user_preferences and 'aura' in user_preferences:
-            user_aura = user_preferences['aura']
-            
-            for location in locations_in_radius:
-                if 'aura' in location:
-                    # Calculate similarity between user's aura and location's aura
-                    similarity = self.calculate_aura_similarity(user_aura, location['aura'])
-                    location['aura_match'] = similarity
-            
-            # Sort by aura match (highest match first)
-            locations_in_radius.sort(key=lambda x: x.get('aura_match', 0), reverse=True)
-        else:
-            # No user preferences, sort by distance
-            locations_in_radius.sort(key=lambda x: x['distance'])
+        for location in Location.query.options(selectinload(Location.tags)).filter(*filters).all():
+            distance = nearby.get(location.id)
+
+            # The bounding box fallback also returns the box's corners
+            if distance is not None:
+                locations_in_radius.append((distance, location.id, location))
         
-        return locations_in_radius, 200
+        # No aura to match against, sort by distance and only serialize the closest
+        locations_in_radius.sort(key=lambda x: x[:2])
+        return [self.serialize(location, distance) for distance, _, location in locations_in_radius[:limit]], 200
     
-    def calculate_distance(self, lat1, lon1, lat2, lon2):
+    def rank_by_aura_match(self, user_vector, nearby, filters, limit):
         """
-        Calculate the great circle distance between two points
-        on the earth (specified in decimal degrees)
+        Score every location in the radius against the user's aura using the
+        stored vectors, then only hydrate the top `limit` matches.
         """
-        # Convert decimal degrees to radians
-        lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
+        rows = (
+            db.session.query(
+                Location.id, Location.aura_vector,
+                Location.aura_color1, Location.aura_color2, Location.aura_color3, Location.aura_shape
+            )
+            .filter(*filters)
+            .all()
+        )
+
+        ids = []
+        blobs = []
+        for location_id, blob, color1, color2, color3, shape in rows:
+            if location_id not in nearby:
+                continue
+            if blob is None:
+                # Not backfilled yet (`flask aura materialize`), derive it from the columns
+                blob = encode_aura_vector(aura_vector(color1, color2, color3, shape))
+            ids.append(location_id)
+            blobs.append(blob)
+
+        ranked = rank_by_aura(user_vector, ids, decode_aura_vectors(blobs), k=limit)
+        if not ranked:
+            return []
+
+        locations = Location.query.options(selectinload(Location.tags)).filter(
+            Location.id.in_([location_id for location_id, _ in ranked])
+        ).all()
+        by_id = {location.id: location for location in locations}
+
+        results = []
+        for location_id, score in ranked:
+            location_dict = self.serialize(by_id[location_id], nearby[location_id])
+            location_dict['aura_match'] = score
+            results.append(location_dict)
+        return results
+    
+    def serialize(self, location, distance):
+        location_dict = location.to_dict()
+        location_dict['distance'] = distance
         
-        # Haversine formula
-        dlon = lon2 - lon1
-        dlat = lat2 - lat1
-        a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-        c = 2 * math.asin(math.sqrt(a))
-        r = 6371  # Radius of earth in kilometers
-        return c * r * 1000  # Convert to meters
+        # Auras are materialized at write time; never generate one on a read
+        if not location_dict.get('aura'):
+            location_dict['aura'] = dict(DEFAULT_AURA)
+        return location_dict
     
-    def calculate_aura_similarity(self, aura1, aura2):
+    def calculate_distance(self, lat1, lon1, lat2, lon2):
         """
-        Calculate similarity between two auras
-        Returns a value between 0 and 1, where 1 is a perfect match
+        Calculate the great circle distance between two points
+        on the earth (specified in decimal degrees)
         """
-        # Simple comparison based on aura name
-        if aura1.get('name') == aura2.get('name'):
-            return 1.0
-        
-        # Color comparison - convert hex to RGB and calculate difference
-        color1 = aura1.get('color', '#000000')
-        color2 = aura2.get('color', '#000000')
-        
-        # Handle gradient colors by extracting first color
-        if 'gradient' in color1:
-            color1 = color1.split('#')[1].split(',')[0]
-            color1 = f"#{color1}"
-        if 'gradient' in color2:
-            color2 = color2.split('#')[1].split(',')[0]
-            color2 = f"#{color2}"
-            
-        # Convert hex to RGB
-        r1, g1, b1 = int(color1[1:3], 16), int(color1[3:5], 16), int(color1[5:7], 16)
-        r2, g2, b2 = int(color2[1:3], 16), int(color2[3:5], 16), int(color2[5:7], 16)
-        
-        # Calculate color difference (Euclidean distance)
-        color_diff = math.sqrt((r1-r2)**2 + (g1-g2)**2 + (b1-b2)**2)
-        max_diff = math.sqrt(3 * 255**2)  # Maximum possible difference
-        color_similarity = 1 - (color_diff / max_diff)
-        
-        # Shape comparison
-        shape_similarity = 1.0 if aura1.get('shape') == aura2.get('shape') else 0.5
-        
-        # Combine similarities (weighted average)
-        return 0.6 * color_similarity + 0.4 * shape_similarity
+        return haversine(lat1, lon1, lat2, lon2)
 
 class UserCollections(Resource):
     def get(self, user_id):
@@ -367,7 +347,13 @@ class UserCollections(Resource):
         if not user:
             return {"error": "User not found"}, 404
 
-        collections = user.collections
+        # Load every collection's locations in one extra query for location_count
+        collections = (
+            Collection.query
+            .filter_by(user_id=user.id)
+            .options(selectinload(Collection.locations))
+            .all()
+        )
         return [collection.to_dict() for collection in collections], 200
 
 class PersonalizedSuggestions(Resource):
@@ -376,23 +362,36 @@ class PersonalizedSuggestions(Resource):
         if not user:
             return {"error": "User not found"}, 404
 
-        # Get user's aura preferences
-        user_aura_color = user.aura_color
-        user_aura_shape = user.aura_shape
+        suggestion_count = 10
+
+        # Nearest neighbours of the user's aura in the aura index
+        user_vector = user_aura_vector(user)
+        if user_vector is None:
+            # No aura yet, fall back to the best rated places
+            return [location.to_dict() for location in (
+                Location.query
+                .order_by(func.coalesce(Location.rating, 0).desc(), Location.review_count.desc())
+                .options(selectinload(Location.tags))
+                .limit(suggestion_count)
+                .all()
+            )], 200
 
-        # Get all locations with matching auras
-        matching_locations = []
-        for location in Location.query.all():
-            if location.tags:
-                location_aura = location.tags[0]
-                if location_aura.color == user_aura_color and location_aura.shape == user_aura_shape:
-                    matching_locations.append(location)
+        ranked = aura_index.query(user_vector, k=suggestion_count)
+        if not ranked:
+            return [], 200
 
-        # Sort by rating and number of reviews
-        matching_locations.sort(key=lambda x: (x.rating or 0, len(x.reviews)), reverse=True)
+        locations = Location.query.options(selectinload(Location.tags)).filter(
+            Location.id.in_([location_id for location_id, _ in ranked])
+        ).all()
+        by_id = {location.id: location for location in locations}
 
-        # Return top 10 matching locations
-        return [location.to_dict() for location in matching_locations[:10]], 200
+        suggestions = []
+        for location_id, score in ranked:
+            if location_id in by_id:
+                location_dict = by_id[location_id].to_dict()
+                location_dict['aura_match'] = score
+                suggestions.append(location_dict)
+        return suggestions, 200
 
 # Register routes
 def register_resources(api):
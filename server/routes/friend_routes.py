@@ -1,8 +1,13 @@
 from flask import jsonify, request
 from flask_restful import Resource
+from datetime import datetime
+from sqlalchemy import and_, exists, insert, literal, or_, select
+from sqlalchemy.exc import IntegrityError
 from server.extensions import api, db
-from server.models.user import User
+from server.models.user import User, friendships
 from server.models.friend_request import FriendRequest  # You'll need to create this model
+from server.utils.friend_graph import SUGGESTION_LIMIT, friend_graph
+from server.utils.username_index import username_index
 
 class UserSearch(Resource):
     def get(self):
@@ -15,10 +20,17 @@ class UserSearch(Resource):
         if not search_query:
             return [], 200
         
-        # Search for users with usernames that contain the search query
-        users = User.query.filter(User.username.ilike(f'%{search_query}%')).limit(20).all()
+        # Usernames containing the search query, those starting with it first
+        user_ids = username_index.search(search_query, limit=20)
+        if not user_ids:
+            return [], 200
+        rows = db.session.execute(
+            select(User.id, User.username, User.aura_color, User.aura_shape)
+            .where(User.id.in_(user_ids))
+        ).all()
+        by_id = {row.id: row for row in rows}
         
-        # Convert to list of dictionaries
+        # Convert to list of dictionaries, keeping the index's ranking
         user_list = [
             {
                 'id': user.id,
@@ -26,11 +38,60 @@ class UserSearch(Resource):
                 'aura_color': user.aura_color,
                 'aura_shape': user.aura_shape
             }
-            for user in users
+            for user in (by_id[user_id] for user_id in user_ids if user_id in by_id)
         ]
         
         return user_list, 200
 
+
+def friendship_between(user_id, other_id):
+    """Match a friendships row linking the two users in either direction"""
+    return or_(
+        and_(friendships.c.user_id == user_id, friendships.c.friend_id == other_id),
+        and_(friendships.c.user_id == other_id, friendships.c.friend_id == user_id)
+    )
+
+
+def create_friend_request(sender_id, receiver_id):
+    """
+    Insert a pending request in a single INSERT ... SELECT ... RETURNING that
+    only produces a row when both users exist, they aren't friends yet and no
+    request is pending. Returns the new id, or None if a check failed. Two
+    racing submissions are settled by the unique index on pending pairs.
+    """
+    now = datetime.utcnow()
+    candidate = select(
+        literal(sender_id), literal(receiver_id), literal('pending'), literal(now), literal(now)
+    ).where(
+        exists().where(User.id == sender_id),
+        exists().where(User.id == receiver_id),
+        ~exists().where(friendship_between(sender_id, receiver_id)),
+        ~exists().where(
+            FriendRequest.sender_id == sender_id,
+            FriendRequest.receiver_id == receiver_id,
+            FriendRequest.status == 'pending'
+        )
+    )
+    statement = insert(FriendRequest).from_select(
+        ['sender_id', 'receiver_id', 'status', 'created_at', 'updated_at'], candidate
+    ).returning(FriendRequest.id)
+    return db.session.execute(statement).scalar()
+
+
+def friend_request_rejection(sender_id, receiver_id):
+    """Error message and status for a request create_friend_request() refused"""
+    if db.session.get(User, sender_id) is None:
+        return f'Sender with id={sender_id} not found', 404
+    if db.session.get(User, receiver_id) is None:
+        return f'Receiver with id={receiver_id} not found', 404
+    already_friends = db.session.execute(
+        select(friendships.c.user_id).where(friendship_between(sender_id, receiver_id)).limit(1)
+    ).first()
+    if already_friends:
+        return 'Users are already friends', 400
+    return 'Friend request already sent', 400
+
+
 class FriendRequestResource(Resource):
     def post(self):
         """
@@ -63,88 +124,29 @@ class FriendRequestResource(Resource):
             print("ERROR: Missing sender_id or receiver_id")
             return {'error': 'Missing sender_id or receiver_id'}, 400
         
-        # DIRECT DATABASE OPERATION
-        from sqlalchemy import text
-        
         try:
-            # First check if users exist
-            print("Checking if users exist...")
-            
-            sender_exists = db.session.execute(
-                text("SELECT COUNT(*) FROM users WHERE id = :id"),
-                {"id": sender_id}
-            ).scalar()
-            
-            if not sender_exists:
-                print(f"ERROR: Sender with id={sender_id} not found")
-                return {'error': f'Sender with id={sender_id} not found'}, 404
-                
-            receiver_exists = db.session.execute(
-                text("SELECT COUNT(*) FROM users WHERE id = :id"),
-                {"id": receiver_id}
-            ).scalar()
-            
-            if not receiver_exists:
-                print(f"ERROR: Receiver with id={receiver_id} not found")
-                return {'error': f'Receiver with id={receiver_id} not found'}, 404
-                
-            print("Both users exist")
-                
-            # Check if already friends
-            print("Checking if already friends...")
-            friendship_exists = db.session.execute(
-                text("""
-                    SELECT COUNT(*) FROM friendships 
-                    WHERE (user_id = :user_id AND friend_id = :friend_id)
-                    OR (user_id = :friend_id AND friend_id = :user_id)
-                """),
-                {"user_id": sender_id, "friend_id": receiver_id}
-            ).scalar()
-            
-            if friendship_exists:
-                print("ERROR: Users are already friends")
-                return {'error': 'Users are already friends'}, 400
-                
-            # Check if request already exists
-            print("Checking if request already exists...")
-            existing_request = db.session.execute(
-                text("""
-                    SELECT COUNT(*) FROM friend_requests 
-                    WHERE sender_id = :sender_id 
-                    AND receiver_id = :receiver_id
-                    AND status = 'pending'
-                """),
-                {"sender_id": sender_id, "receiver_id": receiver_id}
-            ).scalar()
-            
-            if existing_request:
-                print("ERROR: Friend request already sent")
-                return {'error': 'Friend request already sent'}, 400
-                
-            # Insert the friend request
-            print("Inserting friend request...")
-            result = db.session.execute(
-                text("""
-                    INSERT INTO friend_requests (sender_id, receiver_id, status)
-                    VALUES (:sender_id, :receiver_id, 'pending')
-                """),
-                {"sender_id": sender_id, "receiver_id": receiver_id}
-            )
-            
-            # Get the ID of the inserted request
-            request_id = db.session.execute(
-                text("SELECT last_insert_rowid()")
-            ).scalar()
-            
-            db.session.commit()
-            
-            print(f"SUCCESS: Friend request created with ID {request_id}")
-            return {'message': 'Friend request sent', 'request_id': request_id}, 201
-            
+            request_id = create_friend_request(sender_id, receiver_id)
+        except IntegrityError:
+            # A concurrent submission of the same request won the unique index
+            db.session.rollback()
+            print("ERROR: Friend request already sent")
+            return {'error': 'Friend request already sent'}, 400
         except Exception as e:
             db.session.rollback()
             print(f"DATABASE ERROR: {str(e)}")
             return {'error': f'Database error: {str(e)}'}, 500
+
+        if request_id is None:
+            # Nothing was inserted. Release the write transaction before working
+            # out which check failed for the error message
+            db.session.rollback()
+            error, status = friend_request_rejection(sender_id, receiver_id)
+            print(f"ERROR: {error}")
+            return {'error': error}, status
+
+        db.session.commit()
+        print(f"SUCCESS: Friend request created with ID {request_id}")
+        return {'message': 'Friend request sent', 'request_id': request_id}, 201
     
     def get(self):
         """
@@ -152,114 +154,52 @@ class FriendRequestResource(Resource):
         Query parameter: user_id - The user to get requests for
         Query parameter: type - Either 'sent' or 'received'
         """
+        user_id = request.args.get('user_id')
+        request_type = request.args.get('type', 'received')  # Default to received
+
+        if not user_id:
+            return {'error': 'Missing user_id parameter'}, 400
+
+        # One round trip: pending requests joined to the user on the other end,
+        # served by the (sender_id, status) / (receiver_id, status) indexes
+        if request_type == 'sent':
+            own_column, other_column = FriendRequest.sender_id, FriendRequest.receiver_id
+        else:
+            own_column, other_column = FriendRequest.receiver_id, FriendRequest.sender_id
+
         try:
-            print("\n### GETTING FRIEND REQUESTS - START ###")
-            user_id = request.args.get('user_id')
-            request_type = request.args.get('type', 'received')  # Default to received
-            
-            print(f"user_id: {user_id}, type: {request_type}")
-            
-            if not user_id:
-                print("ERROR: Missing user_id parameter")
-                return {'error': 'Missing user_id parameter'}, 400
-            
-            print(f"Starting database query for {request_type} requests...")
-            # Get either sent or received requests
-            if request_type == 'sent':
-                print(f"Querying for sent requests from user_id={user_id}")
-                try:
-                    requests = FriendRequest.query.filter_by(
-                        sender_id=user_id,
-                        status='pending'
-                    ).all()
-                    print(f"Query successful, found {len(requests)} sent requests")
-                except Exception as db_error:
-                    print(f"DATABASE ERROR IN QUERY: {str(db_error)}")
-                    return {'error': f'Database query error: {str(db_error)}'}, 500
-            else:  # 'received'
-                print(f"Querying for received requests for user_id={user_id}")
-                try:
-                    requests = FriendRequest.query.filter_by(
-                        receiver_id=user_id,
-                        status='pending'
-                    ).all()
-                    print(f"Query successful, found {len(requests)} received requests")
-                except Exception as db_error:
-                    print(f"DATABASE ERROR IN QUERY: {str(db_error)}")
-                    return {'error': f'Database query error: {str(db_error)}'}, 500
-            
-            # Convert to list of dictionaries
-            print("Beginning to process requests...")
-            request_list = []
-            
-            for i, req in enumerate(requests):
-                print(f"Processing request {i+1}/{len(requests)} (ID: {req.id})")
-                
-                try:
-                    # Determine which user to look up
-                    other_user_id = req.receiver_id if request_type == 'sent' else req.sender_id
-                    print(f"Looking up user with ID {other_user_id}")
-                    
-                    # Query the user
-                    user = User.query.get(other_user_id)
-                    print(f"User query returned: {user}")
-                    
-                    if user:
-                        print(f"Building data for user {user.id} ({user.username if hasattr(user, 'username') else 'unknown'})")
-                        request_data = {
-                            'id': req.id,
-                            'user_id': user.id,
-                        }
-                        
-                        # Add username if available
-                        if hasattr(user, 'username'):
-                            request_data['username'] = user.username
-                            print(f"Added username: {user.username}")
-                        else:
-                            print("WARNING: User has no username attribute")
-                        
-                        # Add aura color if available
-                        if hasattr(user, 'aura_color'):
-                            request_data['aura_color'] = user.aura_color
-                            print(f"Added aura_color: {user.aura_color}")
-                        else:
-                            print("WARNING: User has no aura_color attribute")
-                        
-                        # Add aura shape if available
-                        if hasattr(user, 'aura_shape'):
-                            request_data['aura_shape'] = user.aura_shape
-                            print(f"Added aura_shape: {user.aura_shape}")
-                        else:
-                            print("WARNING: User has no aura_shape attribute")
-                        
-                        # Add creation timestamp if available
-                        if hasattr(req, 'created_at') and req.created_at is not None:
-                            try:
-                                request_data['created_at'] = req.created_at.isoformat()
-                                print(f"Added created_at: {req.created_at.isoformat()}")
-                            except Exception as time_error:
-                                print(f"ERROR formatting created_at: {str(time_error)}")
-                        else:
-                            print("WARNING: Request has no created_at attribute or it's None")
-                        
-                        request_list.append(request_data)
-                        print(f"Successfully added request to response list")
-                    else:
-                        print(f"WARNING: User with ID {other_user_id} not found")
-                except Exception as req_error:
-                    print(f"ERROR processing request {req.id}: {str(req_error)}")
-                    # Continue processing other requests
-            
-            print(f"Finished processing all requests. Returning {len(request_list)} results.")
-            print("### GETTING FRIEND REQUESTS - END ###\n")
-            return request_list, 200
-            
+            rows = db.session.execute(
+                select(
+                    FriendRequest.id,
+                    FriendRequest.created_at,
+                    User.id.label('user_id'),
+                    User.username,
+                    User.aura_color,
+                    User.aura_shape
+                )
+                .join(User, User.id == other_column)
+                .where(own_column == user_id, FriendRequest.status == 'pending')
+            ).all()
         except Exception as e:
-            print(f"CRITICAL ERROR in friend requests GET endpoint: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            return {'error': f'Server error: {str(e)}'}, 500
-    
+            print(f"Error getting friend requests: {str(e)}")
+            return {'error': f'Database query error: {str(e)}'}, 500
+
+        request_list = []
+        for row in rows:
+            request_data = {
+                'id': row.id,
+                'user_id': row.user_id,
+                'username': row.username,
+                'aura_color': row.aura_color,
+                'aura_shape': row.aura_shape
+            }
+            if row.created_at is not None:
+                request_data['created_at'] = row.created_at.isoformat()
+            request_list.append(request_data)
+
+        print(f"Returning {len(request_list)} {request_type} friend requests for user {user_id}")
+        return request_list, 200
+
     def patch(self, request_id):
         """
         Update a friend request status (accept or reject)
@@ -290,73 +230,60 @@ class FriendRequestResource(Resource):
             receiver = User.query.get(friend_request.receiver_id)
             
             if sender and receiver:
-                # Add each user to the other's friends list
-                # This assumes you have a many-to-many relationship for friendships
-                sender.friends.append(receiver)
-                receiver.friends.append(sender)
+                # Add each user to the other's friends list, skipping any
+                # direction that already exists (e.g. two crossed requests)
+                sender.add_friend(receiver)
         
         db.session.commit()
         
         return {'message': f'Friend request {status}'}, 200
 
+FRIEND_COLUMNS = (
+    User.id, User.username, User.aura_color, User.aura_shape, User.response_speed,
+    User.aura_color1, User.aura_color2, User.aura_color3
+)
+
+
+def friend_rows(user_ids):
+    """Projected user rows for `user_ids`, in the same order"""
+    user_ids = [int(user_id) for user_id in user_ids]
+    if not user_ids:
+        return []
+    rows = db.session.execute(select(*FRIEND_COLUMNS).where(User.id.in_(user_ids))).all()
+    by_id = {row.id: row for row in rows}
+    return [by_id[user_id] for user_id in user_ids if user_id in by_id]
+
+
+def friend_to_dict(friend):
+    friend_data = {
+        'id': friend.id,
+        'username': friend.username,
+        'aura_color': friend.aura_color,
+        'aura_shape': friend.aura_shape,
+        'response_speed': friend.response_speed
+    }
+    
+    # Add individual color components if available
+    if friend.aura_color1:
+        friend_data['aura_color1'] = friend.aura_color1
+    if friend.aura_color2:
+        friend_data['aura_color2'] = friend.aura_color2
+    if friend.aura_color3:
+        friend_data['aura_color3'] = friend.aura_color3
+    return friend_data
+
+
 class UserFriends(Resource):
     def get(self, user_id):
         """Get all friends for a user"""
         try:
-            print(f"\n### GETTING FRIENDS FOR USER {user_id} ###")
-            user = User.query.get(user_id)
-            
-            if not user:
+            if db.session.get(User, user_id) is None:
                 print(f"ERROR: User with id={user_id} not found")
                 return {'error': 'User not found'}, 404
             
-            # Get all friends with complete aura data
-            friends = []
-            
-            from sqlalchemy import text
-            
-            # Use a direct SQL query to get friend data with all aura information
-            friend_rows = db.session.execute(
-                text("""
-                    SELECT 
-                        u.id, 
-                        u.username, 
-                        u.aura_color,
-                        u.aura_shape,
-                        u.response_speed,
-                        u.aura_color1,
-                        u.aura_color2,
-                        u.aura_color3
-                    FROM users u
-                    JOIN friendships f ON u.id = f.friend_id
-                    WHERE f.user_id = :user_id
-                """),
-                {"user_id": user_id}
-            ).fetchall()
-            
-            print(f"Found {len(friend_rows)} friends for user {user_id}")
-            
-            # Convert to list of dictionaries with complete data
-            for friend in friend_rows:
-                friend_data = {
-                    'id': friend.id,
-                    'username': friend.username,
-                    'aura_color': friend.aura_color,
-                    'aura_shape': friend.aura_shape,
-                    'response_speed': friend.response_speed
-                }
-                
-                # Add individual color components if available
-                if friend.aura_color1:
-                    friend_data['aura_color1'] = friend.aura_color1
-                if friend.aura_color2:
-                    friend_data['aura_color2'] = friend.aura_color2
-                if friend.aura_color3:
-                    friend_data['aura_color3'] = friend.aura_color3
-                
-                friends.append(friend_data)
-            
-            print(f"Returning friend data with complete aura information")
+            # Friend ids come from the in-memory graph; only their rows hit the database
+            friends = [friend_to_dict(friend) for friend in friend_rows(friend_graph.friends(user_id))]
+            print(f"Found {len(friends)} friends for user {user_id}")
             return friends, 200
             
         except Exception as e:
@@ -364,11 +291,41 @@ class UserFriends(Resource):
             print(f"ERROR: {error_msg}")
             return {'error': error_msg}, 500
 
+
+class MutualFriends(Resource):
+    def get(self, user_id, other_id):
+        """Get the friends two users have in common"""
+        if db.session.get(User, user_id) is None or db.session.get(User, other_id) is None:
+            return {'error': 'User not found'}, 404
+        mutual_ids = friend_graph.mutual_friends(user_id, other_id)
+        return [friend_to_dict(friend) for friend in friend_rows(mutual_ids)], 200
+
+
+class FriendSuggestions(Resource):
+    def get(self, user_id):
+        """
+        Suggest friends of the user's friends, most mutual friends first
+        Query parameter: limit - Maximum number of suggestions (default 20)
+        """
+        if db.session.get(User, user_id) is None:
+            return {'error': 'User not found'}, 404
+        limit = request.args.get('limit', SUGGESTION_LIMIT, type=int)
+        ranked = friend_graph.suggestions(user_id, limit=max(1, min(limit, 100)))
+        mutual_counts = dict(ranked)
+        suggestions = []
+        for friend in friend_rows([suggested_id for suggested_id, _ in ranked]):
+            friend_data = friend_to_dict(friend)
+            friend_data['mutual_friend_count'] = mutual_counts[friend.id]
+            suggestions.append(friend_data)
+        return suggestions, 200
+
 # Register the API routes
 def initialize_routes(api):
     api.add_resource(UserSearch, '/api/users/search')
     api.add_resource(FriendRequestResource, '/api/friend_requests', '/api/friend_requests/<int:request_id>')
     api.add_resource(UserFriends, '/api/users/<int:user_id>/friends')
+    api.add_resource(MutualFriends, '/api/users/<int:user_id>/friends/mutual/<int:other_id>')
+    api.add_resource(FriendSuggestions, '/api/users/<int:user_id>/friend_suggestions')
     api.add_resource(CheckTablesResource, '/api/check_tables')
 
 # Add this class to check and fix database tables
@@ -4,10 +4,20 @@ from server.extensions import api, db
 from server.models.location import Location
 from server.models.tag import Tag
 from server.models.location_tag import location_tags
+from server.models.location_tombstone import LocationTombstone
+from server.utils.aura import DEFAULT_AURA, aura_columns
+from server.utils.response_cache import cached_response
+from server.utils.location_changes import parse_since
+from server.utils.places_cache import cached_places_call, places_response_cacheable
+from server.utils.spatial import record_inserted_locations as record_spatial_inserts
+from server.utils.aura_index import record_inserted_locations as record_aura_inserts
+from datetime import datetime, timedelta
 import requests
 import os
 import random  # Add this import for sample data generation
-from sqlalchemy import func
+from sqlalchemy import and_, func, insert, or_, select, tuple_
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 import googlemaps  # Add import for Google Maps client
 
 # Import the analyze_place_and_create_aura function
@@ -241,54 +251,122 @@ def analyze_place_and_create_aura(place_info):
         'shape': shape
     }
 
+# Columns that can be requested through /api/locations?fields=...
+# 'aura' is a virtual field assembled from the direct aura columns
+LOCATION_FIELDS = [
+    'id', 'name', 'google_place_id', 'latitude', 'longitude', 'place_type',
+    'address', 'rating', 'phone', 'website', 'price_level', 'user_ratings_total',
+    'area', 'review_count', 'avg_user_rating', 'aura_name', 'aura_color', 'aura_color1', 'aura_color2', 'aura_color3',
+    'aura_shape', 'created_at', 'updated_at', 'aura'
+]
+AURA_SOURCE_FIELDS = ['aura_name', 'aura_color', 'aura_color1', 'aura_color2', 'aura_color3', 'aura_shape']
+
+# How far /api/locations/changes holds next_since behind the current time.
+# Must exceed the longest write transaction (flush to commit).
+CHANGES_SAFETY_LAG = timedelta(minutes=2)
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+def parse_location_fields(fields_param):
+    """Parse the comma separated fields= parameter, returns (fields, unknown_fields)"""
+    if not fields_param:
+        return list(LOCATION_FIELDS), []
+    fields = [field.strip() for field in fields_param.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in LOCATION_FIELDS]
+    # The id is always returned since it doubles as the pagination cursor
+    if 'id' not in fields:
+        fields.insert(0, 'id')
+    return fields, unknown
+
+def project_location_row(row, fields):
+    """Build a response dict from a plain column row"""
+    location_dict = {}
+    for field in fields:
+        if field == 'aura':
+            continue
+        value = row[field]
+        if field in ('created_at', 'updated_at') and value is not None:
+            value = value.isoformat()
+        location_dict[field] = value
+    
+    if 'aura' in fields:
+        if row['aura_name'] and (row['aura_color1'] or row['aura_color2'] or row['aura_color3']) and row['aura_shape']:
+            location_dict['aura'] = {
+                'name': row['aura_name'],
+                'color': row['aura_color'] or f"linear-gradient(125deg, {row['aura_color1']}, {row['aura_color2']}, {row['aura_color3']})",
+                'shape': row['aura_shape']
+            }
+        else:
+            location_dict['aura'] = dict(DEFAULT_AURA)
+    
+    return location_dict
+
 class LocationList(Resource):
+    @cached_response('locations', 'tags', 'location_tags')
     def get(self):
-        # First get all locations from database
-        locations = Location.query.all()
+        """
+        List locations.
+
+        Optional query parameters (any of them switches to a paginated response):
+        - after_id: Return locations with an id greater than this cursor
+        - limit: Page size (default 100, max 500)
+        - fields: Comma separated list of fields to return, e.g. fields=id,name,latitude,longitude,aura
+        """
+        if any(param in request.args for param in ('after_id', 'limit', 'fields')):
+            return self.get_page()
+        
+        # Auras are materialized at write time (see server/utils/aura.py and
+        # `flask aura materialize`), so this path never writes
+        locations = Location.query.options(selectinload(Location.tags)).all()
         location_list = []
         
         for location in locations:
             # Get base location data
             location_dict = location.to_dict()
             
-            # If the location doesn't have an aura already, create one using our analysis logic
+            # Locations not yet backfilled get a neutral placeholder aura
             if 'aura' not in location_dict or not location_dict['aura']:
-                try:
-                    # Create an aura based on the location properties
-                    aura_data = analyze_place_and_create_aura({
-                        'name': location.name,
-                        'types': [location.place_type] if location.place_type else [],
-                        'rating': location.rating or 0
-                    })
-                    
-                    # Add the aura data
-                    location_dict['aura'] = aura_data
-                    
-                    # Create a tag if needed
-                    if not location.tags:
-                        aura_tag = Tag(
-                            name=aura_data['name'],
-                            color=aura_data['color'],
-                            shape=aura_data['shape']
-                        )
-                        db.session.add(aura_tag)
-                        db.session.flush()
-                        location.tags.append(aura_tag)
-                        db.session.commit()
-                except Exception as e:
-                    print(f"Error creating aura for location {location.id}: {e}")
-                    # Fallback to default aura
-                    location_dict['aura'] = {
-                        'name': 'Balanced Neutral',
-                        'color': 'linear-gradient(to right, #009688, #80CBC4)',
-                        'shape': determine_shape(location.rating or 3.0)
-                    }
+                location_dict['aura'] = dict(DEFAULT_AURA)
             
             # Add to our response list
             location_list.append(location_dict)
         
         return location_list, 200
 
+    def get_page(self):
+        """Keyset-paginated listing built from selected columns, no ORM objects are loaded"""
+        after_id = request.args.get('after_id', default=0, type=int)
+        limit = request.args.get('limit', default=DEFAULT_PAGE_SIZE, type=int)
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        
+        fields, unknown = parse_location_fields(request.args.get('fields'))
+        if unknown:
+            return {"error": f"Unknown fields: {', '.join(unknown)}"}, 400
+        
+        # Work out which real columns we have to select
+        column_names = [field for field in fields if field != 'aura']
+        if 'aura' in fields:
+            column_names += [field for field in AURA_SOURCE_FIELDS if field not in column_names]
+        columns = [Location.__table__.c[name] for name in column_names]
+        
+        # Fetch one extra row to know whether there is a next page
+        rows = db.session.execute(
+            select(*columns)
+            .where(Location.id > after_id)
+            .order_by(Location.id)
+            .limit(limit + 1)
+        ).mappings().all()
+        
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        
+        return {
+            'locations': [project_location_row(row, fields) for row in rows],
+            'next_after_id': rows[-1]['id'] if has_more else None,
+            'limit': limit
+        }, 200
+
     def post(self):
         data = request.get_json()
         location = Location(
@@ -304,6 +382,92 @@ class LocationList(Resource):
         db.session.commit()
         return location.to_dict(), 201
 
+class LocationChanges(Resource):
+    def get(self):
+        """
+        Delta sync: locations inserted or updated since the cursor, plus the
+        ids of locations deleted since then, one page at a time.
+        
+        Query parameters:
+        - since: ISO 8601 timestamp or unix seconds (UTC)
+        - after_id: id of the last location served at exactly `since` (default 0)
+        - limit: maximum locations (and tombstones) per page (default 100, max 500)
+        
+        Pass the returned `next_since` and `after_id` on the following call,
+        straight away while `has_more` is set. The cursor never passes
+        CHANGES_SAFETY_LAG behind the current time, so the last few minutes
+        of changes are sent again and clients must dedupe by id. A row can
+        show up twice but is never skipped.
+        """
+        since = parse_since(request.args.get('since'))
+        if since is None:
+            return {"error": "Missing or invalid 'since' parameter (ISO 8601 or unix seconds)"}, 400
+        after_id = request.args.get('after_id', default=0, type=int)
+        limit = request.args.get('limit', default=DEFAULT_PAGE_SIZE, type=int)
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        
+        # updated_at and deleted_at are stamped at flush time, not commit time, so
+        # a transaction still open now can commit rows older than this request.
+        # The cursor never moves past this horizon, so the next call picks them up.
+        horizon = (datetime.utcnow() - CHANGES_SAFETY_LAG, 0)
+        cursor = (since, after_id)
+        
+        # Keyset on (updated_at, id), served by ix_locations_updated_at
+        changed = (
+            Location.query
+            .options(selectinload(Location.tags))
+            .filter(or_(
+                Location.updated_at > since,
+                and_(Location.updated_at == since, Location.id > after_id)
+            ))
+            .order_by(Location.updated_at, Location.id)
+            .limit(limit + 1)
+            .all()
+        )
+        tombstones = (
+            db.session.query(LocationTombstone.deleted_at, LocationTombstone.location_id)
+            .filter(LocationTombstone.deleted_at >= since)
+            .order_by(LocationTombstone.deleted_at, LocationTombstone.id)
+            .limit(limit + 1)
+            .all()
+        )
+        
+        # A full page ends at its last location, or before the last tombstone
+        # served if the tombstones ran out first
+        end = None
+        if len(changed) > limit:
+            changed = changed[:limit]
+            end = (changed[-1].updated_at, changed[-1].id)
+        if len(tombstones) > limit:
+            tombstones = tombstones[:limit]
+            if end is None or tombstones[-1][0] < end[0]:
+                end = (tombstones[-1][0], 0)
+        if end is not None:
+            changed = [location for location in changed if (location.updated_at, location.id) <= end]
+            tombstones = [row for row in tombstones if row[0] <= end[0]]
+        
+        if end is not None and end <= horizon:
+            next_cursor, has_more = end, True
+        else:
+            # Caught up (or into the last few minutes): restart from the horizon.
+            # Anything past a full page is served once the horizon passes it.
+            next_cursor, has_more = max(cursor, horizon), False
+        
+        locations = []
+        for location in changed:
+            location_dict = location.to_dict()
+            if not location_dict.get('aura'):
+                location_dict['aura'] = dict(DEFAULT_AURA)
+            locations.append(location_dict)
+        
+        return {
+            'locations': locations,
+            'deleted': [location_id for _, location_id in tombstones],
+            'next_since': next_cursor[0].isoformat() + 'Z',
+            'after_id': next_cursor[1],
+            'has_more': has_more
+        }, 200
+
 class LocationById(Resource):
     def get(self, location_id):
         location = Location.query.get_or_404(location_id)
@@ -353,6 +517,10 @@ class LocationAura(Resource):
         location.tags = []
         location.tags.append(aura_tag)
         
+        # The direct aura columns (and the stored aura vector) are what reads use
+        for key, value in aura_columns(aura_data).items():
+            setattr(location, key, value)
+        
         db.session.commit()
         
         return {
@@ -361,6 +529,122 @@ class LocationAura(Resource):
         }, 200
 
 class FetchNearbyLocations(Resource):
+    def ingest_places(self, places):
+        """
+        Store a page of Places results as set-based work, so the number of
+        statements doesn't grow with the page: one IN lookup for known places
+        (plus one for their tags), one multi-row INSERT each for new locations
+        and new aura tags, and one flush for tag links and moved coordinates.
+        """
+        # Skip unusable results and repeats up front
+        unique = {}
+        for place in places:
+            coordinates = place.get('geometry', {}).get('location', {})
+            if place.get('place_id') and place.get('name') and None not in (coordinates.get('lat'), coordinates.get('lng')):
+                unique.setdefault(place['place_id'], place)
+        if not unique:
+            return []
+
+        known = {
+            location.google_place_id: location
+            for location in Location.query
+                .options(selectinload(Location.tags))
+                .filter(Location.google_place_id.in_(list(unique)))
+        }
+
+        new_rows = []
+        auras = {}  # place_id -> aura for the location's tag
+        for place_id, place in unique.items():
+            try:
+                print(f"Processing place: {place.get('name')} ({place_id})")
+                coordinates = place['geometry']['location']
+                location = known.get(place_id)
+                
+                if location:
+                    # Use existing location, just update coordinates that actually moved
+                    if location.latitude != coordinates['lat']:
+                        location.latitude = coordinates['lat']
+                    if location.longitude != coordinates['lng']:
+                        location.longitude = coordinates['lng']
+                    if not location.tags:
+                        auras[place_id] = analyze_place_and_create_aura({
+                            'name': location.name,
+                            'types': [location.place_type] if location.place_type else [],
+                            'rating': location.rating or 0
+                        })
+                    continue
+                
+                # Create placeholder aura from location name and type
+                place_type = place.get('types', [])[0] if place.get('types') else None
+                aura_data = analyze_place_and_create_aura({
+                    'name': place['name'],
+                    'types': [place_type] if place_type else [],
+                    'rating': place.get('rating') or 0
+                })
+                row = {
+                    'name': place['name'],
+                    'google_place_id': place_id,
+                    'latitude': coordinates['lat'],
+                    'longitude': coordinates['lng'],
+                    'place_type': place_type,
+                    'address': place.get('vicinity'),
+                    'rating': place.get('rating')
+                }
+                # Same aura for the columns and the tag
+                row.update(aura_columns(aura_data))
+                new_rows.append(row)
+                auras[place_id] = aura_data
+                
+            except Exception as e:
+                print(f"Error processing place {place.get('name')}: {e}")
+                continue
+
+        if new_rows:
+            # RETURNING rows aren't ordered on SQLite, so match them up by place id
+            inserted = db.session.scalars(insert(Location).returning(Location), new_rows).all()
+            for location in inserted:
+                set_committed_value(location, 'tags', [])  # brand new, nothing to lazy load
+                known[location.google_place_id] = location
+            # Bulk inserted rows skip the flush hooks; hand them to the indexes for the commit
+            record_spatial_inserts(db.session, inserted)
+            record_aura_inserts(db.session, inserted)
+
+        # Aura tags are shared by every location with the same name, color and shape
+        tags = {}
+        combos = {(aura['name'], aura['color'], aura['shape']) for aura in auras.values()}
+        if combos:
+            for tag in Tag.query.filter(tuple_(Tag.name, Tag.color, Tag.shape).in_(list(combos))):
+                tags.setdefault((tag.name, tag.color, tag.shape), tag)
+            missing = [
+                {'name': name, 'color': color, 'shape': shape}
+                for name, color, shape in combos if (name, color, shape) not in tags
+            ]
+            if missing:
+                for tag in db.session.scalars(insert(Tag).returning(Tag), missing):
+                    tags[(tag.name, tag.color, tag.shape)] = tag
+        for place_id, aura in auras.items():
+            known[place_id].tags.append(tags[(aura['name'], aura['color'], aura['shape'])])
+
+        # Tag links and coordinate updates go out in this one flush
+        db.session.flush()
+        locations = [known[place_id] for place_id in unique if place_id in known]
+
+        return [{
+            'id': location.id,
+            'name': location.name,
+            'google_place_id': location.google_place_id,
+            'latitude': location.latitude,
+            'longitude': location.longitude,
+            'place_type': location.place_type,
+            'address': location.address,
+            'rating': location.rating,
+            'aura': {
+                'name': location.tags[0].name if location.tags else "Unknown",
+                'color': location.tags[0].color if location.tags else "#8864fe",
+                'shape': location.tags[0].shape if location.tags else "balanced"
+            }
+        } for location in locations]
+
     def get(self):
         """
         Fetch nearby locations from Google Places API, analyze, and store with auras
@@ -409,12 +693,15 @@ class FetchNearbyLocations(Resource):
             print(f"Querying Google Places API with params: {params}")
             print(f"Full URL: {url}?{'&'.join([f'{k}={v}' for k, v in params.items()])}")
             
-            # Make the request to Google Places API
-            try:
+            def load():
                 response = requests.get(url, params=params)
                 print(f"Google Places API response status: {response.status_code}")
                 response.raise_for_status()
-                places_data = response.json()
+                return response.json()
+
+            # Make the request to Google Places API (or reuse a cached response)
+            try:
+                places_data = cached_places_call('search', url, params, load, places_response_cacheable)
                 
                 print(f"Google Places API response: {places_data.get('status')}")
                 if places_data.get('status') != 'OK':
@@ -423,78 +710,8 @@ class FetchNearbyLocations(Resource):
                     # Return sample data instead of error
                     return self.get_sample_locations(latitude, longitude), 200
                 
-                # Process each place
-                results = []
-                for place in places_data.get('results', []):
-                    try:
-                        # Extract place data
-                        print(f"Processing place: {place.get('name')} ({place.get('place_id')})")
-                        
-                        # Check if we already have this location
-                        existing_location = Location.query.filter_by(
-                            google_place_id=place.get('place_id')
-                        ).first()
-                        
-                        if existing_location:
-                            # Use existing location, just update coordinates
-                            location = existing_location
-                            location.latitude = place.get('geometry', {}).get('location', {}).get('lat')
-                            location.longitude = place.get('geometry', {}).get('location', {}).get('lng')
-                        else:
-                            # Create new location
-                            location = Location(
-                                name=place.get('name'),
-                                google_place_id=place.get('place_id'),
-                                latitude=place.get('geometry', {}).get('location', {}).get('lat'),
-                                longitude=place.get('geometry', {}).get('location', {}).get('lng'),
-                                place_type=place.get('types', [])[0] if place.get('types') else None,
-                                address=place.get('vicinity'),
-                                rating=place.get('rating')
-                            )
-                            db.session.add(location)
-                            db.session.flush()  # Get ID before creating aura
-                        
-                        # Get place details for reviews if location has no aura
-                        if not location.tags:
-                            # Create placeholder aura from location name and type
-                            aura_data = analyze_place_and_create_aura({
-                                'name': location.name,
-                                'types': [location.place_type] if location.place_type else [],
-                                'rating': location.rating
-                            })
-                            
-                            # Create a new Tag object
-                            aura_tag = Tag(
-                                name=aura_data['name'],
-                                color=aura_data['color'],
-                                shape=aura_data['shape']
-                            )
-                            
-                            # Add the tag to the location
-                            db.session.add(aura_tag)
-                            db.session.flush()
-                            location.tags.append(aura_tag)
-                        
-                        # Add to results
-                        results.append({
-                            'id': location.id,
-                            'name': location.name,
-                            'google_place_id': location.google_place_id,
-                            'latitude': location.latitude,
-                            'longitude': location.longitude,
-                            'place_type': location.place_type,
-                            'address': location.address,
-                            'rating': location.rating,
-                            'aura': {
-                                'name': location.tags[0].name if location.tags else "Unknown",
-                                'color': location.tags[0].color if location.tags else "#8864fe",
-                                'shape': location.tags[0].shape if location.tags else "balanced"
-                            }
-                        })
-                        
-                    except Exception as e:
-                        print(f"Error processing place {place.get('name')}: {e}")
-                        continue
+                # Store every place with a fixed number of statements
+                results = self.ingest_places(places_data.get('results', []))
                 
                 # Commit all changes
                 db.session.commit()
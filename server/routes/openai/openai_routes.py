@@ -1,51 +1,71 @@
-from flask import request, jsonify
+from flask import current_app, request, jsonify
 from flask_restful import Resource
 from server.extensions import api
 import os
-from openai import OpenAI
+import threading
+import time
 from datetime import datetime
 import json
 from server.models.user import User
 from server.extensions import db
+from server.utils.background_jobs import get_job, submit_job
+from server.utils.mood_pool import add_pooled_questions, aura_color_family, take_pooled_questions
 
-# Configure OpenAI API key
-openai_api_key = os.environ.get("OPENAI_API_KEY", "").strip()
-if not openai_api_key:
-    raise ValueError("OpenAI API key is not set in environment variables")
-
-# Log API key first few chars for debugging
-api_key_preview = openai_api_key[:10] + "..." if len(openai_api_key) > 10 else "invalid_key"
-print(f"OpenAI API key configured: {api_key_preview}")
-print(f"OpenAI API key length: {len(openai_api_key)} characters")
-
-try:
-    # Initialize the OpenAI client with increased timeout
-    client = OpenAI(api_key=openai_api_key.strip(), timeout=60.0)  # Increase timeout to 60 seconds
-    # Test the API key with a simple call
-    models = client.models.list()
-    print(f"OpenAI API connection successful. Available models: {len(models.data)}")
-except Exception as e:
-    print(f"ERROR: Could not initialize OpenAI client: {str(e)}")
-    print("This may indicate an invalid API key or network issue")
-    # Still create the client, we'll handle errors in the API calls
-    client = OpenAI(api_key=openai_api_key, timeout=60.0)
+# OpenAI client, created on first use by get_openai_client()
+client = None
+client_lock = threading.Lock()
 
-class DailyMoodQuestionnaire(Resource):
+# How long a health check result is reused, in seconds
+OPENAI_HEALTH_TTL = 300
+openai_health_cache = {'checked_at': None, 'result': None}
 
-    def post(self, user_id):
-        """Generate six personalized mood questions for the user, using their base aura as a template to gauge"""
-        try:
-            data = request.get_json()
-            current_date = datetime.now().strftime("%A, %B %d")
 
-            print(f"Generating mood questions for user {user_id} on {current_date}")
+def get_openai_client():
+    """
+    Build the OpenAI client the first time it's needed instead of at import,
+    so booting the app (workers, `flask db`, scripts) needs neither the API
+    key nor a network round trip. Raises ValueError if the key is missing.
+    """
+    global client
+    if client is None:
+        with client_lock:
+            if client is None:
+                # The openai package is slow to import, so it's only loaded here
+                from openai import OpenAI
 
-            # Get the user's aura (if available) to customize questions
-            user = db.session.get(User, user_id)
-            main_color = user.aura_color if user and user.aura_color else "BLUE"
-            
-            # Create the prompt for GPT
-            prompt = """
+                openai_api_key = os.environ.get("OPENAI_API_KEY", "").strip()
+                if not openai_api_key:
+                    raise ValueError("OpenAI API key is not set in environment variables")
+
+                # Log API key first few chars for debugging
+                api_key_preview = openai_api_key[:10] + "..." if len(openai_api_key) > 10 else "invalid_key"
+                print(f"OpenAI API key configured: {api_key_preview}")
+
+                client = OpenAI(api_key=openai_api_key, timeout=60.0)  # Increase timeout to 60 seconds
+    return client
+
+
+def check_openai_health(force=False):
+    """
+    Check the API key with a models.list() call. The result is cached for
+    OPENAI_HEALTH_TTL seconds so repeated checks don't hit the API.
+    """
+    checked_at = openai_health_cache['checked_at']
+    if not force and checked_at is not None and time.monotonic() - checked_at < OPENAI_HEALTH_TTL:
+        return openai_health_cache['result']
+
+    try:
+        models = get_openai_client().models.list()
+        result = {"status": "ok", "models": len(models.data)}
+    except Exception as e:
+        print(f"ERROR: OpenAI health check failed: {str(e)}")
+        result = {"status": "error", "message": str(e)}
+
+    openai_health_cache.update(checked_at=time.monotonic(), result=result)
+    return result
+
+# Prompt for the daily mood check-in; {main_color} is the user's aura color family
+MOOD_QUESTIONS_PROMPT = """
 You are generating a 6-question daily mood check-in for a spiritual location-based app called Ora. The user's current aura is: {main_color}.
 
 Your role is to create questions that quietly interpret someone's present energy and mental landscape without directly mentioning emotions or feelings.
@@ -114,184 +134,251 @@ examples:
 ]
 """
 
-            # Implement a retry mechanism for OpenAI API
-            max_retries = 3
-            retry_count = 0
-            backoff_time = 1  # Initial backoff time in seconds
-            
-            while retry_count < max_retries:
-                try:
-                    print(f"Attempt {retry_count + 1} to call OpenAI API")
-                    
-                    # Call OpenAI API with increased token limit
-                    response = client.chat.completions.create(
-                        model="gpt-3.5-turbo-1106",  # Use the latest version that's good with JSON
-                        messages=[
-                            {"role": "system", "content": "You are a helpful assistant that generates thoughtful mood questions with associated color values. Always return a JSON array of question objects exactly as specified."},
-                            {"role": "user", "content": prompt}
-                        ],
-                        temperature=0.7,
-                        max_tokens=1500,  # Increase token limit further
-                        # Remove the response_format parameter - we want an array, not an object
-                    )
-                    
-                    questions_text = response.choices[0].message.content
-                    print(f"Raw OpenAI response: {questions_text}")
-                    
-                    # Break out of retry loop if successful
-                    break
-                    
-                except Exception as api_err:
-                    retry_count += 1
-                    print(f"OpenAI API call failed (attempt {retry_count}): {str(api_err)}")
-                    
-                    if retry_count >= max_retries:
-                        print("Max retries reached, failing")
-                        raise
-                    
-                    # Exponential backoff
-                    import time
-                    sleep_time = backoff_time * (2 ** (retry_count - 1))
-                    print(f"Retrying in {sleep_time} seconds...")
-                    time.sleep(sleep_time)
-
-            # Clean up markdown formatting (in case JSON is returned within code blocks)
-            if "```json" in questions_text:
-                questions_text = questions_text.split("```json")[1].split("```")[0].strip()
-            elif "```" in questions_text:
-                questions_text = questions_text.split("```")[1].split("```")[0].strip()
-            
-            # Additional cleanup - remove any leading/trailing brackets if they exist
-            questions_text = questions_text.strip()
-            
-            print(f"Cleaned text (first 100 chars): {questions_text[:100]}...")
+
+def generate_mood_questions(main_color):
+    """
+    Ask OpenAI for the six daily mood questions and return them parsed and
+    validated. Retries with exponential backoff and raises once every
+    attempt has failed. Runs inline for synchronous requests and on the
+    background job pool in job mode.
+    """
+    # str.format would trip over the JSON braces in the prompt
+    prompt = MOOD_QUESTIONS_PROMPT.replace('{main_color}', main_color)
+    # Outside the retry loop: a missing API key won't fix itself
+    openai_client = get_openai_client()
+
+    # Implement a retry mechanism for OpenAI API
+    max_retries = 3
+    retry_count = 0
+    backoff_time = 1  # Initial backoff time in seconds
+
+    while retry_count < max_retries:
+        try:
+            print(f"Attempt {retry_count + 1} to call OpenAI API")
+
+            # Call OpenAI API with increased token limit
+            response = openai_client.chat.completions.create(
+                model="gpt-3.5-turbo-1106",  # Use the latest version that's good with JSON
+                messages=[
+                    {"role": "system", "content": "You are a helpful assistant that generates thoughtful mood questions with associated color values. Always return a JSON array of question objects exactly as specified."},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.7,
+                max_tokens=1500,  # Increase token limit further
+                # Remove the response_format parameter - we want an array, not an object
+            )
+
+            questions_text = response.choices[0].message.content
+            print(f"Raw OpenAI response: {questions_text}")
+
+            # Break out of retry loop if successful
+            break
+
+        except Exception as api_err:
+            retry_count += 1
+            print(f"OpenAI API call failed (attempt {retry_count}): {str(api_err)}")
+
+            if retry_count >= max_retries:
+                print("Max retries reached, failing")
+                raise
+
+            # Exponential backoff
+            sleep_time = backoff_time * (2 ** (retry_count - 1))
+            print(f"Retrying in {sleep_time} seconds...")
+            time.sleep(sleep_time)
+
+    # Clean up markdown formatting (in case JSON is returned within code blocks)
+    if "```json" in questions_text:
+        questions_text = questions_text.split("```json")[1].split("```")[0].strip()
+    elif "```" in questions_text:
+        questions_text = questions_text.split("```")[1].split("```")[0].strip()
+
+    # Additional cleanup - remove any leading/trailing brackets if they exist
+    questions_text = questions_text.strip()
+
+    print(f"Cleaned text (first 100 chars): {questions_text[:100]}...")
+
+    # Try to parse JSON with better error handling
+    try:
+        # First try to parse as is
+        try:
+            parsed_json = json.loads(questions_text)
+        except json.JSONDecodeError as e:
+            # If that fails, try to fix common issues
+            print(f"Initial JSON parsing failed: {str(e)}")
+
+            # Try adding [] if missing - common GPT mistake
+            if not questions_text.startswith('['):
+                questions_text = '[' + questions_text
+            if not questions_text.endswith(']'):
+                questions_text = questions_text + ']'
+
+            # Replace single quotes with double quotes if needed
+            questions_text = questions_text.replace("'", '"')
+
+            # Try parsing again
+            print("Attempting to parse with fixes...")
+            parsed_json = json.loads(questions_text)
+            print("Parse successful after fixes")
+
+        # Handle the response format
+        if isinstance(parsed_json, list):
+            # Direct array of questions - what we want
+            parsed_questions = parsed_json
+        elif isinstance(parsed_json, dict):
+            # Check if it's a JSON object with a "questions" field
+            if "questions" in parsed_json:
+                parsed_questions = parsed_json["questions"]
+            else:
+                # Single question object? Put it in an array
+                parsed_questions = [parsed_json]
+        else:
+            raise ValueError(f"Unexpected JSON structure: {type(parsed_json)}")
+
+        print(f"Successfully parsed questions: {len(parsed_questions)} questions found")
+
+        # Validate the structure and make sure each question has color tags
+        valid = True
+
+        # Check if we have questions
+        if not parsed_questions or len(parsed_questions) == 0:
+            print("No questions found in parsed data")
+            valid = False
+
+        # Attempt to fix or create missing questions if needed
+        if len(parsed_questions) < 6:
+            print(f"Only {len(parsed_questions)} questions found, expected 6. Will use what we have.")
+
+        # Validate and fix each question
+        for i, question in enumerate(parsed_questions):
+            if not isinstance(question, dict):
+                print(f"Question {i} is not a dictionary: {question}")
+                valid = False
+                continue
+
+            # Check/fix required fields
+            if "question" not in question:
+                print(f"Question {i} missing 'question' field")
+                question["question"] = f"Question {i+1}?"
+
+            if "options" not in question:
+                print(f"Question {i} missing 'options' field")
+                question["options"] = [
+                    {"text": "Option A", "color": "BLUE"},
+                    {"text": "Option B", "color": "GREEN"},
+                    {"text": "Option C", "color": "RED"}
+                ]
+
+            # Fix/validate options
+            if not isinstance(question["options"], list):
+                print(f"Question {i} options is not a list")
+                question["options"] = [
+                    {"text": "Option A", "color": "BLUE"},
+                    {"text": "Option B", "color": "GREEN"},
+                    {"text": "Option C", "color": "RED"}
+                ]
+
+            # Ensure we have exactly 3 options
+            options = question["options"]
+            while len(options) < 3:
+                print(f"Question {i} has only {len(options)} options, adding default option")
+                options.append({"text": f"Option {len(options)+1}", "color": "BLUE"})
+
+            # Truncate extra options
+            if len(options) > 3:
+                print(f"Question {i} has {len(options)} options, truncating to 3")
+                question["options"] = options[:3]
+
+            # Validate each option has text and color
+            for j, option in enumerate(question["options"]):
+                if not isinstance(option, dict):
+                    print(f"Question {i}, Option {j} is not a dictionary: {option}")
+                    question["options"][j] = {"text": f"Option {j+1}", "color": "BLUE"}
+                    continue
+
+                if "text" not in option:
+                    print(f"Question {i}, Option {j} missing 'text' field")
+                    option["text"] = f"Option {j+1}"
+
+                if "color" not in option:
+                    print(f"Question {i}, Option {j} missing 'color' field")
+                    option["color"] = "BLUE"
+
+                # Validate color is one of the allowed values
+                valid_colors = ["RED", "ORANGE", "YELLOW", "GREEN", "BLUE", "PURPLE", "CYAN"]
+                if option["color"] not in valid_colors:
+                    print(f"Question {i}, Option {j} has invalid color: {option['color']}")
+                    option["color"] = "BLUE"  # Default to blue for invalid colors
+
+        # Return what we have, even if not perfect
+        return parsed_questions
+
+    except Exception as e:
+        print(f"Fatal error parsing questions: {str(e)}")
+        print(f"Raw text (truncated): {questions_text[:200]}...")
+        import traceback
+        traceback.print_exc()
+        raise ValueError(f"Failed to parse or validate questions: {str(e)}")
+
+
+def generate_pooled_questions(app, family, user_id):
+    """
+    Generate a question set for a color family whose pool has nothing new
+    for this user, and add it to the pool as served to them. Runs inline or
+    as a background job, so it brings its own app context.
+    """
+    questions = generate_mood_questions(family)
+    with app.app_context():
+        add_pooled_questions(family, questions, user_id=user_id)
+    return questions
+
+
+class DailyMoodQuestionnaire(Resource):
+
+    def post(self, user_id):
+        """Generate six personalized mood questions for the user, using their base aura as a template to gauge"""
+        try:
+            data = request.get_json(silent=True) or {}
+            current_date = datetime.now().strftime("%A, %B %d")
+
+            print(f"Generating mood questions for user {user_id} on {current_date}")
+
+            # Get the user's aura (if available) to customize questions
+            user = db.session.get(User, user_id)
+            main_color = user.aura_color if user and user.aura_color else "BLUE"
+            family = aura_color_family(main_color)
+            pool_user_id = user.id if user else None
             
-            # Try to parse JSON with better error handling
-            try:
-                # First try to parse as is
-                try:
-                    parsed_json = json.loads(questions_text)
-                except json.JSONDecodeError as e:
-                    # If that fails, try to fix common issues
-                    print(f"Initial JSON parsing failed: {str(e)}")
-                    
-                    # Try adding [] if missing - common GPT mistake
-                    if not questions_text.startswith('['):
-                        questions_text = '[' + questions_text
-                    if not questions_text.endswith(']'):
-                        questions_text = questions_text + ']'
-                    
-                    # Replace single quotes with double quotes if needed
-                    questions_text = questions_text.replace("'", '"')
-                    
-                    # Try parsing again
-                    print("Attempting to parse with fixes...")
-                    parsed_json = json.loads(questions_text)
-                    print("Parse successful after fixes")
-                
-                # Handle the response format
-                if isinstance(parsed_json, list):
-                    # Direct array of questions - what we want
-                    parsed_questions = parsed_json
-                elif isinstance(parsed_json, dict):
-                    # Check if it's a JSON object with a "questions" field
-                    if "questions" in parsed_json:
-                        parsed_questions = parsed_json["questions"]
-                    else:
-                        # Single question object? Put it in an array
-                        parsed_questions = [parsed_json]
-                else:
-                    raise ValueError(f"Unexpected JSON structure: {type(parsed_json)}")
-                
-                print(f"Successfully parsed questions: {len(parsed_questions)} questions found")
-                
-                # Validate the structure and make sure each question has color tags
-                valid = True
-                
-                # Check if we have questions
-                if not parsed_questions or len(parsed_questions) == 0:
-                    print("No questions found in parsed data")
-                    valid = False
-                
-                # Attempt to fix or create missing questions if needed
-                if len(parsed_questions) < 6:
-                    print(f"Only {len(parsed_questions)} questions found, expected 6. Will use what we have.")
-                
-                # Validate and fix each question
-                for i, question in enumerate(parsed_questions):
-                    if not isinstance(question, dict):
-                        print(f"Question {i} is not a dictionary: {question}")
-                        valid = False
-                        continue
-                        
-                    # Check/fix required fields
-                    if "question" not in question:
-                        print(f"Question {i} missing 'question' field")
-                        question["question"] = f"Question {i+1}?"
-                        
-                    if "options" not in question:
-                        print(f"Question {i} missing 'options' field")
-                        question["options"] = [
-                            {"text": "Option A", "color": "BLUE"},
-                            {"text": "Option B", "color": "GREEN"},
-                            {"text": "Option C", "color": "RED"}
-                        ]
-                    
-                    # Fix/validate options
-                    if not isinstance(question["options"], list):
-                        print(f"Question {i} options is not a list")
-                        question["options"] = [
-                            {"text": "Option A", "color": "BLUE"},
-                            {"text": "Option B", "color": "GREEN"},
-                            {"text": "Option C", "color": "RED"}
-                        ]
-                    
-                    # Ensure we have exactly 3 options
-                    options = question["options"]
-                    while len(options) < 3:
-                        print(f"Question {i} has only {len(options)} options, adding default option")
-                        options.append({"text": f"Option {len(options)+1}", "color": "BLUE"})
-                    
-                    # Truncate extra options
-                    if len(options) > 3:
-                        print(f"Question {i} has {len(options)} options, truncating to 3")
-                        question["options"] = options[:3]
-                    
-                    # Validate each option has text and color
-                    for j, option in enumerate(question["options"]):
-                        if not isinstance(option, dict):
-                            print(f"Question {i}, Option {j} is not a dictionary: {option}")
-                            question["options"][j] = {"text": f"Option {j+1}", "color": "BLUE"}
-                            continue
-                            
-                        if "text" not in option:
-                            print(f"Question {i}, Option {j} missing 'text' field")
-                            option["text"] = f"Option {j+1}"
-                            
-                        if "color" not in option:
-                            print(f"Question {i}, Option {j} missing 'color' field")
-                            option["color"] = "BLUE"
-                            
-                        # Validate color is one of the allowed values
-                        valid_colors = ["RED", "ORANGE", "YELLOW", "GREEN", "BLUE", "PURPLE", "CYAN"]
-                        if option["color"] not in valid_colors:
-                            print(f"Question {i}, Option {j} has invalid color: {option['color']}")
-                            option["color"] = "BLUE"  # Default to blue for invalid colors
-                
-                # Return what we have, even if not perfect
-                print(f"Returning {len(parsed_questions)} questions")
+            # Serve today's pre-generated questions if there's a set this user hasn't seen
+            pooled_questions = take_pooled_questions(pool_user_id, family)
+            if pooled_questions is not None:
+                print(f"Serving pooled {family} mood questions to user {user_id}")
                 return {
                     "status": "success",
-                    "questions": parsed_questions,
+                    "questions": pooled_questions,
                     "user_id": user_id
                 }, 200
-                
-            except Exception as e:
-                print(f"Fatal error parsing questions: {str(e)}")
-                print(f"Raw text (truncated): {questions_text[:200]}...")
-                import traceback
-                traceback.print_exc()
-                raise ValueError(f"Failed to parse or validate questions: {str(e)}")
+            
+            app = current_app._get_current_object()
+            
+            # Job mode: hand the slow OpenAI call to the background pool and let the client poll
+            if data.get('mode') == 'job' or request.args.get('mode') == 'job':
+                job_id = submit_job(generate_pooled_questions, app, family, pool_user_id, owner=str(user_id))
+                print(f"Queued mood question job {job_id} for user {user_id}")
+                return {
+                    "status": "pending",
+                    "job_id": job_id,
+                    "status_url": f"/api/users/{user_id}/daily-mood/jobs/{job_id}",
+                    "user_id": user_id
+                }, 202
+
+            parsed_questions = generate_pooled_questions(app, family, pool_user_id)
+            print(f"Returning {len(parsed_questions)} questions")
+            return {
+                "status": "success",
+                "questions": parsed_questions,
+                "user_id": user_id
+            }, 200
                 
         except Exception as e:
             print(f"Error generating mood questions: {str(e)}")
@@ -304,6 +391,50 @@ examples:
             }, 500
 
 
+class DailyMoodQuestionJob(Resource):
+
+    def get(self, user_id, job_id):
+        """Poll a question job started with POST .../daily-mood/questions in job mode"""
+        job = get_job(job_id)
+        if not job or job['owner'] != str(user_id):
+            return {
+                "status": "error",
+                "message": "Job not found",
+                "user_id": user_id
+            }, 404
+
+        if job['status'] == 'failed':
+            return {
+                "status": "error",
+                "message": f"Failed to generate mood questions: {job['error']}",
+                "job_id": job_id,
+                "user_id": user_id
+            }, 500
+
+        if job['status'] != 'done':
+            # Still pending or running; poll again shortly
+            return {
+                "status": job['status'],
+                "job_id": job_id,
+                "user_id": user_id
+            }, 202
+
+        return {
+            "status": "success",
+            "questions": job['result'],
+            "job_id": job_id,
+            "user_id": user_id
+        }, 200
+
+
+class OpenAIHealth(Resource):
+
+    def get(self):
+        """Report whether the OpenAI API is reachable with our key (cached)"""
+        result = check_openai_health(force=request.args.get('refresh') == '1')
+        return result, 200 if result["status"] == "ok" else 503
+
+
 class AnalyzeMoodResponse(Resource):
     def post(self, user_id):
         """Analyze user's responses to mood questions and determine aura adjustments"""
@@ -427,4 +558,6 @@ class AnalyzeMoodResponse(Resource):
 # Register routes
 def register_resources(api):
     api.add_resource(DailyMoodQuestionnaire, '/api/users/<user_id>/daily-mood/questions')
+    api.add_resource(DailyMoodQuestionJob, '/api/users/<user_id>/daily-mood/jobs/<job_id>')
+    api.add_resource(OpenAIHealth, '/api/openai/health')
     api.add_resource(AnalyzeMoodResponse, '/api/users/<user_id>/daily-mood/analyze') 
\ No newline at end of file
@@ -3,19 +3,28 @@ from flask_restful import Resource
 from server.extensions import api
 from server.models.review import Review
 from server.extensions import db
+from sqlalchemy.orm import selectinload
 
 class ReviewList(Resource):
     def get(self):
-        reviews = Review.query.all()
+        reviews = Review.query.options(selectinload(Review.user), selectinload(Review.location)).all()
         return [review.to_dict() for review in reviews], 200
 
     def post(self):
-        data = request.get_json()
-        review = Review(
-            body=data['body'],
-            user_id=data['user_id'],
-            location_id=data['location_id']
-        )
+        data = request.get_json(silent=True)
+        if not data:
+            return {'error': 'No data provided'}, 400
+
+        # Missing fields reach the model validators as None and are reported like invalid ones
+        try:
+            review = Review(
+                body=data.get('body'),
+                rating=data.get('rating'),
+                user_id=data.get('user_id'),
+                location_id=data.get('location_id')
+            )
+        except ValueError as e:
+            return {'error': str(e)}, 400
         db.session.add(review)
         db.session.commit()
         return review.to_dict(), 201
@@ -27,11 +36,20 @@ class ReviewById(Resource):
 
     def patch(self, review_id):
         review = Review.query.get_or_404(review_id)
-        data = request.get_json()
-        
-        if 'body' in data:
-            review.body = data['body']
-        
+        data = request.get_json(silent=True)
+        if not data:
+            return {'error': 'No data provided'}, 400
+
+        try:
+            if 'body' in data:
+                review.body = data['body']
+
+            if 'rating' in data:
+                review.rating = data['rating']
+        except ValueError as e:
+            db.session.rollback()
+            return {'error': str(e)}, 400
+
         db.session.commit()
         return review.to_dict(), 200
 
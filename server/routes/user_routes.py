@@ -3,6 +3,8 @@ from flask_restful import Resource
 from server.extensions import api
 from server.models.user import User
 from server.extensions import db
+from server.utils.aura_colors import three_aura_colors
+from server.utils.response_cache import cached_response
 
 class UserAura(Resource):
     def post(self, user_id):
@@ -45,22 +47,10 @@ class UserAura(Resource):
             
         # If we have the aura color but not individual colors, extract them from gradient
         if user.aura_color and (not user.aura_color1 or not user.aura_color2 or not user.aura_color3):
-            import re
-            # Try to extract hex colors from the gradient string
-            colors = re.findall(r'#[0-9A-Fa-f]{6}|#[0-9A-Fa-f]{3}', user.aura_color)
+            # Extract hex colors from the gradient string, repeating the last one if short
+            colors = three_aura_colors(user.aura_color)
             if colors:
-                if len(colors) >= 3:
-                    user.aura_color1 = colors[0]
-                    user.aura_color2 = colors[1]
-                    user.aura_color3 = colors[2]
-                elif len(colors) == 2:
-                    user.aura_color1 = colors[0]
-                    user.aura_color2 = colors[1]
-                    user.aura_color3 = colors[1]  # Duplicate last color
-                elif len(colors) == 1:
-                    user.aura_color1 = colors[0]
-                    user.aura_color2 = colors[0]
-                    user.aura_color3 = colors[0]
+                user.aura_color1, user.aura_color2, user.aura_color3 = colors
             
         # Store response speed if model has the field
         if hasattr(user, 'response_speed'):
@@ -70,17 +60,19 @@ class UserAura(Resource):
                 user.response_speed = data['responseSpeed']
             
         db.session.commit()
-        return user.to_dict(), 200
+        return user.to_summary_dict(), 200
 
 class UserData(Resource):
+    # User.to_dict embeds the user's reviews (with location summaries) and collections
+    @cached_response('users', 'reviews', 'collections', 'collection_locations', 'locations')
     def get(self, user_id):
         try:
             # Try to convert to integer if possible
             user_id_int = int(user_id)
-            user = User.query.get_or_404(user_id_int)
+            user = User.profile_query().filter_by(id=user_id_int).first_or_404()
         except ValueError:
             # If not an integer, try to find by string ID
-            user = User.query.filter_by(id=user_id).first_or_404()
+            user = User.profile_query().filter_by(id=user_id).first_or_404()
             
         return user.to_dict(), 200
 
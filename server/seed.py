@@ -22,6 +22,13 @@ from server.models.tag import Tag
 from server.models.review import Review
 from server.models.user import User
 from server.models.collection import Collection
+from server.models.seed_checkpoint import SeedCheckpoint
+from server.utils.aura import aura_columns
+from server.utils.index_generation import bump_generations
+from server.utils.rate_limit import TokenBucket
+from server.utils import places_cache
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from sqlalchemy import func, insert
 import googlemaps
 import os
 from datetime import datetime
@@ -60,6 +67,21 @@ TEST_MODE = False  # Set to True for development/testing
 MAX_LOCATIONS_PER_TYPE = 35  # Increased to have 10 more locations per area per type
 MAX_REVIEWS_PER_LOCATION = 25  # Increased to capture 10 more reviews per location
 
+# Seeding pipeline tuning
+FETCH_WORKERS = 8  # Concurrent Places API requests
+PLACES_REQUESTS_PER_SECOND = 10  # Shared across all fetch threads
+WRITE_BATCH_SIZE = 50  # Locations per database transaction
+
+places_rate_limiter = TokenBucket(PLACES_REQUESTS_PER_SECOND)
+
+PLACE_DETAILS_FIELDS = [
+    'name', 'formatted_address', 'geometry', 'rating', 'reviews',
+    'type', 'formatted_phone_number', 'website', 'price_level', 'user_ratings_total'
+]
+
+# Columns an upsert leaves alone when the place is already stored
+UPSERT_PRESERVED_COLUMNS = ('google_place_id', 'review_count', 'avg_user_rating', 'created_at')
+
 # List of neighborhoods in NYC with their coordinates
 NYC_AREAS = [
     {
@@ -204,17 +226,6 @@ PLACE_TYPES = [
     'art_gallery'
 ]
 
-# Vibey keywords for different vibes
-VIBE_KEYWORDS = {
-    'energy': ['energetic', 'vibrant', 'lively', 'dynamic', 'exciting', 'buzzing', 'pulsating', 'upbeat', 'spirited', 'animated'],
-    'calmness': ['calm', 'peaceful', 'serene', 'tranquil', 'quiet', 'relaxing', 'soothing', 'mellow', 'gentle', 'soft'],
-    'warmth': ['warm', 'cozy', 'inviting', 'welcoming', 'friendly', 'comfortable', 'homely', 'intimate', 'pleasant', 'charming'],
-    'elegance': ['elegant', 'sophisticated', 'refined', 'classy', 'upscale', 'luxurious', 'chic', 'polished', 'premium', 'exclusive'],
-    'casual': ['casual', 'laid-back', 'relaxed', 'informal', 'easygoing', 'unpretentious', 'simple', 'natural', 'organic', 'balanced'],
-    'freshness': ['fresh', 'clean', 'crisp', 'modern', 'new', 'contemporary', 'innovative', 'light', 'airy', 'bright'],
-    'authenticity': ['authentic', 'genuine', 'real', 'original', 'traditional', 'classic', 'heritage', 'true', 'pure', 'natural']
-}
-
 # Vibe colors for gradient generation
 VIBE_COLORS = {
     'chill': [
@@ -247,17 +258,6 @@ VIBE_COLORS = {
     ]
 }
 
-# Base colors for gradients - expanded palette
-BASE_COLORS = {
-    'energy': ['#FF0000', '#FF5252', '#FF4081', '#FF6E40'],       # Reds
-    'calmness': ['#0000FF', '#2979FF', '#3D5AFE', '#448AFF'],     # Blues
-    'warmth': ['#FFA500', '#FF9800', '#FF6D00', '#FFAB40'],       # Oranges
-    'elegance': ['#800080', '#9C27B0', '#6A1B9A', '#AA00FF'],     # Purples
-    'casual': ['#00FF00', '#76FF03', '#64DD17', '#B2FF59'],       # Greens
-    'freshness': ['#00FFFF', '#18FFFF', '#00E5FF', '#84FFFF'],    # Cyans
-    'authenticity': ['#FFD700', '#FFAB00', '#FFC400', '#FFD740']  # Golds
-}
-
 # Aura names for generated auras, organized by color category
 AURA_NAMES = {
     'energy': ['Fiery', 'Passionate', 'Dynamic', 'Intense', 'Vibrant'],
@@ -269,6 +269,13 @@ AURA_NAMES = {
     'authenticity': ['Genuine', 'Authentic', 'True', 'Real', 'Original']
 }
 
+# Review NLP scoring lives in server/utils/review_aura.py so it can run
+# without the side effects of importing this module (see `flask aura rescore`)
+from server.utils.review_aura import (
+    VIBE_KEYWORDS, BASE_COLORS, analyze_reviews, generate_gradient,
+    determine_vibe_type, determine_shape, create_aura, review_aura_gradient
+)
+
 # Suppress specific UserWarnings about empty vocabulary
 warnings.filterwarnings("ignore", category=UserWarning, message="Vocabulary is empty")
 
@@ -308,170 +315,6 @@ def calculate_semantic_similarity(tokens, keywords):
     
     return matches / total
 
-# Replace the analyze_reviews function with this enhanced version
-def analyze_reviews(reviews):
-    """Analyze reviews using simple keyword matching to determine aura properties"""
-    try:
-        # If no reviews, return default values
-        if not reviews:
-            print("No reviews found, using default vibe scores")
-            return {
-                'energy': 0.5, 'calmness': 0.5, 'warmth': 0.5, 
-                'elegance': 0.5, 'casual': 0.5, 'freshness': 0.5,
-                'authenticity': 0.5
-            }
-        
-        # Initialize sentiment analyzer
-        sia = SentimentIntensityAnalyzer()
-        
-        # Initialize category scores
-        category_scores = {
-            'energy': 0.5, 'calmness': 0.5, 'warmth': 0.5, 
-            'elegance': 0.5, 'casual': 0.5, 'freshness': 0.5,
-            'authenticity': 0.5
-        }
-        
-        # Process each review
-        for review_text in reviews:
-            # Skip empty reviews
-            if not review_text:
-                continue
-            
-            # Get sentiment score
-            sentiment = sia.polarity_scores(review_text)
-            sentiment_multiplier = 0.5 + sentiment['compound'] * 0.5  # Range from 0 to 1
-            
-            # Simple keyword matching for properties
-            lower_text = review_text.lower()
-            
-            # Energy-related keywords
-            energy_keywords = ['energetic', 'vibrant', 'lively', 'dynamic', 'exciting', 'buzzing', 'pulsating']
-            energy_matches = sum(lower_text.count(keyword) for keyword in energy_keywords)
-            category_scores['energy'] += 0.1 * energy_matches * sentiment_multiplier
-            
-            # Calmness-related keywords
-            calm_keywords = ['calm', 'peaceful', 'serene', 'tranquil', 'quiet', 'relaxing', 'soothing']
-            calm_matches = sum(lower_text.count(keyword) for keyword in calm_keywords)
-            category_scores['calmness'] += 0.1 * calm_matches * sentiment_multiplier
-            
-            # Warmth-related keywords
-            warm_keywords = ['warm', 'cozy', 'inviting', 'welcoming', 'friendly', 'comfortable', 'homely']
-            warm_matches = sum(lower_text.count(keyword) for keyword in warm_keywords)
-            category_scores['warmth'] += 0.1 * warm_matches * sentiment_multiplier
-            
-            # Elegance-related keywords
-            elegant_keywords = ['elegant', 'sophisticated', 'refined', 'classy', 'upscale', 'luxurious', 'chic']
-            elegant_matches = sum(lower_text.count(keyword) for keyword in elegant_keywords)
-            category_scores['elegance'] += 0.1 * elegant_matches * sentiment_multiplier
-            
-            # Casual-related keywords
-            casual_keywords = ['casual', 'laid-back', 'relaxed', 'informal', 'easygoing', 'unpretentious', 'simple']
-            casual_matches = sum(lower_text.count(keyword) for keyword in casual_keywords)
-            category_scores['casual'] += 0.1 * casual_matches * sentiment_multiplier
-            
-            # Freshness-related keywords
-            fresh_keywords = ['fresh', 'clean', 'crisp', 'modern', 'new', 'contemporary', 'innovative']
-            fresh_matches = sum(lower_text.count(keyword) for keyword in fresh_keywords)
-            category_scores['freshness'] += 0.1 * fresh_matches * sentiment_multiplier
-            
-            # Authenticity-related keywords
-            authentic_keywords = ['authentic', 'genuine', 'real', 'original', 'traditional', 'classic', 'heritage']
-            authentic_matches = sum(lower_text.count(keyword) for keyword in authentic_keywords)
-            category_scores['authenticity'] += 0.1 * authentic_matches * sentiment_multiplier
-        
-        # Normalize scores
-        max_score = max(category_scores.values())
-        if max_score > 1.0:
-            for category in category_scores:
-                category_scores[category] /= max_score
-        
-        return category_scores
-    except Exception as e:
-        print(f"Error in analyze_reviews: {e}")
-        # Return safe default values
-        return {
-            'energy': 0.5, 'calmness': 0.5, 'warmth': 0.5, 
-            'elegance': 0.5, 'casual': 0.5, 'freshness': 0.5,
-            'authenticity': 0.5
-        }
-
-def generate_gradient(scores):
-    """Generate three distinct colors based on review analysis scores"""
-    try:
-        # If no scores, use default colors
-        if not scores or sum(scores.values()) == 0:
-            return {
-                'aura_color1': '#7B1FA2',  # Purple
-                'aura_color2': '#2196F3',  # Blue
-                'aura_color3': '#FF5722'   # Orange
-            }
-        
-        # Get top 3 categories by score
-        top_categories = sorted(scores.items(), key=lambda x: x[1], reverse=True)[:3]
-        
-        # Map categories to their corresponding colors
-        colors = []
-        for category, score in top_categories:
-            if category in BASE_COLORS:
-                # Use the color that matches the intensity of the score
-                color_index = min(int(score * len(BASE_COLORS[category])), len(BASE_COLORS[category]) - 1)
-                colors.append(BASE_COLORS[category][color_index])
-            else:
-                # If category not found, use a random color from any category
-                random_category = random.choice(list(BASE_COLORS.keys()))
-                colors.append(random.choice(BASE_COLORS[random_category]))
-        
-        # Ensure we have exactly 3 colors
-        while len(colors) < 3:
-            random_category = random.choice(list(BASE_COLORS.keys()))
-            colors.append(random.choice(BASE_COLORS[random_category]))
-        
-        return {
-            'aura_color1': colors[0],
-            'aura_color2': colors[1],
-            'aura_color3': colors[2]
-        }
-    except Exception as e:
-        print(f"Error in generate_gradient: {e}")
-        # Return safe default colors
-        return {
-            'aura_color1': '#7B1FA2',  # Purple
-            'aura_color2': '#2196F3',  # Blue
-            'aura_color3': '#FF5722'   # Orange
-        }
-
-def determine_vibe_type(vibe_scores):
-    """Determine the overall vibe type based on scores"""
-    try:
-        # Filter to only include valid vibe types
-        valid_scores = {k: v for k, v in vibe_scores.items() if k in VIBE_KEYWORDS}
-        
-        # Handle empty dictionary case
-        if not valid_scores:
-            return 'casual'  # Default to casual if no valid scores
-            
-        # Return the vibe with the highest score
-        vibe_type = max(valid_scores.items(), key=lambda x: x[1])[0]
-        return vibe_type
-    except Exception as e:
-        print(f"Error in determine_vibe_type: {e}")
-        return 'casual'  # Default to casual on error
-
-def determine_shape(rating):
-    """Determine aura shape based on rating"""
-    try:
-        if rating <= 2.0:
-            return "soft"  # Low energy, more relaxed
-        elif rating <= 3.0:
-            return "pulse"  # Moderate energy, steady
-        elif rating <= 4.0:
-            return "flowing"  # High energy, dynamic
-        else:
-            return "sparkle"  # Exceptional energy, vibrant
-    except Exception as e:
-        print(f"Error in determine_shape: {e}")
-        return "flowing"  # Default shape
-
 def create_test_user():
     """Create a test user if it doesn't exist"""
     user = User.query.filter_by(email='test@example.com').first()
@@ -510,13 +353,34 @@ def create_test_collection(user):
         db.session.commit()
     return collection
 
+def search_places(area, place_type):
+    """Stage 1: nearby search for one (area, place type) pair"""
+    params = {
+        'location': area['center'],
+        'radius': area['radius'],
+        'type': place_type,
+        'language': 'en'
+    }
+
+    def load():
+        places_rate_limiter.acquire()
+        return gmaps.places_nearby(**params)
+
+    places = places_cache.cached_places_call('search', 'places_nearby', params, load)
+    if not places or 'results' not in places:
+        return []
+    return places['results'][:MAX_LOCATIONS_PER_TYPE]
+
 def get_place_details(place_id):
-    """Get detailed information about a place from Google Maps API"""
+    """Stage 2: get detailed information about a place from Google Maps API"""
     try:
-        place_details = gmaps.place(place_id=place_id, fields=[
-            'name', 'formatted_address', 'geometry', 'rating', 'reviews', 
-            'type', 'formatted_phone_number', 'website', 'price_level', 'user_ratings_total'
-        ])
+        params = {'place_id': place_id, 'fields': PLACE_DETAILS_FIELDS}
+
+        def load():
+            places_rate_limiter.acquire()
+            return gmaps.place(**params)
+
+        place_details = places_cache.cached_places_call('details', 'place', params, load)
         
         if place_details and 'result' in place_details:
             return place_details['result']
@@ -525,168 +389,250 @@ def get_place_details(place_id):
         print(f"Error getting place details: {str(e)}")
         return None
 
-def create_aura(review_texts, avg_rating):
-    """Create an aura based on reviews and rating"""
+def build_location_record(place_id, place_details, area_name, place_type):
+    """
+    Stage 3: score a place's reviews into an aura and return the location
+    columns plus the reviews worth storing, or None if it has no reviews.
+    """
+    google_reviews = place_details.get('reviews', [])[:MAX_REVIEWS_PER_LOCATION]
+    if not google_reviews:
+        return None
+
+    review_texts = [review.get('text', '') for review in google_reviews]
+    aura = create_aura(review_texts, place_details.get('rating', 0))
+
+    # Only keep reviews that pass the Review model's validation
+    reviews = [
+        {'body': review['text'][:1000], 'rating': int(review['rating'])}
+        for review in google_reviews
+        if len(review.get('text') or '') >= 10 and 1 <= (review.get('rating') or 0) <= 5
+    ]
+
+    location = {
+        'google_place_id': place_id,
+        'name': place_details['name'],
+        'address': place_details.get('formatted_address', ''),
+        'latitude': place_details['geometry']['location']['lat'],
+        'longitude': place_details['geometry']['location']['lng'],
+        'place_type': place_type,
+        'area': area_name,
+        'rating': place_details.get('rating'),
+        'user_ratings_total': place_details.get('user_ratings_total'),
+        'price_level': place_details.get('price_level'),
+        'phone': place_details.get('formatted_phone_number'),
+        'website': place_details.get('website'),
+        'updated_at': datetime.utcnow(),
+        # Reviews are bulk inserted below, so set their aggregates up front
+        'review_count': len(reviews),
+        'avg_user_rating': sum(r['rating'] for r in reviews) / len(reviews) if reviews else None
+    }
+    location.update(aura_columns({
+        'name': aura['name'],
+        'color': review_aura_gradient(aura),
+        'shape': aura['shape']
+    }))
+    return {'location': location, 'reviews': reviews}
+
+def upsert_locations(rows):
+    """
+    INSERT ... ON CONFLICT (google_place_id) DO UPDATE for a batch of location
+    rows. Existing places get fresh details and aura, but keep their review
+    aggregates and creation time.
+    """
+    if db.engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as upsert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as upsert
+
+    statement = upsert(Location.__table__)
+    statement = statement.on_conflict_do_update(
+        index_elements=['google_place_id'],
+        set_={
+            column: statement.excluded[column]
+            for column in rows[0]
+            if column not in UPSERT_PRESERVED_COLUMNS
+        }
+    )
+    db.session.execute(statement, rows)
+
+def write_location_batch(records, author_id, checkpoints):
+    """
+    Stage 4: upsert a batch of locations, insert reviews for the new ones and
+    record finished (area, place_type) checkpoints, all in one transaction.
+    `checkpoints` maps (area name, place type) to the locations it added.
+    Returns the number of new locations, or None if the transaction failed.
+    """
     try:
-        # Analyze reviews to get vibe scores
-        vibe_scores = analyze_reviews(review_texts)
-        
-        # Generate three colors based on vibe scores
-        colors = generate_gradient(vibe_scores)
-        
-        # Determine shape based on rating
-        shape = determine_shape(avg_rating)
-        
-        # Determine the dominant vibe type
-        vibe_type = determine_vibe_type(vibe_scores)
-        
-        # Get keywords for the dominant vibe
-        keywords = VIBE_KEYWORDS.get(vibe_type, [])
-        if not keywords:
-            # If no keywords found, use the vibe type itself
-            aura_name = f"{vibe_type.capitalize()} Aura"
-        else:
-            # Use a random keyword from the vibe's keywords
-            aura_name = f"{vibe_type.capitalize()} {random.choice(keywords).capitalize()} Aura"
-        
-        return {
-            'name': aura_name,
-            'aura_color1': colors['aura_color1'],
-            'aura_color2': colors['aura_color2'],
-            'aura_color3': colors['aura_color3'],
-            'shape': shape
+        place_ids = [record['location']['google_place_id'] for record in records]
+        # Normally empty, since seed_database skips known places; guards against a concurrent seed
+        existing = {
+            place_id for (place_id,) in
+            db.session.query(Location.google_place_id).filter(Location.google_place_id.in_(place_ids))
         }
+        if records:
+            upsert_locations([record['location'] for record in records])
+
+        new_place_ids = [place_id for place_id in place_ids if place_id not in existing]
+        location_ids = dict(
+            db.session.query(Location.google_place_id, Location.id)
+            .filter(Location.google_place_id.in_(new_place_ids))
+        ) if new_place_ids else {}
+
+        review_rows = [
+            dict(review, location_id=location_ids[record['location']['google_place_id']], user_id=author_id)
+            for record in records
+            if record['location']['google_place_id'] in location_ids
+            for review in record['reviews']
+        ] if author_id else []
+        if review_rows:
+            db.session.execute(insert(Review), review_rows)
+
+        for (area_name, place_type), added in checkpoints.items():
+            db.session.add(SeedCheckpoint(area=area_name, place_type=place_type, locations_added=added))
+
+        db.session.commit()
+        return len(location_ids)
     except Exception as e:
-        print(f"Error in create_aura: {e}")
-        # Return default aura with casual vibe
-        return {
-            'name': 'Casual Relaxed Aura',
-            'aura_color1': '#7B1FA2',  # Purple
-            'aura_color2': '#2196F3',  # Blue
-            'aura_color3': '#FF5722',  # Orange
-            'shape': 'flowing'
-        }
+        db.session.rollback()
+        print(f"    Error writing batch of {len(records)} locations: {e}")
+        return None
+
+def seed_database(workers=FETCH_WORKERS, resume=True):
+    """
+    Seed the database with locations from Google Places API.
+
+    Runs as a pipeline: nearby searches and detail fetches share a bounded
+    thread pool (throttled by places_rate_limiter), each place is scored as
+    soon as its details arrive, and scored places are upserted in batches of
+    WRITE_BATCH_SIZE.
 
-def seed_database():
-    """Seed the database with locations from Google Places API"""
+    Every (area, place_type) search is checkpointed in the same transaction
+    as its last locations. With `resume`, a rerun skips checkpointed searches
+    and never fetches details for a place that is already stored, so an
+    interrupted seed picks up where it stopped.
+    """
     print("🌱 Seeding database with locations...")
-    
-    # Get all place types
-    place_types = PLACE_TYPES
-    
-    # Track total locations added
+    started = time.perf_counter()
+    cache = places_cache.places_cache
+    cache_hits, cache_misses = (cache.hits, cache.misses) if cache else (0, 0)
+
+    if not resume:
+        SeedCheckpoint.query.delete()
+        db.session.commit()
+
+    completed = set(db.session.query(SeedCheckpoint.area, SeedCheckpoint.place_type))
+    if completed:
+        print(f"  Resuming: skipping {len(completed)} finished searches")
+
+    # Seeded reviews are attributed to the first user (the test user)
+    author_id = db.session.query(func.min(User.id)).scalar()
+    if not author_id:
+        print("  No users found, Google reviews will only be used for scoring")
+
     total_locations = 0
-    
-    # Process each area
-    for area in NYC_AREAS:
-        print(f"\nProcessing area: {area['name']}")
-        
-        # Process each place type
-        for place_type in place_types:
-            print(f"  Searching for {place_type}s...")
-            
-            try:
-                # Search for places of this type in the area
-                places = gmaps.places_nearby(
-                    location=area['center'],
-                    radius=area['radius'],
-                    type=place_type,
-                    language='en'
-                )
-                
-                if not places or 'results' not in places:
-                    print(f"    No results found for {place_type} in {area['name']}")
-                    continue
-                
-                # Process each place
-                for place in places['results'][:MAX_LOCATIONS_PER_TYPE]:
+    # Places already stored are never fetched again
+    seen_place_ids = {
+        place_id for (place_id,) in
+        db.session.query(Location.google_place_id).filter(Location.google_place_id.isnot(None))
+    }
+    batch = []
+    outstanding = {}       # (area name, place type) -> detail fetches still running
+    added = {}             # (area name, place type) -> locations scored for it
+    failed = set()         # searches with a failed fetch; left unchecked so a rerun retries them
+    checkpoints = {}       # finished searches waiting for the next batch write
+
+    def finish(search_key):
+        if search_key not in failed:
+            checkpoints[search_key] = added.get(search_key, 0)
+
+    def write_batch():
+        nonlocal batch, checkpoints, total_locations
+        written = write_location_batch(batch, author_id, checkpoints)
+        if written is None:
+            # Nothing was stored: never checkpoint these searches, so a rerun
+            # retries them, and let a later search in this run fetch their places
+            for record in batch:
+                failed.add((record['location']['area'], record['location']['place_type']))
+                seen_place_ids.discard(record['location']['google_place_id'])
+            failed.update(checkpoints)
+        else:
+            total_locations += written
+        batch = []
+        checkpoints = {}
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = {
+            pool.submit(search_places, area, place_type): ('search', area, place_type, None)
+            for area in NYC_AREAS
+            for place_type in PLACE_TYPES
+            if (area['name'], place_type) not in completed
+        }
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, area, place_type, place = pending.pop(future)
+                search_key = (area['name'], place_type)
+
+                if stage == 'search':
                     try:
-                        # Get detailed place information
-                        place_details = get_place_details(place['place_id'])
-                        
-                        if not place_details:
-                            print(f"    Could not get details for place: {place.get('name', 'Unknown')}")
+                        results = future.result()
+                    except Exception as e:
+                        print(f"Error searching for {place_type} in {area['name']}: {str(e)}")
+                        continue
+                    if not results:
+                        print(f"    No results found for {place_type} in {area['name']}")
+                    else:
+                        print(f"  Found {len(results)} {place_type}s in {area['name']}")
+
+                    # Overlapping areas and types return the same places; fetch each once
+                    outstanding[search_key] = 0
+                    for result in results:
+                        if result['place_id'] in seen_place_ids:
                             continue
-                        
-                        # Skip locations without reviews
-                        if not place_details.get('reviews') or len(place_details.get('reviews', [])) == 0:
+                        seen_place_ids.add(result['place_id'])
+                        outstanding[search_key] += 1
+                        pending[pool.submit(get_place_details, result['place_id'])] = ('details', area, place_type, result)
+                    if not outstanding[search_key]:
+                        finish(search_key)
+                    continue
+
+                outstanding[search_key] -= 1
+                place_details = future.result()
+                if not place_details:
+                    print(f"    Could not get details for place: {place.get('name', 'Unknown')}")
+                    failed.add(search_key)
+                else:
+                    try:
+                        record = build_location_record(place['place_id'], place_details, area['name'], place_type)
+                        if record is None:
                             print(f"    Skipping {place_details.get('name', 'Unknown')} - No reviews")
-                            continue
-                        
-                        # Get review texts and average rating
-                        review_texts = [review['text'] for review in place_details.get('reviews', [])[:MAX_REVIEWS_PER_LOCATION]]
-                        avg_rating = place_details.get('rating', 0)
-                        
-                        # Print how many reviews were found
-                        print(f"    Processing {place_details.get('name', 'Unknown')} with {len(review_texts)} reviews")
-                        
-                        try:
-                            # Create aura based on reviews
-                            aura = create_aura(review_texts, avg_rating)
-                            
-                            # Create location
-                            location = Location(
-                                name=place_details['name'],
-                                address=place_details.get('formatted_address', ''),
-                                latitude=place_details['geometry']['location']['lat'],
-                                longitude=place_details['geometry']['location']['lng'],
-                                place_type=place_type,
-                                area=area['name'],
-                                aura_name=aura['name'],
-                                aura_color1=aura['aura_color1'],
-                                aura_color2=aura['aura_color2'],
-                                aura_color3=aura['aura_color3'],
-                                aura_shape=aura['shape']
-                            )
-                            
-                            # Add to database
-                            db.session.add(location)
-                            total_locations += 1
-                            
-                            # Add reviews to the database from Google Places API
-                            review_count = 0
-                            for i, review_data in enumerate(place_details.get('reviews', [])[:MAX_REVIEWS_PER_LOCATION]):
-                                try:
-                                    # Create a Review object with the first user (ID 1) as default
-                                    review = Review(
-                                        location_id=location.id,
-                                        user_id=1,  # Default to first user in database
-                                        body=review_data.get('text', ''),
-                                        rating=review_data.get('rating', 0)
-                                    )
-                                    db.session.add(review)
-                                    review_count += 1
-                                except Exception as re:
-                                    print(f"    Error creating review: {re}")
-                            
-                            print(f"    Added {review_count} reviews for {location.name}")
-                            
-                            # Commit periodically to avoid memory issues
-                            if total_locations % 10 == 0:
-                                db.session.commit()
-                                print(f"  Added {total_locations} locations so far...")
-                        except KeyError as ke:
-                            print(f"    KeyError in aura data for {place_details.get('name', 'Unknown')}: {ke}")
-                            continue
-                        except Exception as e:
-                            print(f"    Error processing aura data: {e}")
-                            continue
-                        
+                        else:
+                            batch.append(record)
+                            added[search_key] = added.get(search_key, 0) + 1
                     except Exception as e:
-                        print(f"Error processing place: {str(e)}")
-                        continue
-                
-            except Exception as e:
-                print(f"Error searching for {place_type} in {area['name']}: {str(e)}")
-                continue
-    
-    # Final commit
-    try:
-        db.session.commit()
-        print(f"\n✅ Successfully added {total_locations} locations!")
-    except Exception as e:
-        db.session.rollback()
-        print(f"\n❌ Error committing locations: {str(e)}")
+                        print(f"    Error processing {place_details.get('name', 'Unknown')}: {e}")
+                        failed.add(search_key)
+
+                # Every location of this search is now in `batch` or already written
+                if not outstanding[search_key]:
+                    finish(search_key)
+
+                if len(batch) >= WRITE_BATCH_SIZE:
+                    write_batch()
+                    print(f"  Added {total_locations} locations so far...")
+
+    if batch or checkpoints:
+        write_batch()
+
+    # The Core upserts skip the session hooks, and a running server is another
+    # process anyway: have it rebuild its location indexes
+    bump_generations('locations')
+
+    elapsed = time.perf_counter() - started
+    print(f"\n✅ Successfully added {total_locations} locations in {elapsed:.1f}s!")
+    if cache is not None:
+        print(f"  Places cache: {cache.hits - cache_hits} hits, {cache.misses - cache_misses} API calls")
 
 def create_sample_locations(user, collection):
     """Create sample locations if API fails"""
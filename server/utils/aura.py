@@ -0,0 +1,318 @@
+import os
+import time
+from collections import deque
+from datetime import datetime
+from multiprocessing import Pool
+from sqlalchemy import event, func, inspect, or_, update
+from server.extensions import db
+from server.models.location import Location
+from server.models.location_tag import location_tags
+from server.models.review import Review
+from server.models.tag import Tag
+from server.utils.aura_colors import parse_aura_colors, three_aura_colors
+from server.utils.aura_vectors import aura_vector, encode_aura_vector
+from server.utils.index_generation import bump_generations
+
+# Matches the seeder's MAX_REVIEWS_PER_LOCATION so rescoring sees the same input
+RESCORE_MAX_REVIEWS = 25
+
+# Columns the stored aura vector is derived from
+AURA_VECTOR_SOURCES = ('aura_color1', 'aura_color2', 'aura_color3', 'aura_shape')
+
+# The aura generators still emit the legacy shape names; the Location model
+# (and the client's AuraVisualization) only accept the new ones
+SHAPE_ALIASES = {
+    'soft': 'balanced',
+    'flow': 'flowing',
+    'pulse': 'pulsing',
+    'sparkle': 'sparkling'
+}
+
+DEFAULT_AURA = {
+    'name': 'Balanced Neutral',
+    'color': 'linear-gradient(to right, #009688, #80CBC4)',
+    'shape': 'balanced'
+}
+
+
+def normalize_shape(shape):
+    """Map legacy shape names onto the ones the Location model validates"""
+    if not shape:
+        return DEFAULT_AURA['shape']
+    shape = SHAPE_ALIASES.get(shape, shape)
+    return shape if shape in ('sparkling', 'flowing', 'pulsing', 'balanced') else DEFAULT_AURA['shape']
+
+
+def aura_columns(aura_data):
+    """
+    Convert an aura dict ({'name', 'color', 'shape'}) into the direct aura
+    columns stored on Location.
+    """
+    gradient = aura_data.get('color') or DEFAULT_AURA['color']
+    colors = three_aura_colors(gradient, blend=True) or three_aura_colors(DEFAULT_AURA['color'], blend=True)
+
+    shape = normalize_shape(aura_data.get('shape'))
+    return {
+        'aura_name': (aura_data.get('name') or DEFAULT_AURA['name'])[:100],
+        'aura_color': gradient,
+        'aura_color1': colors[0],
+        'aura_color2': colors[1],
+        'aura_color3': colors[2],
+        'aura_shape': shape,
+        'aura_vector': encode_aura_vector(aura_vector(colors[0], colors[1], colors[2], shape))
+    }
+
+
+def user_aura_vector(user):
+    """Vector for a user's aura, or None if they haven't picked one yet"""
+    colors = [c for c in (user.aura_color1, user.aura_color2, user.aura_color3) if c]
+    if not colors and user.aura_color:
+        colors = list(parse_aura_colors(user.aura_color))
+    if not colors:
+        return None
+    colors = colors + [colors[-1]] * (3 - len(colors))
+    return aura_vector(colors[0], colors[1], colors[2], normalize_shape(user.aura_shape))
+
+
+def generate_location_aura(name, place_type, rating):
+    """Generate aura columns for a location from its name, type and rating"""
+    # Imported here because discover_routes itself depends on this module
+    from server.routes.discover_routes import analyze_place_and_create_aura
+
+    return aura_columns(analyze_place_and_create_aura({
+        'name': name or '',
+        'types': [place_type] if place_type else [],
+        'rating': rating or 0
+    }))
+
+
+def missing_aura_filter():
+    """SQL condition matching locations whose direct aura columns are incomplete"""
+    return or_(
+        Location.aura_name.is_(None),
+        Location.aura_shape.is_(None),
+        Location.aura_color1.is_(None)
+    )
+
+
+def materialize_missing_vectors(batch_size=500):
+    """
+    Fill Location.aura_vector for locations that have aura columns but were
+    written before vectors existed. Returns the number of locations updated.
+    """
+    total = 0
+    last_id = 0
+    while True:
+        rows = (
+            db.session.query(
+                Location.id, Location.aura_color1, Location.aura_color2, Location.aura_color3, Location.aura_shape
+            )
+            .filter(Location.aura_vector.is_(None), Location.aura_color1.isnot(None), Location.id > last_id)
+            .order_by(Location.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            break
+
+        updates = [
+            {'id': location_id, 'aura_vector': encode_aura_vector(aura_vector(color1, color2, color3, shape))}
+            for location_id, color1, color2, color3, shape in rows
+        ]
+        db.session.execute(update(Location), updates)
+        db.session.commit()
+
+        total += len(updates)
+        last_id = rows[-1][0]
+        print(f"  Computed {total} aura vectors so far...")
+
+    # Bulk UPDATEs bypass the session events that keep the aura index in sync,
+    # and this usually runs from a CLI process, so signal the servers instead
+    if total:
+        bump_generations('locations')
+    return total
+
+
+def materialize_missing_auras(batch_size=500):
+    """
+    Fill the direct aura columns for every location that is missing them.
+
+    Locations that already have a legacy Tag keep that aura; the rest get a
+    freshly generated one. Rows are read as plain columns in keyset order and
+    written back with one executemany UPDATE per batch.
+    Returns the number of locations updated.
+    """
+    # First tag per location, so existing auras are copied rather than regenerated
+    first_tag = (
+        db.session.query(location_tags.c.location_id, func.min(location_tags.c.tag_id).label('tag_id'))
+        .group_by(location_tags.c.location_id)
+        .subquery()
+    )
+
+    total = 0
+    last_id = 0
+    while True:
+        rows = (
+            db.session.query(
+                Location.id, Location.name, Location.place_type, Location.rating,
+                Tag.name, Tag.color, Tag.shape
+            )
+            .outerjoin(first_tag, first_tag.c.location_id == Location.id)
+            .outerjoin(Tag, Tag.id == first_tag.c.tag_id)
+            .filter(missing_aura_filter(), Location.id > last_id)
+            .order_by(Location.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            break
+
+        now = datetime.utcnow()
+        updates = []
+        for location_id, name, place_type, rating, tag_name, tag_color, tag_shape in rows:
+            if tag_name and tag_color:
+                columns = aura_columns({'name': tag_name, 'color': tag_color, 'shape': tag_shape})
+            else:
+                columns = generate_location_aura(name, place_type, rating)
+            columns['id'] = location_id
+            columns['updated_at'] = now
+            updates.append(columns)
+
+        db.session.execute(update(Location), updates)
+        db.session.commit()
+
+        total += len(updates)
+        last_id = rows[-1][0]
+        print(f"  Materialized {total} auras so far...")
+
+    # Bulk UPDATEs bypass the session events that keep the aura index in sync,
+    # and this usually runs from a CLI process, so signal the servers instead
+    if total:
+        bump_generations('locations')
+    return total
+
+
+def iter_rescore_chunks(chunk_size):
+    """
+    Yield [(location_id, review_texts, rating), ...] for reviewed locations in
+    keyset order, loading one chunk of locations and their reviews at a time.
+    Reviewed means having a review row, not a positive review_count, which is
+    zero until `flask locations backfill-review-stats` has run.
+    """
+    has_reviews = db.session.query(Review.id).filter(Review.location_id == Location.id).exists()
+    last_id = 0
+    while True:
+        rows = (
+            db.session.query(Location.id, Location.rating, Location.avg_user_rating)
+            .filter(has_reviews, Location.id > last_id)
+            .order_by(Location.id)
+            .limit(chunk_size)
+            .all()
+        )
+        if not rows:
+            return
+
+        ids = [row[0] for row in rows]
+        reviews = {}
+        for location_id, body in (
+            db.session.query(Review.location_id, Review.body)
+            .filter(Review.location_id.in_(ids))
+            .order_by(Review.location_id, Review.id)
+        ):
+            reviews.setdefault(location_id, []).append(body)
+
+        yield [
+            (location_id, reviews.get(location_id, [])[:RESCORE_MAX_REVIEWS],
+             rating if rating is not None else avg_user_rating)
+            for location_id, rating, avg_user_rating in rows
+        ]
+        last_id = ids[-1]
+
+
+def rescore_auras(chunk_size=200, workers=None):
+    """
+    Recompute the review-based aura of every reviewed location.
+
+    Chunks are read in the main process and scored by a pool of worker
+    processes; a bounded number of chunks is kept in flight so memory stays
+    flat. Each scored chunk is written back with one executemany UPDATE.
+    Locations without reviews keep their current aura.
+    Returns the number of locations updated.
+    """
+    # NLTK is slow to import, so only pull it in for this command
+    from server.utils.review_aura import review_aura_gradient, score_location_chunk
+
+    workers = workers or os.cpu_count() or 1
+    started = time.perf_counter()
+    total = 0
+
+    def write(scored):
+        nonlocal total
+        now = datetime.utcnow()
+        updates = []
+        for location_id, aura in scored:
+            columns = aura_columns({
+                'name': aura['name'],
+                'color': review_aura_gradient(aura),
+                'shape': aura['shape']
+            })
+            columns['id'] = location_id
+            columns['updated_at'] = now
+            updates.append(columns)
+        if updates:
+            db.session.execute(update(Location), updates)
+            db.session.commit()
+        total += len(updates)
+        elapsed = time.perf_counter() - started
+        print(f"  Rescored {total} locations ({total / elapsed:.0f}/s)")
+
+    if workers == 1:
+        for chunk in iter_rescore_chunks(chunk_size):
+            write(score_location_chunk(chunk))
+    else:
+        # All database access stays in this process; workers only run the NLP
+        with Pool(workers) as pool:
+            in_flight = deque()
+            for chunk in iter_rescore_chunks(chunk_size):
+                in_flight.append(pool.apply_async(score_location_chunk, (chunk,)))
+                if len(in_flight) >= workers * 2:
+                    write(in_flight.popleft().get())
+            while in_flight:
+                write(in_flight.popleft().get())
+
+    # Bulk UPDATEs bypass the session events that keep the aura index in sync,
+    # and this usually runs from a CLI process, so signal the servers instead
+    if total:
+        bump_generations('locations')
+    return total
+
+
+def _refresh_aura_vector(target):
+    target.aura_vector = encode_aura_vector(aura_vector(
+        target.aura_color1, target.aura_color2, target.aura_color3, target.aura_shape
+    ))
+
+
+@event.listens_for(Location, 'before_insert')
+def _materialize_aura_on_insert(mapper, connection, target):
+    """Give every new location its aura at write time so reads never have to"""
+    if target.aura_name and target.aura_shape and target.aura_color1:
+        _refresh_aura_vector(target)
+        return
+    if target.aura_color and target.aura_name:
+        # Caller supplied a gradient, just derive the missing columns from it
+        columns = aura_columns({'name': target.aura_name, 'color': target.aura_color, 'shape': target.aura_shape})
+    else:
+        columns = generate_location_aura(target.name, target.place_type, target.rating)
+    for key, value in columns.items():
+        if not getattr(target, key):
+            setattr(target, key, value)
+    _refresh_aura_vector(target)
+
+
+@event.listens_for(Location, 'before_update')
+def _refresh_aura_vector_on_update(mapper, connection, target):
+    """Keep the stored vector in step when a location's aura colors or shape change"""
+    state = inspect(target)
+    if any(state.attrs[key].history.has_changes() for key in AURA_VECTOR_SOURCES):
+        _refresh_aura_vector(target)
@@ -0,0 +1,46 @@
+import re
+from functools import lru_cache
+
+HEX_COLOR_PATTERN = re.compile(r'#[0-9A-Fa-f]{6}|#[0-9A-Fa-f]{3}')
+
+# Aura gradients come from a small palette, so a few thousand entries
+# covers practically every string we serve
+AURA_COLOR_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=AURA_COLOR_CACHE_SIZE)
+def parse_aura_colors(gradient):
+    """Return the hex colors in an aura gradient string as a tuple"""
+    if not gradient:
+        return ()
+    return tuple(HEX_COLOR_PATTERN.findall(gradient))
+
+
+@lru_cache(maxsize=AURA_COLOR_CACHE_SIZE)
+def three_aura_colors(gradient, blend=False):
+    """
+    Return exactly three colors for a gradient, or () if it has none.
+    A missing third color is a blend of the first two when `blend` is set,
+    otherwise the last color is repeated.
+    """
+    colors = parse_aura_colors(gradient)
+    if not colors:
+        return ()
+    if len(colors) == 1:
+        return colors * 3
+    if len(colors) == 2:
+        third = blend_colors(colors[0], colors[1]) if blend else colors[1]
+        return colors + (third,)
+    return colors[:3]
+
+
+def blend_colors(color1, color2):
+    """Average two hex colors"""
+    color1 = color1.lstrip('#')
+    color2 = color2.lstrip('#')
+    if len(color1) == 3:
+        color1 = ''.join(c*2 for c in color1)
+    if len(color2) == 3:
+        color2 = ''.join(c*2 for c in color2)
+    channels = [(int(color1[i:i+2], 16) + int(color2[i:i+2], 16)) // 2 for i in (0, 2, 4)]
+    return '#{:02x}{:02x}{:02x}'.format(*channels)
@@ -0,0 +1,198 @@
+import heapq
+import threading
+import numpy as np
+from sklearn.neighbors import BallTree
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from server.extensions import db
+from server.models.location import Location
+from server.utils.aura_vectors import AURA_VECTOR_SIZE, aura_similarity, decode_aura_vectors
+from server.utils.index_generation import GenerationWatch
+
+# Scale applied to the one-hot shape columns inside the tree, so a shape
+# mismatch costs about as much as a moderate color difference
+SHAPE_TREE_WEIGHT = 0.5
+
+# The tree only approximates aura_similarity, so fetch a few extra
+# neighbours and rescore them exactly
+CANDIDATE_FACTOR = 4
+
+# Inserts/updates/removals buffered on top of the tree before it is rebuilt
+REBUILD_THRESHOLD = 256
+
+
+class AuraIndex:
+    """
+    Nearest-neighbour index over location aura vectors.
+
+    A BallTree holds the bulk of the vectors. Since a BallTree can't be
+    modified in place, writes made after it was built go into a small
+    overlay (`pending` for new vectors, `removed` to mask stale tree rows)
+    that is scanned exactly on each query, and the tree is rebuilt once the
+    overlay grows past REBUILD_THRESHOLD.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.loaded = False
+        # Bumped by bulk aura writes from CLI commands and the seeder
+        self.generation = GenerationWatch('locations')
+        self.clear()
+
+    def __len__(self):
+        return len(self.ids) - len(self.removed) + len(self.pending)
+
+    def clear(self):
+        with self.lock:
+            self.tree = None
+            self.ids = np.zeros(0, dtype=np.int64)
+            self.vectors = np.zeros((0, AURA_VECTOR_SIZE), dtype=np.float32)
+            self.id_set = set()
+            self.pending = {}     # location_id -> vector written since the last build
+            self.removed = set()  # location_ids whose tree rows are stale
+
+    def _tree_points(self, vectors):
+        points = vectors.astype(np.float64)
+        points[:, 9:] *= SHAPE_TREE_WEIGHT
+        return points
+
+    def build(self, ids, vectors):
+        """Replace the index contents with `ids` and their (n, AURA_VECTOR_SIZE) vectors"""
+        with self.lock:
+            self.clear()
+            self.ids = np.asarray(ids, dtype=np.int64)
+            self.vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, AURA_VECTOR_SIZE)
+            self.id_set = set(self.ids.tolist())
+            if len(self.ids):
+                self.tree = BallTree(self._tree_points(self.vectors))
+
+    def ensure_loaded(self):
+        if self.loaded and self.generation.stale():
+            print("Locations changed in another process, rebuilding the aura index")
+            self.invalidate()
+        if self.loaded:
+            return
+        with self.lock:
+            if self.loaded:
+                return
+            self.generation.mark()
+            rows = (
+                db.session.query(Location.id, Location.aura_vector)
+                .filter(Location.aura_vector.isnot(None))
+                .all()
+            )
+            self.build([row[0] for row in rows], decode_aura_vectors([row[1] for row in rows]))
+            self.loaded = True
+            print(f"Aura index built with {len(rows)} locations")
+
+    def invalidate(self):
+        """Drop the index so the next query rebuilds it from the database"""
+        with self.lock:
+            self.clear()
+            self.loaded = False
+
+    def upsert(self, location_id, vector):
+        with self.lock:
+            if location_id in self.id_set:
+                self.removed.add(location_id)
+            self.pending[location_id] = np.asarray(vector, dtype=np.float32)
+            self._maybe_rebuild()
+
+    def remove(self, location_id):
+        with self.lock:
+            if location_id in self.id_set:
+                self.removed.add(location_id)
+            self.pending.pop(location_id, None)
+            self._maybe_rebuild()
+
+    def _maybe_rebuild(self):
+        if len(self.pending) + len(self.removed) <= REBUILD_THRESHOLD:
+            return
+        keep = np.fromiter(
+            (location_id not in self.removed for location_id in self.ids.tolist()),
+            dtype=bool, count=len(self.ids)
+        )
+        ids = np.concatenate([self.ids[keep], np.fromiter(self.pending.keys(), dtype=np.int64)])
+        vectors = np.vstack([self.vectors[keep]] + list(self.pending.values()))
+        self.build(ids, vectors)
+
+    def query(self, user_vector, k=10):
+        """Return [(location_id, similarity), ...] for the k most aura-similar locations"""
+        self.ensure_loaded()
+        user_vector = np.asarray(user_vector, dtype=np.float32)
+
+        with self.lock:
+            candidate_ids = []
+            candidate_vectors = []
+
+            if self.tree is not None:
+                # Over-fetch enough to survive masked rows, then rescore exactly
+                fetch = min(len(self.ids), k * CANDIDATE_FACTOR + len(self.removed))
+                query_point = self._tree_points(user_vector.reshape(1, -1))
+                _, positions = self.tree.query(query_point, k=fetch)
+                for position in positions[0].tolist():
+                    location_id = int(self.ids[position])
+                    if location_id not in self.removed:
+                        candidate_ids.append(location_id)
+                        candidate_vectors.append(self.vectors[position])
+
+            # The overlay is small, score all of it
+            for location_id, vector in self.pending.items():
+                candidate_ids.append(location_id)
+                candidate_vectors.append(vector)
+
+        if not candidate_ids:
+            return []
+        scores = aura_similarity(user_vector, np.vstack(candidate_vectors)).tolist()
+        return heapq.nlargest(k, zip(candidate_ids, scores), key=lambda pair: pair[1])
+
+
+aura_index = AuraIndex()
+
+
+# Same flush/commit/rollback bookkeeping as the spatial index, so only
+# committed aura changes reach the tree
+@event.listens_for(Session, 'after_flush')
+def _collect_aura_changes(session, flush_context):
+    pending = session.info.setdefault('aura_index_changes', {})
+    for obj in session.new:
+        if isinstance(obj, Location) and obj.id is not None and obj.aura_vector is not None:
+            pending[obj.id] = obj.aura_vector
+    for obj in session.dirty:
+        # Edits that leave the vector alone (ratings, addresses, ...) must not
+        # churn the overlay and force rebuilds
+        if (isinstance(obj, Location) and obj.id is not None and obj.aura_vector is not None
+                and inspect(obj).attrs.aura_vector.history.has_changes()):
+            pending[obj.id] = obj.aura_vector
+    for obj in session.deleted:
+        if isinstance(obj, Location) and obj.id is not None:
+            pending[obj.id] = None
+
+
+def record_inserted_locations(session, locations):
+    """
+    Queue locations written with a bulk INSERT ... RETURNING for the index.
+    Those rows never pass through session.new and have no attribute history,
+    so the flush hook above can't see them.
+    """
+    pending = session.info.setdefault('aura_index_changes', {})
+    for location in locations:
+        if location.aura_vector is not None:
+            pending[location.id] = location.aura_vector
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_aura_changes(session):
+    pending = session.info.pop('aura_index_changes', None)
+    if not pending or not aura_index.loaded:
+        return
+    for location_id, blob in pending.items():
+        if blob is None:
+            aura_index.remove(location_id)
+        else:
+            aura_index.upsert(location_id, decode_aura_vectors([blob])[0])
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_aura_changes(session):
+    session.info.pop('aura_index_changes', None)
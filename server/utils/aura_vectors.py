@@ -0,0 +1,88 @@
+import heapq
+import numpy as np
+
+# Shapes in vector order; matches the values the Location and User models accept
+AURA_SHAPES = ('sparkling', 'flowing', 'pulsing', 'balanced')
+
+# Three RGB colors scaled to 0..1, followed by a one-hot shape
+AURA_VECTOR_SIZE = 9 + len(AURA_SHAPES)
+AURA_VECTOR_DTYPE = np.float32
+
+# Weights carried over from the original string-based similarity
+COLOR_WEIGHT = 0.6
+SHAPE_WEIGHT = 0.4
+SHAPE_MISMATCH_SIMILARITY = 0.5
+
+# Largest possible distance between two RGB colors in the unit cube
+MAX_COLOR_DISTANCE = np.sqrt(3.0)
+
+
+def hex_to_rgb(color):
+    """Convert '#RRGGBB' or '#RGB' into three floats between 0 and 1"""
+    color = (color or '').lstrip('#')
+    if len(color) == 3:
+        color = ''.join(c*2 for c in color)
+    if len(color) != 6:
+        return (0.0, 0.0, 0.0)
+    return tuple(int(color[i:i+2], 16) / 255.0 for i in (0, 2, 4))
+
+
+def aura_vector(color1, color2, color3, shape):
+    """Build the float32 vector for an aura from its three hex colors and shape"""
+    colors = [c for c in (color1, color2, color3) if c]
+    if not colors:
+        colors = ['#000000']
+    # Repeat the last color so auras with fewer than three colors still compare
+    while len(colors) < 3:
+        colors.append(colors[-1])
+
+    vector = np.zeros(AURA_VECTOR_SIZE, dtype=AURA_VECTOR_DTYPE)
+    for i, color in enumerate(colors[:3]):
+        vector[i*3:i*3+3] = hex_to_rgb(color)
+    if shape in AURA_SHAPES:
+        vector[9 + AURA_SHAPES.index(shape)] = 1.0
+    return vector
+
+
+def encode_aura_vector(vector):
+    """Serialize a vector for the Location.aura_vector column"""
+    return np.asarray(vector, dtype=AURA_VECTOR_DTYPE).tobytes()
+
+
+def decode_aura_vectors(blobs):
+    """Turn a list of stored vectors into an (n, AURA_VECTOR_SIZE) matrix with one copy"""
+    if not blobs:
+        return np.zeros((0, AURA_VECTOR_SIZE), dtype=AURA_VECTOR_DTYPE)
+    return np.frombuffer(b''.join(blobs), dtype=AURA_VECTOR_DTYPE).reshape(-1, AURA_VECTOR_SIZE)
+
+
+def aura_similarity(user_vector, matrix):
+    """
+    Score every row of `matrix` against `user_vector` in one pass.
+    Returns an array of similarities between 0 and 1, where 1 is a perfect match.
+    """
+    user_vector = np.asarray(user_vector, dtype=AURA_VECTOR_DTYPE)
+    colors = matrix[:, :9].reshape(-1, 3, 3)
+    user_colors = user_vector[:9].reshape(1, 3, 3)
+
+    # Mean per-color distance, so all three gradient stops count
+    color_distance = np.sqrt(((colors - user_colors) ** 2).sum(axis=2)).mean(axis=1)
+    color_similarity = 1.0 - color_distance / MAX_COLOR_DISTANCE
+
+    same_shape = matrix[:, 9:] @ user_vector[9:]
+    shape_similarity = np.where(same_shape > 0, 1.0, SHAPE_MISMATCH_SIMILARITY)
+
+    return COLOR_WEIGHT * color_similarity + SHAPE_WEIGHT * shape_similarity
+
+
+def rank_by_aura(user_vector, ids, matrix, k=None):
+    """
+    Return [(id, score), ...] for the `k` best aura matches, best first.
+    Uses a heap so only the top k are ever sorted.
+    """
+    if len(ids) == 0:
+        return []
+    scores = aura_similarity(user_vector, matrix).tolist()
+    if k is None or k >= len(ids):
+        k = len(ids)
+    return heapq.nlargest(k, zip(ids, scores), key=lambda pair: pair[1])
@@ -0,0 +1,87 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobQueue:
+    """
+    In-process runner for slow work (OpenAI calls) that shouldn't hold a
+    request worker. Jobs run on a bounded thread pool and their results are
+    kept for `result_ttl` seconds so clients can poll for them. Jobs only
+    live in the process that accepted them.
+    """
+
+    def __init__(self, max_workers=4, result_ttl=600):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ora-job')
+        self.result_ttl = result_ttl
+        self.lock = threading.Lock()
+        self.jobs = {}  # job id -> status dict
+
+    def submit(self, fn, *args, owner=None, **kwargs):
+        job_id = uuid.uuid4().hex
+        with self.lock:
+            self._prune()
+            self.jobs[job_id] = {
+                'id': job_id,
+                'owner': owner,
+                'status': 'pending',
+                'result': None,
+                'error': None,
+                'created_at': time.time(),
+                'finished_at': None
+            }
+        self.executor.submit(self._run, job_id, fn, args, kwargs)
+        return job_id
+
+    def get(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def _run(self, job_id, fn, args, kwargs):
+        self._update(job_id, status='running')
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            print(f"Background job {job_id} failed: {e}")
+            self._update(job_id, status='failed', error=str(e), finished_at=time.time())
+        else:
+            self._update(job_id, status='done', result=result, finished_at=time.time())
+
+    def _update(self, job_id, **changes):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job:
+                job.update(changes)
+
+    def _prune(self):
+        cutoff = time.time() - self.result_ttl
+        expired = [job_id for job_id, job in self.jobs.items() if job['finished_at'] and job['finished_at'] < cutoff]
+        for job_id in expired:
+            del self.jobs[job_id]
+
+
+# Set up by init_job_queue()
+job_queue = None
+
+
+def init_job_queue(app):
+    global job_queue
+
+    # Apps created later in the same process (tests, CLI) reuse the running pool
+    if job_queue is None:
+        job_queue = JobQueue(
+            max_workers=app.config.get('BACKGROUND_JOB_WORKERS', 4),
+            result_ttl=app.config.get('BACKGROUND_JOB_RESULT_TTL', 600)
+        )
+
+
+def submit_job(fn, *args, owner=None, **kwargs):
+    """Queue `fn(*args, **kwargs)` and return the job id"""
+    return job_queue.submit(fn, *args, owner=owner, **kwargs)
+
+
+def get_job(job_id):
+    """Snapshot of a job ('pending', 'running', 'done' or 'failed'), or None"""
+    return job_queue.get(job_id) if job_queue else None
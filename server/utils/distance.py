@@ -0,0 +1,69 @@
+import math
+import numpy as np
+
+EARTH_RADIUS_M = 6371000  # Mean radius of the earth in meters
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """Great circle distance in meters between two points given in decimal degrees"""
+    lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
+    dlon = lon2 - lon1
+    dlat = lat2 - lat1
+    a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
+    return 2 * math.asin(math.sqrt(a)) * EARTH_RADIUS_M
+
+
+def haversine_distances(latitude, longitude, lats, lngs):
+    """
+    Distance in meters from one point to every point in `lats`/`lngs`,
+    computed in a single vectorized pass. Returns a float64 array.
+    """
+    lats = np.radians(np.asarray(lats, dtype=np.float64))
+    lngs = np.radians(np.asarray(lngs, dtype=np.float64))
+    lat0 = math.radians(latitude)
+    lng0 = math.radians(longitude)
+
+    a = np.sin((lats - lat0) / 2) ** 2 + math.cos(lat0) * np.cos(lats) * np.sin((lngs - lng0) / 2) ** 2
+    # Clip guards against tiny rounding errors pushing a above 1
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def within_radius(latitude, longitude, lats, lngs, radius):
+    """
+    Return (positions, distances) for the points within `radius` meters,
+    where positions index into the input arrays.
+    """
+    distances = haversine_distances(latitude, longitude, lats, lngs)
+    positions = np.flatnonzero(distances <= radius)
+    return positions, distances[positions]
+
+
+class CoordinateArray:
+    """
+    Location ids and coordinates packed into contiguous float64 arrays so
+    distance filtering runs as one NumPy pass instead of a Python loop.
+    """
+
+    def __init__(self, ids=(), lats=(), lngs=()):
+        self.ids = np.ascontiguousarray(ids, dtype=np.int64)
+        self.lats = np.ascontiguousarray(lats, dtype=np.float64)
+        self.lngs = np.ascontiguousarray(lngs, dtype=np.float64)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build from an iterable of (id, latitude, longitude) rows"""
+        rows = list(rows)
+        if not rows:
+            return cls()
+        ids, lats, lngs = zip(*rows)
+        return cls(ids, lats, lngs)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def query_radius(self, latitude, longitude, radius):
+        """Return {location_id: distance_in_meters} for every point within `radius` meters"""
+        if not len(self.ids):
+            return {}
+        positions, distances = within_radius(latitude, longitude, self.lats, self.lngs, radius)
+        return dict(zip(self.ids[positions].tolist(), distances.tolist()))
@@ -0,0 +1,27 @@
+import hashlib
+from functools import wraps
+from flask import request
+
+
+def version_etag(*parts):
+    """ETag derived from a response's cache key rather than its body"""
+    return hashlib.sha1('|'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def conditional_get(view):
+    """
+    Flask-RESTful Api decorator adding ETag / If-None-Match support to GETs.
+
+    Resources wrapped in cached_response already set a version-based ETag
+    and answer matching requests with a 304 before building anything. For
+    every other resource the ETag is a hash of the serialized body, which
+    still saves the client from downloading an unchanged payload.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        response = view(*args, **kwargs)
+        if request.method != 'GET' or response.status_code != 200 or response.direct_passthrough:
+            return response
+        response.add_etag()  # no-op when the resource already set one
+        return response.make_conditional(request)
+    return wrapper
@@ -0,0 +1,158 @@
+import threading
+import numpy as np
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, attributes
+from server.extensions import db
+from server.models.user import User, friendships
+
+EMPTY_IDS = np.zeros(0, dtype=np.int64)
+
+# How many friend-of-friend suggestions to return by default
+SUGGESTION_LIMIT = 20
+
+
+class FriendGraph:
+    """
+    In-memory adjacency index over the friendships table.
+
+    Each user maps to a sorted int64 array of the ids in their
+    `friendships.friend_id` rows, so friend lists are a dict lookup, mutual
+    friends an array intersection and friend-of-friend suggestions one
+    concatenate + unique over the friends' arrays. Committed friendship
+    changes are applied in place by the session hooks below.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.loaded = False
+        self.adjacency = {}
+
+    def __len__(self):
+        return sum(len(ids) for ids in self.adjacency.values())
+
+    def build(self, user_ids, friend_ids):
+        """Replace the graph with the directed edges user_ids[i] -> friend_ids[i]"""
+        user_ids = np.asarray(user_ids, dtype=np.int64)
+        friend_ids = np.asarray(friend_ids, dtype=np.int64)
+        order = np.lexsort((friend_ids, user_ids))
+        user_ids, friend_ids = user_ids[order], friend_ids[order]
+        owners, starts = np.unique(user_ids, return_index=True)
+        with self.lock:
+            self.adjacency = {
+                int(owner): ids.copy()
+                for owner, ids in zip(owners.tolist(), np.split(friend_ids, starts[1:]))
+            }
+
+    def ensure_loaded(self):
+        if self.loaded:
+            return
+        with self.lock:
+            if self.loaded:
+                return
+            rows = db.session.execute(select(friendships.c.user_id, friendships.c.friend_id)).all()
+            self.build([row[0] for row in rows], [row[1] for row in rows])
+            self.loaded = True
+            print(f"Friend graph built with {len(rows)} friendships")
+
+    def invalidate(self):
+        """Drop the graph so the next query rebuilds it from the database"""
+        with self.lock:
+            self.adjacency = {}
+            self.loaded = False
+
+    def add(self, user_id, friend_id):
+        with self.lock:
+            ids = self.adjacency.get(user_id, EMPTY_IDS)
+            position = np.searchsorted(ids, friend_id)
+            if position < len(ids) and ids[position] == friend_id:
+                return
+            self.adjacency[user_id] = np.insert(ids, position, friend_id)
+
+    def remove(self, user_id, friend_id):
+        with self.lock:
+            ids = self.adjacency.get(user_id, EMPTY_IDS)
+            position = np.searchsorted(ids, friend_id)
+            if position == len(ids) or ids[position] != friend_id:
+                return
+            ids = np.delete(ids, position)
+            if len(ids):
+                self.adjacency[user_id] = ids
+            else:
+                del self.adjacency[user_id]
+
+    def friends(self, user_id):
+        """Sorted array of the user's friend ids"""
+        self.ensure_loaded()
+        return self.adjacency.get(user_id, EMPTY_IDS)
+
+    def are_friends(self, user_id, other_id):
+        ids = self.friends(user_id)
+        position = np.searchsorted(ids, other_id)
+        return bool(position < len(ids) and ids[position] == other_id)
+
+    def mutual_friends(self, user_id, other_id):
+        """Sorted array of the ids both users are friends with"""
+        return np.intersect1d(self.friends(user_id), self.friends(other_id), assume_unique=True)
+
+    def suggestions(self, user_id, limit=SUGGESTION_LIMIT):
+        """
+        Friends of the user's friends who aren't already friends, as
+        [(user_id, mutual_friend_count), ...] with the most shared friends first
+        """
+        friend_ids = self.friends(user_id)
+        with self.lock:
+            reachable = [self.adjacency.get(friend_id, EMPTY_IDS) for friend_id in friend_ids.tolist()]
+        if not reachable:
+            return []
+        candidates, counts = np.unique(np.concatenate(reachable), return_counts=True)
+        keep = ~np.isin(candidates, friend_ids, assume_unique=True) & (candidates != user_id)
+        candidates, counts = candidates[keep], counts[keep]
+        # Most mutual friends first, lower ids breaking ties
+        order = np.lexsort((candidates, -counts))[:limit]
+        return list(zip(candidates[order].tolist(), counts[order].tolist()))
+
+
+friend_graph = FriendGraph()
+
+
+# Friendship rows are written through the dynamic User.friends relationship,
+# whose history is only readable before the flush. Collect the linked
+# objects there, resolve their ids once the flush has assigned them, and
+# apply them to the graph only after the transaction commits.
+@event.listens_for(Session, 'before_flush')
+def _collect_friendship_links(session, flush_context, instances):
+    links = session.info.setdefault('friend_graph_links', [])
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, User):
+            continue
+        # Passive, so updating a user doesn't load their whole friend list
+        history = attributes.get_history(obj, 'friends', passive=attributes.PASSIVE_NO_INITIALIZE)
+        links.extend((True, obj, friend) for friend in history.added)
+        links.extend((False, obj, friend) for friend in history.deleted)
+
+
+@event.listens_for(Session, 'after_flush')
+def _resolve_friendship_links(session, flush_context):
+    links = session.info.pop('friend_graph_links', None)
+    if not links:
+        return
+    changes = session.info.setdefault('friend_graph_changes', [])
+    changes.extend((added, user.id, friend.id) for added, user, friend in links)
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_friendship_changes(session):
+    changes = session.info.pop('friend_graph_changes', None)
+    if not changes or not friend_graph.loaded:
+        return
+    for added, user_id, friend_id in changes:
+        if added:
+            friend_graph.add(user_id, friend_id)
+        else:
+            friend_graph.remove(user_id, friend_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_friendship_changes(session):
+    session.info.pop('friend_graph_links', None)
+    session.info.pop('friend_graph_changes', None)
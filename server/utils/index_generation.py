@@ -0,0 +1,63 @@
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import select, update
+from server.extensions import db
+from server.models.index_generation import IndexGeneration
+
+# Seconds between generation checks in a serving process, i.e. how long an
+# in-memory index may lag behind a CLI command or seed run
+GENERATION_CHECK_INTERVAL = 5
+
+
+def read_generation(name):
+    # Housekeeping read, kept out of the per-endpoint query budgets
+    generation = db.session.execute(
+        select(IndexGeneration.generation).where(IndexGeneration.name == name),
+        execution_options={'query_budget_exempt': True}
+    ).scalar()
+    return generation or 0
+
+
+def bump_generations(*names):
+    """
+    Make every process rebuild its in-memory indexes over the `names` tables.
+    Call after writes the session hooks can't see: bulk UPDATEs, Core
+    upserts, and anything run from a CLI command, whose process is not the
+    one serving requests. Commits.
+    """
+    now = datetime.utcnow()
+    for name in names:
+        result = db.session.execute(
+            update(IndexGeneration)
+            .where(IndexGeneration.name == name)
+            .values(generation=IndexGeneration.generation + 1, updated_at=now)
+        )
+        if result.rowcount == 0:
+            db.session.add(IndexGeneration(name=name, generation=1, updated_at=now))
+    db.session.commit()
+
+
+class GenerationWatch:
+    """Tells an in-memory index when another process changed its table"""
+
+    def __init__(self, name):
+        self.name = name
+        self.lock = threading.Lock()
+        self.seen = None
+        self.checked_at = 0.0
+
+    def mark(self):
+        """Remember the current generation; call right before loading the index"""
+        with self.lock:
+            self.seen = read_generation(self.name)
+            self.checked_at = time.monotonic()
+
+    def stale(self):
+        """True if the generation moved since mark(), checked at most every GENERATION_CHECK_INTERVAL"""
+        with self.lock:
+            now = time.monotonic()
+            if self.seen is None or now - self.checked_at < GENERATION_CHECK_INTERVAL:
+                return False
+            self.checked_at = now
+            return read_generation(self.name) != self.seen
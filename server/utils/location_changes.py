@@ -0,0 +1,34 @@
+from datetime import datetime, timezone
+from sqlalchemy import event, insert
+from server.models.location import Location
+from server.models.location_tombstone import LocationTombstone
+
+tombstones_table = LocationTombstone.__table__
+
+
+@event.listens_for(Location, 'after_delete')
+def _record_location_tombstone(mapper, connection, target):
+    """Leave a tombstone for every deleted location, in the same transaction"""
+    connection.execute(
+        insert(tombstones_table).values(location_id=target.id, deleted_at=datetime.utcnow())
+    )
+
+
+def parse_since(value):
+    """
+    Parse the `since` parameter, either an ISO 8601 timestamp or unix seconds.
+    Returns a naive UTC datetime (matching the stored columns) or None.
+    """
+    if not value:
+        return None
+    try:
+        return datetime.utcfromtimestamp(float(value))
+    except ValueError:
+        pass
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
@@ -0,0 +1,139 @@
+import colorsys
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.exc import IntegrityError
+from server.extensions import db
+from server.models.mood_question_set import MoodQuestionSet, mood_question_deliveries
+from server.utils.aura_colors import parse_aura_colors
+from server.utils.aura_vectors import hex_to_rgb
+
+# The colors mood answers are tagged with double as the pool's color families
+MOOD_COLOR_FAMILIES = ('RED', 'ORANGE', 'YELLOW', 'GREEN', 'CYAN', 'BLUE', 'PURPLE')
+DEFAULT_COLOR_FAMILY = 'BLUE'
+
+# Upper hue bound (in degrees) of each family, going round the color wheel from red
+HUE_FAMILIES = (
+    (15, 'RED'), (45, 'ORANGE'), (70, 'YELLOW'), (165, 'GREEN'),
+    (200, 'CYAN'), (260, 'BLUE'), (345, 'PURPLE'), (360, 'RED')
+)
+
+# Question sets generated per family per day by `flask mood warm-pool`
+MOOD_POOL_SIZE = 3
+# Days of question sets (and delivery records) kept before pruning
+MOOD_POOL_RETENTION_DAYS = 7
+# Concurrent OpenAI calls while warming the pool
+MOOD_POOL_WARM_WORKERS = 4
+
+
+def aura_color_family(aura_color):
+    """Bucket an aura (gradient, hex color or mood color name) into one of MOOD_COLOR_FAMILIES"""
+    if not aura_color:
+        return DEFAULT_COLOR_FAMILY
+    if aura_color.upper() in MOOD_COLOR_FAMILIES:
+        return aura_color.upper()
+
+    colors = parse_aura_colors(aura_color)
+    if not colors:
+        return DEFAULT_COLOR_FAMILY
+    hue, lightness, saturation = colorsys.rgb_to_hls(*hex_to_rgb(colors[0]))
+    if saturation < 0.15:
+        # Greys have no meaningful hue
+        return DEFAULT_COLOR_FAMILY
+
+    degrees = hue * 360
+    for bound, family in HUE_FAMILIES:
+        if degrees < bound:
+            return family
+    return 'RED'
+
+
+def take_pooled_questions(user_id, family, day=None):
+    """
+    Serve a pooled question set for `day` that this user hasn't seen yet and
+    record the delivery. Returns the questions, or None if the pool has
+    nothing new for them.
+    """
+    day = day or date.today()
+    for _ in range(2):
+        query = MoodQuestionSet.query.filter_by(day=day, color_family=family)
+        if user_id:
+            seen = select(mood_question_deliveries.c.question_set_id).where(
+                mood_question_deliveries.c.user_id == user_id
+            )
+            query = query.filter(MoodQuestionSet.id.not_in(seen))
+        question_set = query.order_by(func.random()).first()
+        if question_set is None:
+            return None
+        try:
+            _record_delivery(user_id, question_set.id)
+            db.session.commit()
+            return question_set.questions
+        except IntegrityError:
+            # A concurrent request just handed this user the same set; pick another
+            db.session.rollback()
+    return None
+
+
+def add_pooled_questions(family, questions, day=None, user_id=None):
+    """Store a freshly generated set in the pool, optionally as already served to `user_id`"""
+    question_set = MoodQuestionSet(
+        day=day or date.today(),
+        color_family=family,
+        questions_json=json.dumps(questions)
+    )
+    db.session.add(question_set)
+    db.session.flush()
+    _record_delivery(user_id, question_set.id)
+    db.session.commit()
+    return question_set
+
+
+def _record_delivery(user_id, question_set_id):
+    if user_id:
+        db.session.execute(insert(mood_question_deliveries).values(
+            user_id=user_id, question_set_id=question_set_id
+        ))
+
+
+def warm_mood_pool(generate, day=None, size=MOOD_POOL_SIZE, families=MOOD_COLOR_FAMILIES):
+    """
+    Top up each color family's pool for `day` to `size` question sets using
+    `generate(family)`, then prune sets past the retention window.
+    Returns the number of sets generated.
+    """
+    day = day or date.today()
+    counts = dict(
+        db.session.query(MoodQuestionSet.color_family, func.count(MoodQuestionSet.id))
+        .filter(MoodQuestionSet.day == day)
+        .group_by(MoodQuestionSet.color_family)
+    )
+    wanted = [family for family in families for _ in range(size - counts.get(family, 0))]
+
+    generated = 0
+    # OpenAI calls run concurrently; the database writes stay on this thread
+    with ThreadPoolExecutor(max_workers=MOOD_POOL_WARM_WORKERS) as pool:
+        futures = [(family, pool.submit(generate, family)) for family in wanted]
+        for family, future in futures:
+            try:
+                questions = future.result()
+            except Exception as e:
+                print(f"  Could not generate {family} questions: {e}")
+                continue
+            add_pooled_questions(family, questions, day=day)
+            generated += 1
+            print(f"  Generated {family} question set ({generated}/{len(wanted)})")
+
+    prune_mood_pool(day - timedelta(days=MOOD_POOL_RETENTION_DAYS))
+    return generated
+
+
+def prune_mood_pool(before):
+    """Delete question sets older than `before`, along with their delivery records"""
+    old_sets = select(MoodQuestionSet.id).where(MoodQuestionSet.day < before)
+    db.session.execute(
+        delete(mood_question_deliveries).where(mood_question_deliveries.c.question_set_id.in_(old_sets))
+    )
+    db.session.execute(delete(MoodQuestionSet).where(MoodQuestionSet.day < before))
+    db.session.commit()
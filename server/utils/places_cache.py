@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+# Only these Places statuses describe the place itself; anything else
+# (OVER_QUERY_LIMIT, REQUEST_DENIED, ...) is transient and must be retried
+CACHEABLE_STATUSES = ('OK', 'ZERO_RESULTS')
+
+
+class PlacesCache:
+    """
+    On-disk cache of Google Places responses, shared by the seeder and the
+    API. Entries live in a single SQLite file, keyed by a hash of the
+    endpoint and its parameters (the API key excluded) and stored as
+    zlib-compressed JSON. Search results and place details expire separately.
+    """
+
+    def __init__(self, path, search_ttl=86400, details_ttl=604800):
+        self.path = path
+        self.ttls = {'search': search_ttl, 'details': details_ttl}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # One connection shared by all threads; the lock serializes access
+        self.connection = sqlite3.connect(path, timeout=5, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS places_responses '
+            '(key TEXT PRIMARY KEY, expires_at REAL NOT NULL, body BLOB NOT NULL)'
+        )
+        self.connection.execute('DELETE FROM places_responses WHERE expires_at < ?', (time.time(),))
+        self.connection.commit()
+
+    @staticmethod
+    def make_key(endpoint, params):
+        params = {name: value for name, value in params.items() if name != 'key'}
+        raw = json.dumps([endpoint, params], sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def get(self, key):
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT body FROM places_responses WHERE key = ? AND expires_at >= ?',
+                (key, time.time())
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(zlib.decompress(row[0]))
+
+    def set(self, key, value, ttl):
+        body = zlib.compress(json.dumps(value).encode())
+        with self.lock:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO places_responses (key, expires_at, body) VALUES (?, ?, ?)',
+                (key, time.time() + ttl, body)
+            )
+            self.connection.commit()
+
+    def fetch(self, kind, endpoint, params, loader, cacheable=None):
+        """
+        Return the cached response for (endpoint, params), or call `loader()`
+        and store its result for the `kind` ('search' or 'details') TTL.
+        """
+        key = self.make_key(endpoint, params)
+        cached = self.get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        self.misses += 1
+        value = loader()
+        if value is not None and (cacheable is None or cacheable(value)):
+            self.set(key, value, self.ttls[kind])
+        return value
+
+    def clear(self):
+        with self.lock:
+            self.connection.execute('DELETE FROM places_responses')
+            self.connection.commit()
+
+
+# Active cache, set up by init_places_cache(); None means caching is off
+places_cache = None
+
+
+def init_places_cache(app):
+    global places_cache
+
+    if not app.config.get('PLACES_CACHE_ENABLED', True):
+        places_cache = None
+        return
+    # Every app in the process shares one cache file
+    if places_cache is not None and places_cache.path == app.config['PLACES_CACHE_PATH']:
+        return
+    places_cache = PlacesCache(
+        app.config['PLACES_CACHE_PATH'],
+        search_ttl=app.config.get('PLACES_CACHE_SEARCH_TTL', 86400),
+        details_ttl=app.config.get('PLACES_CACHE_DETAILS_TTL', 604800)
+    )
+
+
+def cached_places_call(kind, endpoint, params, loader, cacheable=None):
+    """Run a Places request through the cache, if one is configured"""
+    if places_cache is None:
+        return loader()
+    return places_cache.fetch(kind, endpoint, params, loader, cacheable)
+
+
+def places_response_cacheable(data):
+    """For raw web service JSON, which reports errors in `status`"""
+    return isinstance(data, dict) and data.get('status') in CACHEABLE_STATUSES
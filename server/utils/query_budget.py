@@ -0,0 +1,60 @@
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Maximum number of SQL statements each endpoint may issue for one GET request.
+# Keys are Flask endpoint names (Flask-RESTful uses the lowercased Resource name).
+QUERY_BUDGETS = {
+    'locationlist': 2,              # locations + selectin tags
+    'locationbyid': 2,              # location + lazy tags fallback
+    'locationchanges': 3,           # changed locations, selectin tags, tombstones
+    'discoverlocations': 5,         # optional user, index build, aura vectors, locations + selectin tags
+    'personalizedsuggestions': 4,   # user, aura index build, locations + selectin tags
+    'usercollections': 3,           # user, collections, selectin locations
+    'collectionbyid': 3,            # collection(s), selectin locations + tags
+    'singlecollection': 3,          # collection, selectin locations + tags
+    'fetchnearbylocations': 7,      # known places + tags, insert locations, tag lookup + insert, links + coordinate updates
+}
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    # Index housekeeping (see server/utils/index_generation.py) isn't the endpoint's doing
+    if context is not None and context.execution_options.get('query_budget_exempt'):
+        return
+    if has_request_context() and 'query_count' in g:
+        g.query_count += 1
+
+
+def init_query_budget(app):
+    """
+    Count SQL statements per request when QUERY_BUDGET_ENABLED is set.
+
+    The count is returned in an X-Query-Count header so a test harness can
+    assert on it. Going over the endpoint's budget logs a warning, or fails
+    the request with a 500 when QUERY_BUDGET_STRICT is also set.
+    """
+    if not app.config.get('QUERY_BUDGET_ENABLED'):
+        return
+
+    @app.before_request
+    def start_query_count():
+        g.query_count = 0
+
+    @app.after_request
+    def check_query_budget(response):
+        count = g.pop('query_count', None)
+        if count is None:
+            return response
+
+        response.headers['X-Query-Count'] = str(count)
+        # Budgets cover reads; writes on the same endpoint are just counted
+        budget = QUERY_BUDGETS.get(request.endpoint) if request.method == 'GET' else None
+        if budget is not None and count > budget:
+            print(f"QUERY BUDGET EXCEEDED: {request.endpoint} issued {count} queries (budget {budget})")
+            if app.config.get('QUERY_BUDGET_STRICT'):
+                response = app.response_class(
+                    '{"error": "Query budget exceeded"}\n', status=500, mimetype='application/json'
+                )
+                response.headers['X-Query-Count'] = str(count)
+        return response
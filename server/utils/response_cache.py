@@ -0,0 +1,224 @@
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from functools import wraps
+from flask import Response, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from server.utils.etag import version_etag
+
+# Writes to these tables also change what is served for the listed tables.
+# Collection membership and tag changes only mark the Collection, Location or
+# Tag dirty, and review writes update the denormalized aggregates on
+# locations with a plain UPDATE (see server/utils/review_stats.py) that the
+# session never sees.
+RELATED_TABLES = {
+    'collections': ('collection_locations',),
+    'locations': ('location_tags',),
+    'tags': ('location_tags',),
+    'reviews': ('locations',),
+}
+
+REDIS_KEY_PREFIX = 'ora:response-cache:'
+
+
+class MemoryResponseCache:
+    """In-process LRU of serialized responses, with per-table version counters"""
+
+    def __init__(self, max_entries=1024, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> (expires_at, value)
+        self.table_versions = {}
+        # Versions restart at zero with the process, so ETags need a per-process epoch
+        self.epoch = uuid.uuid4().hex
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def versions(self, tables):
+        with self.lock:
+            return [self.table_versions.get(table, 0) for table in tables]
+
+    def bump(self, tables):
+        with self.lock:
+            for table in tables:
+                self.table_versions[table] = self.table_versions.get(table, 0) + 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.table_versions.clear()
+
+
+class RedisResponseCache:
+    """
+    Same interface backed by a local Redis (or compatible) server, so several
+    worker processes share entries and invalidations. Requires the optional
+    `redis` package.
+    """
+
+    def __init__(self, url, ttl=300):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        # Shared by every worker so they hand out the same ETags
+        epoch_key = REDIS_KEY_PREFIX + 'epoch'
+        self.client.set(epoch_key, uuid.uuid4().hex, nx=True)
+        self.epoch = self.client.get(epoch_key).decode()
+
+    def get(self, key):
+        raw = self.client.get(REDIS_KEY_PREFIX + key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key, value):
+        self.client.set(REDIS_KEY_PREFIX + key, json.dumps(value), ex=self.ttl)
+
+    def versions(self, tables):
+        values = self.client.mget([f'{REDIS_KEY_PREFIX}version:{table}' for table in tables])
+        return [int(value) if value is not None else 0 for value in values]
+
+    def bump(self, tables):
+        pipeline = self.client.pipeline()
+        for table in tables:
+            pipeline.incr(f'{REDIS_KEY_PREFIX}version:{table}')
+        pipeline.execute()
+
+    def clear(self):
+        for key in self.client.scan_iter(REDIS_KEY_PREFIX + '*'):
+            self.client.delete(key)
+
+
+# Active backend, set up by init_response_cache(); None means caching is off
+response_cache = None
+
+
+def init_response_cache(app):
+    """
+    Pick the response cache backend from RESPONSE_CACHE_BACKEND:
+    'memory' (default), 'redis' or 'none'.
+    """
+    global response_cache
+
+    backend = app.config.get('RESPONSE_CACHE_BACKEND', 'memory')
+    ttl = app.config.get('RESPONSE_CACHE_TTL', 300)
+
+    if backend == 'none':
+        response_cache = None
+        return
+
+    if backend == 'redis':
+        try:
+            response_cache = RedisResponseCache(app.config.get('RESPONSE_CACHE_REDIS_URL'), ttl=ttl)
+            print("Response cache using Redis")
+            return
+        except ImportError:
+            print("Warning: redis package not installed, falling back to the in-process response cache")
+
+    response_cache = MemoryResponseCache(
+        max_entries=app.config.get('RESPONSE_CACHE_MAX_ENTRIES', 1024), ttl=ttl
+    )
+
+
+def cached_response(*tables):
+    """
+    Cache a Resource method's successful response, keyed by endpoint, URL
+    arguments and query string. The key also carries the current version of
+    each table in `tables`, so a commit touching any of them makes the old
+    entry unreachable. The same key doubles as the response's ETag, so an
+    If-None-Match hit is answered with a 304 without running the method.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(*args, **kwargs):
+            cache = response_cache
+            if cache is None:
+                return method(*args, **kwargs)
+
+            versions = cache.versions(tables)
+            key = '|'.join([
+                request.endpoint or '',
+                json.dumps(kwargs, sort_keys=True, default=str),
+                json.dumps(sorted(request.args.items(multi=True))),
+                '.'.join(str(version) for version in versions)
+            ])
+
+            etag = version_etag(cache.epoch, key)
+            if request.if_none_match.contains(etag):
+                return Response(status=304, headers={'ETag': f'"{etag}"'})
+
+            cached = cache.get(key)
+            if cached is not None:
+                return cached, 200, {'X-Cache': 'HIT', 'ETag': f'"{etag}"'}
+
+            result = method(*args, **kwargs)
+            data, status = (result[0], result[1]) if isinstance(result, tuple) else (result, 200)
+            if status != 200:
+                return result
+            cache.set(key, data)
+            headers = dict(result[2]) if isinstance(result, tuple) and len(result) > 2 else {}
+            headers['ETag'] = f'"{etag}"'
+            return data, status, headers
+        return wrapper
+    return decorator
+
+
+# Table versions are only bumped once a transaction commits; a rolled back
+# write leaves cached responses alone
+@event.listens_for(Session, 'after_flush')
+def _collect_changed_tables(session, flush_context):
+    changed = session.info.setdefault('response_cache_tables', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        table = getattr(obj, '__tablename__', None)
+        if table:
+            changed.add(table)
+            changed.update(RELATED_TABLES.get(table, ()))
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _collect_bulk_changes(orm_execute_state):
+    # Bulk INSERT/UPDATE/DELETE statements (e.g. `flask aura materialize`) skip the flush.
+    # Core statements on association tables have no mapper, use the target table.
+    # Raw text() writes are invisible here and must not be used on cached tables.
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None:
+        table = mapper.local_table.name
+    else:
+        table = getattr(getattr(orm_execute_state.statement, 'table', None), 'name', None)
+    if table:
+        changed = orm_execute_state.session.info.setdefault('response_cache_tables', set())
+        changed.add(table)
+        changed.update(RELATED_TABLES.get(table, ()))
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_changed_tables(session):
+    changed = session.info.pop('response_cache_tables', None)
+    if changed and response_cache is not None:
+        response_cache.bump(sorted(changed))
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changed_tables(session):
+    session.info.pop('response_cache_tables', None)
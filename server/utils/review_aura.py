@@ -0,0 +1,275 @@
+"""
+Review-based aura scoring (VADER sentiment + vibe keywords).
+
+Used by the seeder and by `flask aura rescore`. Importing this module has no
+side effects beyond loading NLTK, so it is safe to use from pool workers.
+"""
+import random
+from functools import lru_cache
+import nltk
+from nltk.sentiment import SentimentIntensityAnalyzer
+
+
+@lru_cache(maxsize=1)
+def sentiment_analyzer():
+    """
+    One VADER analyzer per process, downloading its lexicon on first use if
+    needed. Returns None (and remembers it) if the lexicon can't be loaded.
+    """
+    try:
+        return SentimentIntensityAnalyzer()
+    except LookupError:
+        nltk.download('vader_lexicon', quiet=True)
+    try:
+        return SentimentIntensityAnalyzer()
+    except LookupError:
+        return None
+
+
+# Vibey keywords for different vibes
+VIBE_KEYWORDS = {
+    'energy': ['energetic', 'vibrant', 'lively', 'dynamic', 'exciting', 'buzzing', 'pulsating', 'upbeat', 'spirited', 'animated'],
+    'calmness': ['calm', 'peaceful', 'serene', 'tranquil', 'quiet', 'relaxing', 'soothing', 'mellow', 'gentle', 'soft'],
+    'warmth': ['warm', 'cozy', 'inviting', 'welcoming', 'friendly', 'comfortable', 'homely', 'intimate', 'pleasant', 'charming'],
+    'elegance': ['elegant', 'sophisticated', 'refined', 'classy', 'upscale', 'luxurious', 'chic', 'polished', 'premium', 'exclusive'],
+    'casual': ['casual', 'laid-back', 'relaxed', 'informal', 'easygoing', 'unpretentious', 'simple', 'natural', 'organic', 'balanced'],
+    'freshness': ['fresh', 'clean', 'crisp', 'modern', 'new', 'contemporary', 'innovative', 'light', 'airy', 'bright'],
+    'authenticity': ['authentic', 'genuine', 'real', 'original', 'traditional', 'classic', 'heritage', 'true', 'pure', 'natural']
+}
+
+
+# Base colors for gradients - expanded palette
+BASE_COLORS = {
+    'energy': ['#FF0000', '#FF5252', '#FF4081', '#FF6E40'],       # Reds
+    'calmness': ['#0000FF', '#2979FF', '#3D5AFE', '#448AFF'],     # Blues
+    'warmth': ['#FFA500', '#FF9800', '#FF6D00', '#FFAB40'],       # Oranges
+    'elegance': ['#800080', '#9C27B0', '#6A1B9A', '#AA00FF'],     # Purples
+    'casual': ['#00FF00', '#76FF03', '#64DD17', '#B2FF59'],       # Greens
+    'freshness': ['#00FFFF', '#18FFFF', '#00E5FF', '#84FFFF'],    # Cyans
+    'authenticity': ['#FFD700', '#FFAB00', '#FFC400', '#FFD740']  # Golds
+}
+
+
+def analyze_reviews(reviews):
+    """Analyze reviews using simple keyword matching to determine aura properties"""
+    try:
+        # If no reviews, return default values
+        if not reviews:
+            print("No reviews found, using default vibe scores")
+            return {
+                'energy': 0.5, 'calmness': 0.5, 'warmth': 0.5, 
+                'elegance': 0.5, 'casual': 0.5, 'freshness': 0.5,
+                'authenticity': 0.5
+            }
+        
+        # Shared per process; loading the VADER lexicon is the slow part
+        sia = sentiment_analyzer()
+        if sia is None:
+            raise LookupError('NLTK vader_lexicon is not available')
+        
+        # Initialize category scores
+        category_scores = {
+            'energy': 0.5, 'calmness': 0.5, 'warmth': 0.5, 
+            'elegance': 0.5, 'casual': 0.5, 'freshness': 0.5,
+            'authenticity': 0.5
+        }
+        
+        # Process each review
+        for review_text in reviews:
+            # Skip empty reviews
+            if not review_text:
+                continue
+            
+            # Get sentiment score
+            sentiment = sia.polarity_scores(review_text)
+            sentiment_multiplier = 0.5 + sentiment['compound'] * 0.5  # Range from 0 to 1
+            
+            # Simple keyword matching for properties
+            lower_text = review_text.lower()
+            
+            # Energy-related keywords
+            energy_keywords = ['energetic', 'vibrant', 'lively', 'dynamic', 'exciting', 'buzzing', 'pulsating']
+            energy_matches = sum(lower_text.count(keyword) for keyword in energy_keywords)
+            category_scores['energy'] += 0.1 * energy_matches * sentiment_multiplier
+            
+            # Calmness-related keywords
+            calm_keywords = ['calm', 'peaceful', 'serene', 'tranquil', 'quiet', 'relaxing', 'soothing']
+            calm_matches = sum(lower_text.count(keyword) for keyword in calm_keywords)
+            category_scores['calmness'] += 0.1 * calm_matches * sentiment_multiplier
+            
+            # Warmth-related keywords
+            warm_keywords = ['warm', 'cozy', 'inviting', 'welcoming', 'friendly', 'comfortable', 'homely']
+            warm_matches = sum(lower_text.count(keyword) for keyword in warm_keywords)
+            category_scores['warmth'] += 0.1 * warm_matches * sentiment_multiplier
+            
+            # Elegance-related keywords
+            elegant_keywords = ['elegant', 'sophisticated', 'refined', 'classy', 'upscale', 'luxurious', 'chic']
+            elegant_matches = sum(lower_text.count(keyword) for keyword in elegant_keywords)
+            category_scores['elegance'] += 0.1 * elegant_matches * sentiment_multiplier
+            
+            # Casual-related keywords
+            casual_keywords = ['casual', 'laid-back', 'relaxed', 'informal', 'easygoing', 'unpretentious', 'simple']
+            casual_matches = sum(lower_text.count(keyword) for keyword in casual_keywords)
+            category_scores['casual'] += 0.1 * casual_matches * sentiment_multiplier
+            
+            # Freshness-related keywords
+            fresh_keywords = ['fresh', 'clean', 'crisp', 'modern', 'new', 'contemporary', 'innovative']
+            fresh_matches = sum(lower_text.count(keyword) for keyword in fresh_keywords)
+            category_scores['freshness'] += 0.1 * fresh_matches * sentiment_multiplier
+            
+            # Authenticity-related keywords
+            authentic_keywords = ['authentic', 'genuine', 'real', 'original', 'traditional', 'classic', 'heritage']
+            authentic_matches = sum(lower_text.count(keyword) for keyword in authentic_keywords)
+            category_scores['authenticity'] += 0.1 * authentic_matches * sentiment_multiplier
+        
+        # Normalize scores
+        max_score = max(category_scores.values())
+        if max_score > 1.0:
+            for category in category_scores:
+                category_scores[category] /= max_score
+        
+        return category_scores
+    except Exception as e:
+        print(f"Error in analyze_reviews: {e}")
+        # Return safe default values
+        return {
+            'energy': 0.5, 'calmness': 0.5, 'warmth': 0.5, 
+            'elegance': 0.5, 'casual': 0.5, 'freshness': 0.5,
+            'authenticity': 0.5
+        }
+
+def generate_gradient(scores):
+    """Generate three distinct colors based on review analysis scores"""
+    try:
+        # If no scores, use default colors
+        if not scores or sum(scores.values()) == 0:
+            return {
+                'aura_color1': '#7B1FA2',  # Purple
+                'aura_color2': '#2196F3',  # Blue
+                'aura_color3': '#FF5722'   # Orange
+            }
+        
+        # Get top 3 categories by score
+        top_categories = sorted(scores.items(), key=lambda x: x[1], reverse=True)[:3]
+        
+        # Map categories to their corresponding colors
+        colors = []
+        for category, score in top_categories:
+            if category in BASE_COLORS:
+                # Use the color that matches the intensity of the score
+                color_index = min(int(score * len(BASE_COLORS[category])), len(BASE_COLORS[category]) - 1)
+                colors.append(BASE_COLORS[category][color_index])
+            else:
+                # If category not found, use a random color from any category
+                random_category = random.choice(list(BASE_COLORS.keys()))
+                colors.append(random.choice(BASE_COLORS[random_category]))
+        
+        # Ensure we have exactly 3 colors
+        while len(colors) < 3:
+            random_category = random.choice(list(BASE_COLORS.keys()))
+            colors.append(random.choice(BASE_COLORS[random_category]))
+        
+        return {
+            'aura_color1': colors[0],
+            'aura_color2': colors[1],
+            'aura_color3': colors[2]
+        }
+    except Exception as e:
+        print(f"Error in generate_gradient: {e}")
+        # Return safe default colors
+        return {
+            'aura_color1': '#7B1FA2',  # Purple
+            'aura_color2': '#2196F3',  # Blue
+            'aura_color3': '#FF5722'   # Orange
+        }
+
+def determine_vibe_type(vibe_scores):
+    """Determine the overall vibe type based on scores"""
+    try:
+        # Filter to only include valid vibe types
+        valid_scores = {k: v for k, v in vibe_scores.items() if k in VIBE_KEYWORDS}
+        
+        # Handle empty dictionary case
+        if not valid_scores:
+            return 'casual'  # Default to casual if no valid scores
+            
+        # Return the vibe with the highest score
+        vibe_type = max(valid_scores.items(), key=lambda x: x[1])[0]
+        return vibe_type
+    except Exception as e:
+        print(f"Error in determine_vibe_type: {e}")
+        return 'casual'  # Default to casual on error
+
+def determine_shape(rating):
+    """Determine aura shape based on rating"""
+    try:
+        if rating <= 2.0:
+            return "soft"  # Low energy, more relaxed
+        elif rating <= 3.0:
+            return "pulse"  # Moderate energy, steady
+        elif rating <= 4.0:
+            return "flowing"  # High energy, dynamic
+        else:
+            return "sparkle"  # Exceptional energy, vibrant
+    except Exception as e:
+        print(f"Error in determine_shape: {e}")
+        return "flowing"  # Default shape
+
+
+def create_aura(review_texts, avg_rating):
+    """Create an aura based on reviews and rating"""
+    try:
+        # Analyze reviews to get vibe scores
+        vibe_scores = analyze_reviews(review_texts)
+        
+        # Generate three colors based on vibe scores
+        colors = generate_gradient(vibe_scores)
+        
+        # Determine shape based on rating
+        shape = determine_shape(avg_rating)
+        
+        # Determine the dominant vibe type
+        vibe_type = determine_vibe_type(vibe_scores)
+        
+        # Get keywords for the dominant vibe
+        keywords = VIBE_KEYWORDS.get(vibe_type, [])
+        if not keywords:
+            # If no keywords found, use the vibe type itself
+            aura_name = f"{vibe_type.capitalize()} Aura"
+        else:
+            # Use a random keyword from the vibe's keywords
+            aura_name = f"{vibe_type.capitalize()} {random.choice(keywords).capitalize()} Aura"
+        
+        return {
+            'name': aura_name,
+            'aura_color1': colors['aura_color1'],
+            'aura_color2': colors['aura_color2'],
+            'aura_color3': colors['aura_color3'],
+            'shape': shape
+        }
+    except Exception as e:
+        print(f"Error in create_aura: {e}")
+        # Return default aura with casual vibe
+        return {
+            'name': 'Casual Relaxed Aura',
+            'aura_color1': '#7B1FA2',  # Purple
+            'aura_color2': '#2196F3',  # Blue
+            'aura_color3': '#FF5722',  # Orange
+            'shape': 'flowing'
+        }
+
+
+def review_aura_gradient(aura):
+    """CSS gradient for an aura returned by create_aura"""
+    return f"linear-gradient(45deg, {aura['aura_color1']}, {aura['aura_color2']}, {aura['aura_color3']})"
+
+
+def score_location_chunk(chunk):
+    """
+    Pool worker for `flask aura rescore`: takes [(location_id, review_texts, rating), ...]
+    and returns [(location_id, aura), ...].
+    """
+    return [
+        (location_id, create_aura(review_texts, rating or 0))
+        for location_id, review_texts, rating in chunk
+    ]
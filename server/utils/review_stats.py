@@ -0,0 +1,83 @@
+from datetime import datetime
+from sqlalchemy import event, func, inspect, select, update
+from server.extensions import db
+from server.models.location import Location
+from server.models.review import Review
+
+locations_table = Location.__table__
+reviews_table = Review.__table__
+
+
+def _apply_review_delta(connection, location_id, count_delta, rating_delta):
+    """
+    Shift a location's review_count by `count_delta` and its rating total by
+    `rating_delta` in one UPDATE. The right-hand sides all see the old row
+    values, so the new mean is derived from the old mean and count.
+    """
+    if not location_id:
+        return
+    old_count = func.coalesce(locations_table.c.review_count, 0)
+    old_total = func.coalesce(locations_table.c.avg_user_rating, 0) * old_count
+    new_count = old_count + count_delta
+    connection.execute(
+        update(locations_table)
+        .where(locations_table.c.id == location_id)
+        .values(
+            review_count=new_count,
+            # Divide as a float; an empty location goes back to NULL
+            avg_user_rating=(old_total + rating_delta) / func.nullif(new_count * 1.0, 0),
+            # Bump updated_at so delta-sync clients pick up the new aggregates
+            updated_at=datetime.utcnow()
+        )
+    )
+
+
+@event.listens_for(Review, 'after_insert')
+def _review_created(mapper, connection, target):
+    _apply_review_delta(connection, target.location_id, 1, target.rating or 0)
+
+
+@event.listens_for(Review, 'after_update')
+def _review_updated(mapper, connection, target):
+    state = inspect(target)
+    location_history = state.attrs.location_id.history
+    rating_history = state.attrs.rating.history
+    if not location_history.has_changes() and not rating_history.has_changes():
+        return
+
+    old_location_id = location_history.deleted[0] if location_history.deleted else target.location_id
+    old_rating = rating_history.deleted[0] if rating_history.deleted else target.rating
+
+    if old_location_id == target.location_id:
+        _apply_review_delta(connection, target.location_id, 0, (target.rating or 0) - (old_rating or 0))
+    else:
+        # Review moved between locations
+        _apply_review_delta(connection, old_location_id, -1, -(old_rating or 0))
+        _apply_review_delta(connection, target.location_id, 1, target.rating or 0)
+
+
+@event.listens_for(Review, 'after_delete')
+def _review_deleted(mapper, connection, target):
+    _apply_review_delta(connection, target.location_id, -1, -(target.rating or 0))
+
+
+def backfill_review_stats():
+    """
+    Recompute review_count and avg_user_rating for every location from the
+    reviews table in a single UPDATE. Returns the number of rows touched.
+    """
+    review_count = (
+        select(func.count(reviews_table.c.id))
+        .where(reviews_table.c.location_id == locations_table.c.id)
+        .scalar_subquery()
+    )
+    avg_rating = (
+        select(func.avg(reviews_table.c.rating))
+        .where(reviews_table.c.location_id == locations_table.c.id)
+        .scalar_subquery()
+    )
+    result = db.session.execute(
+        update(locations_table).values(review_count=review_count, avg_user_rating=avg_rating)
+    )
+    db.session.commit()
+    return result.rowcount
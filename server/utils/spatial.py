@@ -0,0 +1,218 @@
+import math
+import threading
+import numpy as np
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from server.extensions import db
+from server.models.location import Location
+from server.utils.distance import EARTH_RADIUS_M, CoordinateArray, within_radius
+from server.utils.index_generation import GenerationWatch
+
+# Grid cell size in degrees (~1.1km of latitude), small enough that a 5km
+# discover radius only touches a few dozen cells
+GRID_CELL_DEGREES = 0.01
+
+
+def bounding_box(latitude, longitude, radius):
+    """
+    Return (min_lat, max_lat, min_lng, max_lng) for the box enclosing a circle
+    of `radius` meters around the given point. Used as an indexable SQL prefilter.
+    """
+    lat_delta = math.degrees(radius / EARTH_RADIUS_M)
+    # Longitude degrees shrink towards the poles; clamp cos so we never divide by zero
+    cos_lat = max(math.cos(math.radians(latitude)), 1e-6)
+    lng_delta = math.degrees(radius / (EARTH_RADIUS_M * cos_lat))
+    return (
+        max(latitude - lat_delta, -90.0),
+        min(latitude + lat_delta, 90.0),
+        max(longitude - lng_delta, -180.0),
+        min(longitude + lng_delta, 180.0)
+    )
+
+
+class GridIndex:
+    """
+    In-process uniform grid over location coordinates.
+
+    Coordinates live in contiguous float64 arrays addressed by slot; each grid
+    cell only stores slot numbers. A radius query gathers the slots of the
+    cells overlapping the query's bounding box and filters them with one
+    vectorized haversine pass, so the cost tracks the number of nearby points
+    instead of the size of the locations table.
+    """
+
+    def __init__(self, cell_degrees=GRID_CELL_DEGREES):
+        self.cell_degrees = cell_degrees
+        self.lock = threading.RLock()
+        self.clear()
+
+    def _cell(self, latitude, longitude):
+        return (int(math.floor(latitude / self.cell_degrees)),
+                int(math.floor(longitude / self.cell_degrees)))
+
+    def __len__(self):
+        return len(self.slots)
+
+    def clear(self):
+        with self.lock:
+            self.cells = {}     # (x, y) -> set of slots
+            self.slots = {}     # location_id -> slot
+            self.free = []      # slots released by removals
+            self.ids = np.zeros(0, dtype=np.int64)
+            self.lats = np.zeros(0, dtype=np.float64)
+            self.lngs = np.zeros(0, dtype=np.float64)
+            self.size = 0
+
+    def _allocate(self):
+        if self.free:
+            return self.free.pop()
+        if self.size == len(self.ids):
+            # Grow geometrically so bulk loads stay amortized O(1) per insert
+            capacity = max(64, len(self.ids) * 2)
+            self.ids = np.resize(self.ids, capacity)
+            self.lats = np.resize(self.lats, capacity)
+            self.lngs = np.resize(self.lngs, capacity)
+        slot = self.size
+        self.size += 1
+        return slot
+
+    def load(self, rows):
+        """Replace the index contents with (id, latitude, longitude) rows"""
+        coords = CoordinateArray.from_rows(rows)
+        with self.lock:
+            self.clear()
+            self.ids, self.lats, self.lngs = coords.ids, coords.lats, coords.lngs
+            self.size = len(coords)
+            xs = np.floor(self.lats / self.cell_degrees).astype(np.int64).tolist()
+            ys = np.floor(self.lngs / self.cell_degrees).astype(np.int64).tolist()
+            for slot, location_id in enumerate(self.ids.tolist()):
+                self.slots[location_id] = slot
+                self.cells.setdefault((xs[slot], ys[slot]), set()).add(slot)
+
+    def insert(self, location_id, latitude, longitude):
+        """Add or move a point"""
+        with self.lock:
+            self.remove(location_id)
+            slot = self._allocate()
+            self.ids[slot] = location_id
+            self.lats[slot] = latitude
+            self.lngs[slot] = longitude
+            self.slots[location_id] = slot
+            self.cells.setdefault(self._cell(latitude, longitude), set()).add(slot)
+
+    def remove(self, location_id):
+        with self.lock:
+            slot = self.slots.pop(location_id, None)
+            if slot is None:
+                return
+            cell = self._cell(self.lats[slot], self.lngs[slot])
+            bucket = self.cells.get(cell)
+            if bucket is not None:
+                bucket.discard(slot)
+                if not bucket:
+                    del self.cells[cell]
+            self.free.append(slot)
+
+    def query_radius(self, latitude, longitude, radius):
+        """Return {location_id: distance_in_meters} for every point within `radius` meters"""
+        min_lat, max_lat, min_lng, max_lng = bounding_box(latitude, longitude, radius)
+        min_x, min_y = self._cell(min_lat, min_lng)
+        max_x, max_y = self._cell(max_lat, max_lng)
+
+        with self.lock:
+            candidates = []
+            for x in range(min_x, max_x + 1):
+                for y in range(min_y, max_y + 1):
+                    bucket = self.cells.get((x, y))
+                    if bucket:
+                        candidates.extend(bucket)
+            if not candidates:
+                return {}
+
+            candidates = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+            positions, distances = within_radius(
+                latitude, longitude, self.lats[candidates], self.lngs[candidates], radius
+            )
+            ids = self.ids[candidates[positions]]
+        return dict(zip(ids.tolist(), distances.tolist()))
+
+
+class LocationIndex(GridIndex):
+    """
+    Grid index over the locations table, built lazily on first use and kept in
+    sync with committed Location inserts, updates and deletes. Writes made by
+    other processes (CLI commands, the seeder) bump the 'locations'
+    generation, which triggers a rebuild.
+    """
+
+    def __init__(self, cell_degrees=GRID_CELL_DEGREES):
+        super().__init__(cell_degrees)
+        self.loaded = False
+        self.generation = GenerationWatch('locations')
+
+    def ensure_loaded(self):
+        if self.loaded and self.generation.stale():
+            print("Locations changed in another process, rebuilding the spatial index")
+            self.invalidate()
+        if self.loaded:
+            return
+        with self.lock:
+            if self.loaded:
+                return
+            self.generation.mark()
+            # Only pull the three columns we need, no ORM object hydration
+            rows = db.session.query(Location.id, Location.latitude, Location.longitude).all()
+            self.load(rows)
+            self.loaded = True
+            print(f"Spatial index built with {len(rows)} locations")
+
+    def invalidate(self):
+        """Drop the index so the next query rebuilds it from the database"""
+        with self.lock:
+            self.clear()
+            self.loaded = False
+
+    def query_radius(self, latitude, longitude, radius):
+        self.ensure_loaded()
+        return super().query_radius(latitude, longitude, radius)
+
+
+location_index = LocationIndex()
+
+
+# Keep the index in step with the database. Changes are collected at flush
+# time and only applied once the transaction commits, so rolled back writes
+# never leak into the index.
+@event.listens_for(Session, 'after_flush')
+def _collect_location_changes(session, flush_context):
+    pending = session.info.setdefault('spatial_index_changes', {})
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Location) and obj.id is not None:
+            pending[obj.id] = (obj.latitude, obj.longitude)
+    for obj in session.deleted:
+        if isinstance(obj, Location) and obj.id is not None:
+            pending[obj.id] = None
+
+
+def record_inserted_locations(session, locations):
+    """Queue locations written with a bulk INSERT ... RETURNING, which skip session.new"""
+    pending = session.info.setdefault('spatial_index_changes', {})
+    for location in locations:
+        pending[location.id] = (location.latitude, location.longitude)
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_location_changes(session):
+    pending = session.info.pop('spatial_index_changes', None)
+    if not pending or not location_index.loaded:
+        return
+    for location_id, coords in pending.items():
+        if coords is None:
+            location_index.remove(location_id)
+        else:
+            location_index.insert(location_id, *coords)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_location_changes(session):
+    session.info.pop('spatial_index_changes', None)
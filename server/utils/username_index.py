@@ -0,0 +1,189 @@
+import threading
+from bisect import bisect_left, bisect_right, insort
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from server.extensions import db
+from server.models.user import User
+from server.utils.index_generation import GenerationWatch
+
+# Usernames added or renamed since the substring text was built, searched
+# directly until there are enough of them to rebuild it
+REBUILD_THRESHOLD = 256
+
+
+class UsernameIndex:
+    """
+    Case-insensitive username search.
+
+    `keys` holds (lowercased username, user id) pairs in sorted order, so
+    every username starting with the query sits in one contiguous range
+    found by bisection. Usernames that only contain the query are found by
+    str.find over `text`, every key joined by newlines. Substring search
+    runs in C rather than one comparison per user. The text is rebuilt
+    lazily; names written since then are kept in a small overlay
+    (`pending`, `removed`) like the aura index.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.loaded = False
+        # Bumped when users are written outside the app, e.g. by the seeder
+        self.generation = GenerationWatch('users')
+        self.clear()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def clear(self):
+        with self.lock:
+            self.keys = []       # sorted (lowercased username, user id)
+            self.names = {}      # user id -> lowercased username
+            self.text = ''
+            self.text_starts = []
+            self.text_ids = []
+            self.pending = {}    # user id -> lowercased username, not yet in `text`
+            self.removed = set() # user ids whose entry in `text` is stale
+
+    def build(self, users):
+        """Replace the index contents with (user id, username) pairs"""
+        with self.lock:
+            self.clear()
+            self.names = {user_id: username.lower() for user_id, username in users}
+            self.keys = sorted((name, user_id) for user_id, name in self.names.items())
+            self._build_text()
+
+    def _build_text(self):
+        starts = []
+        offset = 0
+        for name, _ in self.keys:
+            starts.append(offset)
+            offset += len(name) + 1
+        self.text = '\n'.join(name for name, _ in self.keys)
+        self.text_starts = starts
+        self.text_ids = [user_id for _, user_id in self.keys]
+        self.pending = {}
+        self.removed = set()
+
+    def ensure_loaded(self):
+        if self.loaded and self.generation.stale():
+            print("Users changed in another process, rebuilding the username index")
+            self.invalidate()
+        if self.loaded:
+            return
+        with self.lock:
+            if self.loaded:
+                return
+            self.generation.mark()
+            rows = db.session.execute(select(User.id, User.username)).all()
+            self.build(rows)
+            self.loaded = True
+            print(f"Username index built with {len(rows)} users")
+
+    def invalidate(self):
+        """Drop the index so the next search rebuilds it from the database"""
+        with self.lock:
+            self.clear()
+            self.loaded = False
+
+    def upsert(self, user_id, username):
+        with self.lock:
+            self.remove(user_id)
+            name = username.lower()
+            self.names[user_id] = name
+            insort(self.keys, (name, user_id))
+            self.pending[user_id] = name
+            self._maybe_rebuild()
+
+    def remove(self, user_id):
+        with self.lock:
+            name = self.names.pop(user_id, None)
+            if name is None:
+                return
+            position = bisect_left(self.keys, (name, user_id))
+            del self.keys[position]
+            self.pending.pop(user_id, None)
+            self.removed.add(user_id)
+            self._maybe_rebuild()
+
+    def _maybe_rebuild(self):
+        if len(self.pending) + len(self.removed) > REBUILD_THRESHOLD:
+            self._build_text()
+
+    def search(self, query, limit=20):
+        """
+        Ids of users whose username contains `query`, ignoring case. An
+        exact match comes first, then usernames starting with the query,
+        then the rest, each group in alphabetical order.
+        """
+        query = query.lower()
+        if not query or '\n' in query:
+            return []
+        self.ensure_loaded()
+
+        with self.lock:
+            # Exact and prefix matches: one contiguous run of the sorted keys
+            results = []
+            position = bisect_left(self.keys, (query,))
+            while position < len(self.keys) and len(results) < limit:
+                name, user_id = self.keys[position]
+                if not name.startswith(query):
+                    break
+                results.append(user_id)
+                position += 1
+            if len(results) >= limit:
+                return results
+
+            # Other substring matches, alphabetically. Hits in `text` come out
+            # in key order, so the first `limit` live ones are enough.
+            wanted = limit - len(results)
+            matches = []
+            offset = self.text.find(query)
+            while offset != -1 and len(matches) < wanted:
+                row = bisect_right(self.text_starts, offset) - 1
+                user_id = self.text_ids[row]
+                if offset != self.text_starts[row] and user_id not in self.removed:
+                    matches.append((self.names[user_id], user_id))
+                # Continue from the next username; one hit per user is enough
+                next_row = row + 1
+                if next_row == len(self.text_starts):
+                    break
+                offset = self.text.find(query, self.text_starts[next_row])
+            for user_id, name in self.pending.items():
+                if query in name and not name.startswith(query):
+                    matches.append((name, user_id))
+
+        matches.sort()
+        return results + [user_id for _, user_id in matches[:wanted]]
+
+
+username_index = UsernameIndex()
+
+
+# Same flush/commit/rollback bookkeeping as the aura index, so only
+# committed usernames become searchable
+@event.listens_for(Session, 'after_flush')
+def _collect_username_changes(session, flush_context):
+    pending = session.info.setdefault('username_index_changes', {})
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, User) and obj.id is not None and obj.username:
+            pending[obj.id] = obj.username
+    for obj in session.deleted:
+        if isinstance(obj, User) and obj.id is not None:
+            pending[obj.id] = None
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_username_changes(session):
+    pending = session.info.pop('username_index_changes', None)
+    if not pending or not username_index.loaded:
+        return
+    for user_id, username in pending.items():
+        if username is None:
+            username_index.remove(user_id)
+        elif username_index.names.get(user_id) != username.lower():
+            username_index.upsert(user_id, username)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_username_changes(session):
+    session.info.pop('username_index_changes', None)
@@ -0,0 +1,71 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('GOOGLE_MAPS_API_KEY', 'AIzaTestKey')
+
+from server.app import create_app
+from server.config import Config
+from server.extensions import db
+from server.models.location import Location
+from server.models.user import User
+from server.utils.aura_index import aura_index
+from server.utils.friend_graph import friend_graph
+from server.utils.spatial import location_index
+from server.utils.username_index import username_index
+
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    # Flask-RESTful's Api is module-global, so there is one app per test run.
+    # A file database (rather than sqlite://) lets threads use their own connections.
+    db_path = tmp_path_factory.mktemp('db') / 'test.db'
+
+    class TestConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{db_path}'
+        SQLALCHEMY_ENGINE_OPTIONS = {'connect_args': {'timeout': 30}}
+        QUERY_BUDGET_ENABLED = True
+        QUERY_BUDGET_STRICT = True
+        RESPONSE_CACHE_BACKEND = 'none'
+        PLACES_CACHE_ENABLED = False
+        BACKGROUND_JOB_WORKERS = 2
+
+    return create_app(TestConfig)
+
+
+@pytest.fixture(autouse=True)
+def database(app):
+    """Fresh tables and empty in-memory indexes for every test"""
+    with app.app_context():
+        db.create_all()
+    for index in (location_index, aura_index, username_index, friend_graph):
+        index.invalidate()
+    yield
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def make_user(username='alice', **columns):
+    user = User(username=username, email=f'{username}@example.com', **columns)
+    user.set_password('password')
+    db.session.add(user)
+    db.session.flush()
+    return user
+
+
+def make_location(name='Cafe One', latitude=40.75, longitude=-73.98, **columns):
+    columns.setdefault('place_type', 'cafe')
+    columns.setdefault('rating', 4.2)
+    location = Location(name=name, latitude=latitude, longitude=longitude, **columns)
+    db.session.add(location)
+    db.session.flush()
+    return location
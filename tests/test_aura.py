@@ -0,0 +1,47 @@
+from conftest import make_location, make_user
+
+from server.extensions import db
+from server.models.location import Location
+from server.models.review import Review
+from server.utils import review_aura
+from server.utils.aura import iter_rescore_chunks, rescore_auras
+from server.utils.index_generation import read_generation
+
+RESCORED = {
+    'name': 'Serene Calm', 'shape': 'flowing',
+    'aura_color1': '#33A1FF', 'aura_color2': '#A1FF33', 'aura_color3': '#FFFFFF',
+}
+
+
+def reviewed_locations_before_backfill():
+    """Two reviewed locations and one without reviews, review_count still zero"""
+    user = make_user()
+    reviewed = [make_location('Reviewed One'), make_location('Reviewed Two')]
+    make_location('Unreviewed')
+    for location in reviewed:
+        db.session.add(Review(body='Quiet place to read.', rating=4, user_id=user.id, location_id=location.id))
+    db.session.commit()
+    db.session.query(Location).update({Location.review_count: 0})
+    db.session.commit()
+    return [location.id for location in reviewed]
+
+
+def test_rescore_chunks_select_locations_with_reviews(app):
+    with app.app_context():
+        reviewed_ids = reviewed_locations_before_backfill()
+        chunks = list(iter_rescore_chunks(chunk_size=1))
+        assert [location_id for chunk in chunks for location_id, _, _ in chunk] == reviewed_ids
+        assert chunks[0][0][1] == ['Quiet place to read.']
+
+
+def test_rescore_signals_other_processes(app, monkeypatch):
+    monkeypatch.setattr(review_aura, 'score_location_chunk', lambda chunk: [
+        (location_id, dict(RESCORED)) for location_id, _, _ in chunk
+    ])
+    with app.app_context():
+        reviewed_ids = reviewed_locations_before_backfill()
+        before = read_generation('locations')
+        assert rescore_auras(chunk_size=1, workers=1) == 2
+        assert read_generation('locations') == before + 1
+        db.session.expire_all()
+        assert {location.aura_shape for location in Location.query.filter(Location.id.in_(reviewed_ids))} == {'flowing'}
@@ -0,0 +1,35 @@
+from conftest import make_location, make_user
+
+from server.extensions import db
+from server.routes import discover_routes
+
+QUERY = '/api/discover/locations?latitude=40.75&longitude=-73.98&radius=5000'
+
+
+def populate(app, count=8):
+    with app.app_context():
+        user = make_user(aura_color1='#FF5733', aura_color2='#FFC300', aura_color3='#DAF7A6', aura_shape='sparkling')
+        for i in range(count):
+            make_location(
+                f'Place {i}', latitude=40.75 + i * 0.001, longitude=-73.98,
+                aura_color1='#FF5733', aura_color2='#33A1FF', aura_color3='#DAF7A6', aura_shape='flowing'
+            )
+        db.session.commit()
+        return user.id
+
+
+def test_distance_results_are_closest_first(app, client):
+    populate(app)
+    results = client.get(f'{QUERY}&limit=3').get_json()
+    assert [location['name'] for location in results] == ['Place 0', 'Place 1', 'Place 2']
+
+
+def test_limit_is_clamped(app, client, monkeypatch):
+    user_id = populate(app)
+    monkeypatch.setattr(discover_routes, 'MAX_DISCOVER_RESULTS', 5)
+    for suffix in ('', f'&user_id={user_id}'):
+        # Zero and negative limits used to return nothing or drop the farthest rows
+        assert len(client.get(f'{QUERY}&limit=0{suffix}').get_json()) == 1
+        assert len(client.get(f'{QUERY}&limit=-3{suffix}').get_json()) == 1
+        assert len(client.get(f'{QUERY}&limit=100000{suffix}').get_json()) == 5
+        assert len(client.get(f'{QUERY}{suffix}').get_json()) == 5
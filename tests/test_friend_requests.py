@@ -0,0 +1,61 @@
+import random
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from conftest import make_user
+
+from server.extensions import db
+from server.models.friend_request import FriendRequest
+
+
+def make_users(app, count):
+    with app.app_context():
+        ids = [make_user(f'user{i}').id for i in range(count)]
+        db.session.commit()
+        return ids
+
+
+def submit_all(app, submissions, threads=8):
+    """POST every (sender, receiver) pair from a pool of threads, one test client each"""
+    def submit(pair):
+        response = app.test_client().post('/api/friend_requests', json={'sender_id': pair[0], 'receiver_id': pair[1]})
+        return response.status_code, response.get_json(), response.headers.get('X-Query-Count')
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        return list(pool.map(submit, submissions))
+
+
+def pending_counts(app):
+    """(sender, receiver) -> number of pending requests"""
+    with app.app_context():
+        return Counter(
+            db.session.query(FriendRequest.sender_id, FriendRequest.receiver_id)
+            .filter(FriendRequest.status == 'pending')
+            .all()
+        )
+
+
+def test_racing_duplicate_requests_leave_one_pending_row(app):
+    ids = make_users(app, 11)
+    pairs = [(ids[0], receiver_id) for receiver_id in ids[1:]]
+    submissions = pairs * 8
+    random.Random(7).shuffle(submissions)
+
+    results = submit_all(app, submissions)
+
+    created = [result for result in results if result[0] == 201]
+    rejected = [result for result in results if result[0] != 201]
+    assert len(created) == len(pairs)
+    assert all(status == 400 and body == {'error': 'Friend request already sent'} for status, body, _ in rejected)
+    assert pending_counts(app) == {pair: 1 for pair in pairs}
+
+
+def test_each_request_is_one_statement(app):
+    ids = make_users(app, 9)
+    pairs = [(sender, receiver) for sender in ids for receiver in ids if sender != receiver]
+
+    results = submit_all(app, pairs)
+
+    assert [status for status, _, _ in results] == [201] * len(pairs)
+    assert {count for _, _, count in results} == {'1'}
+    assert sum(pending_counts(app).values()) == len(pairs)
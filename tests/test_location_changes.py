@@ -0,0 +1,103 @@
+from datetime import datetime, timedelta
+
+from conftest import make_location
+
+from server.extensions import db
+from server.models.location import Location
+from server.models.location_tombstone import LocationTombstone
+from server.routes.location_routes import CHANGES_SAFETY_LAG
+from server.utils.location_changes import parse_since
+
+
+def test_changes_include_inserts_and_deletes(app, client):
+    with app.app_context():
+        kept = make_location('Kept')
+        dropped = make_location('Dropped')
+        db.session.commit()
+        kept_id, dropped_id = kept.id, dropped.id
+        db.session.delete(db.session.get(Location, dropped_id))
+        db.session.commit()
+
+    body = client.get('/api/locations/changes?since=0').get_json()
+    assert [location['id'] for location in body['locations']] == [kept_id]
+    assert body['deleted'] == [dropped_id]
+
+
+def test_next_since_trails_now_by_the_safety_lag(app, client):
+    before = datetime.utcnow()
+    body = client.get('/api/locations/changes?since=0').get_json()
+    next_since = parse_since(body['next_since'])
+    assert before - CHANGES_SAFETY_LAG <= next_since <= datetime.utcnow() - CHANGES_SAFETY_LAG
+
+
+def test_rows_committed_after_a_poll_with_earlier_stamps_are_not_missed(app, client):
+    next_since = client.get('/api/locations/changes?since=0').get_json()['next_since']
+
+    # A transaction that flushed before the poll but committed after it
+    with app.app_context():
+        location = make_location('Slow writer')
+        location.updated_at = datetime.utcnow() - timedelta(seconds=30)
+        db.session.commit()
+        slow_id = location.id
+
+    body = client.get(f'/api/locations/changes?since={next_since}').get_json()
+    assert slow_id in [location['id'] for location in body['locations']]
+
+
+def test_next_since_never_moves_backwards(app, client):
+    since = (datetime.utcnow() + timedelta(minutes=5)).isoformat()
+    body = client.get(f'/api/locations/changes?since={since}').get_json()
+    assert parse_since(body['next_since']) == parse_since(since)
+
+
+def test_pages_through_more_rows_than_the_limit(app, client):
+    stamp = datetime.utcnow() - timedelta(hours=1)
+    with app.app_context():
+        ids = []
+        for i in range(8):
+            location = make_location(f'Place {i}')
+            # Pairs share a timestamp, so pages have to break ties on id
+            location.updated_at = stamp + timedelta(seconds=i // 2)
+            ids.append(location.id)
+        db.session.commit()
+        for location_id in ids[:5]:
+            db.session.delete(db.session.get(Location, location_id))
+        db.session.commit()
+        # Backdate the tombstones too, so every row is older than the safety horizon
+        db.session.query(LocationTombstone).update({LocationTombstone.deleted_at: stamp})
+        db.session.commit()
+        remaining = ids[5:]
+
+    served, deleted, pages = [], [], 0
+    query = 'since=0&after_id=0'
+    while True:
+        body = client.get(f'/api/locations/changes?{query}&limit=2').get_json()
+        pages += 1
+        assert len(body['locations']) <= 2 and len(body['deleted']) <= 2
+        served += [location['id'] for location in body['locations']]
+        deleted += body['deleted']
+        query = f"since={body['next_since']}&after_id={body['after_id']}"
+        if not body['has_more']:
+            break
+
+    assert served == remaining
+    assert sorted(set(deleted)) == ids[:5]
+    assert pages >= 3
+
+    # Caught up: the cursor rests at the safety horizon
+    assert parse_since(body['next_since']) <= datetime.utcnow() - CHANGES_SAFETY_LAG
+
+
+def test_a_full_page_inside_the_safety_window_is_not_skipped(app, client):
+    with app.app_context():
+        ids = [make_location(f'Place {i}').id for i in range(3)]
+        db.session.commit()
+
+    first = client.get('/api/locations/changes?since=0&limit=2').get_json()
+    assert [location['id'] for location in first['locations']] == ids[:2]
+    # The rows are newer than the horizon, so the cursor doesn't jump past them
+    assert first['has_more'] is False
+    second = client.get(
+        f"/api/locations/changes?since={first['next_since']}&after_id={first['after_id']}&limit=5"
+    ).get_json()
+    assert [location['id'] for location in second['locations']] == ids
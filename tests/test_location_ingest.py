@@ -0,0 +1,32 @@
+from conftest import make_location
+from test_query_budgets import FakePlacesResponse, nearby_payload
+
+from server.extensions import db
+from server.models.location import Location
+from server.routes import location_routes
+from server.utils.aura_index import aura_index
+from server.utils.aura_vectors import decode_aura_vectors
+from server.utils.spatial import location_index
+
+
+def test_ingested_places_reach_the_in_memory_indexes(app, client, monkeypatch):
+    with app.app_context():
+        make_location('Already here', google_place_id='place-0')
+        db.session.commit()
+        # Loaded before the ingest, so only the commit hooks can add the new place
+        aura_index.ensure_loaded()
+        location_index.ensure_loaded()
+    assert len(aura_index) == len(location_index) == 1
+
+    monkeypatch.setattr(location_routes, 'GOOGLE_PLACES_API_KEY', 'test-key')
+    monkeypatch.delenv('FLASK_ENV', raising=False)
+    monkeypatch.setattr(location_routes.requests, 'get', lambda *args, **kwargs: FakePlacesResponse(nearby_payload(0, 2)))
+    response = client.get('/api/fetch-nearby-locations?latitude=40.75&longitude=-73.98')
+    assert response.status_code == 200
+
+    with app.app_context():
+        new_location = Location.query.filter_by(google_place_id='place-1').one()
+        vector = decode_aura_vectors([new_location.aura_vector])[0]
+        assert new_location.id in [location_id for location_id, _ in aura_index.query(vector, k=2)]
+        assert new_location.id in location_index.query_radius(new_location.latitude, new_location.longitude, 10)
+    assert len(aura_index) == len(location_index) == 2
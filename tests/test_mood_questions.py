@@ -0,0 +1,108 @@
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from conftest import make_user
+
+from server.extensions import db
+from server.routes.openai import openai_routes
+
+QUESTIONS = [
+    {'question': f'Question {i}?', 'options': [
+        {'text': 'Calm', 'color': 'BLUE'}, {'text': 'Bright', 'color': 'YELLOW'}, {'text': 'Bold', 'color': 'RED'},
+    ]}
+    for i in range(6)
+]
+
+
+class StubOpenAI:
+    """
+    Stands in for openai.OpenAI. The first `failures` completions raise;
+    each call waits for `release` so a test can see the job in flight.
+    """
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.calls = 0
+        self.release = threading.Event()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, messages, **kwargs):
+        assert self.release.wait(5)
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise ConnectionError('stubbed OpenAI outage')
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=json.dumps(QUESTIONS)))])
+
+
+@pytest.fixture
+def openai_stub(monkeypatch):
+    def install(stub):
+        monkeypatch.setattr(openai_routes, 'client', stub)
+        # Skip the retry backoff without touching the global time module
+        monkeypatch.setattr(openai_routes, 'time', SimpleNamespace(sleep=lambda seconds: None, monotonic=time.monotonic))
+        return stub
+    return install
+
+
+def submit_job(app, client):
+    with app.app_context():
+        user_id = make_user().id
+        db.session.commit()
+    response = client.post(f'/api/users/{user_id}/daily-mood/questions', json={'mode': 'job'})
+    assert response.status_code == 202
+    body = response.get_json()
+    assert body['status'] == 'pending'
+    return user_id, body['status_url']
+
+
+def poll_until_finished(client, status_url, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        response = client.get(status_url)
+        if response.status_code != 202:
+            return response
+        threading.Event().wait(0.01)
+    raise AssertionError(f'{status_url} still pending after {timeout}s')
+
+
+def test_job_submit_poll_result(app, client, openai_stub):
+    stub = openai_stub(StubOpenAI())
+    user_id, status_url = submit_job(app, client)
+
+    # Held in the stub, so the job is still queued or running
+    assert client.get(status_url).status_code == 202
+    stub.release.set()
+
+    response = poll_until_finished(client, status_url)
+    assert response.status_code == 200
+    assert response.get_json()['questions'] == QUESTIONS
+    assert stub.calls == 1
+
+    # Another user can't read the job
+    assert client.get(status_url.replace(f'/users/{user_id}/', f'/users/{user_id + 1}/')).status_code == 404
+
+
+def test_job_retries_transient_failures(app, client, openai_stub):
+    stub = openai_stub(StubOpenAI(failures=2))
+    stub.release.set()
+    _, status_url = submit_job(app, client)
+
+    response = poll_until_finished(client, status_url)
+    assert response.status_code == 200
+    assert stub.calls == 3
+
+
+def test_job_failure_is_reported(app, client, openai_stub):
+    stub = openai_stub(StubOpenAI(failures=3))
+    stub.release.set()
+    _, status_url = submit_job(app, client)
+
+    response = poll_until_finished(client, status_url)
+    assert response.status_code == 500
+    body = response.get_json()
+    assert body['status'] == 'error'
+    assert 'stubbed OpenAI outage' in body['message']
+    assert stub.calls == 3
@@ -0,0 +1,165 @@
+"""
+Every endpoint in QUERY_BUDGETS, called with QUERY_BUDGET_STRICT on. Going
+over budget turns the response into a 500, and X-Query-Count must stay
+within the endpoint's budget.
+"""
+from conftest import make_location, make_user
+
+from server.extensions import db
+from server.models.collection import Collection
+from server.models.review import Review
+from server.models.tag import Tag
+from server.routes import location_routes
+from server.utils.query_budget import QUERY_BUDGETS
+
+AURA = {
+    'aura_name': 'Vibrant Energy',
+    'aura_color1': '#FF5733',
+    'aura_color2': '#FFC300',
+    'aura_color3': '#DAF7A6',
+    'aura_shape': 'sparkling',
+}
+
+
+def populate(app, locations=12):
+    """A user with an aura, tagged and reviewed locations, and two collections"""
+    with app.app_context():
+        user = make_user(
+            aura_color='linear-gradient(45deg, #FF5733, #FFC300, #DAF7A6)',
+            aura_shape='sparkling',
+            aura_color1='#FF5733', aura_color2='#FFC300', aura_color3='#DAF7A6'
+        )
+        tag = Tag(name='Vibrant Energy', color='#FF5733', shape='sparkling')
+        stored = []
+        for i in range(locations):
+            location = make_location(
+                name=f'Place {i}', latitude=40.75 + i * 0.001, longitude=-73.98 + i * 0.001,
+                google_place_id=f'place-{i}', **AURA
+            )
+            location.tags.append(tag)
+            stored.append(location)
+        db.session.flush()
+        for location in stored[:4]:
+            db.session.add(Review(body='Lovely spot for coffee.', rating=5, user_id=user.id, location_id=location.id))
+        favourites = Collection(name='Favourites', user_id=user.id, is_base=True)
+        favourites.locations = stored[:5]
+        later = Collection(name='Later', user_id=user.id, is_base=False)
+        later.locations = stored[5:8]
+        db.session.add_all([favourites, later])
+        db.session.commit()
+        return user.id, stored[0].id, favourites.id
+
+
+def assert_within_budget(response, endpoint):
+    assert response.status_code == 200, response.get_json()
+    count = int(response.headers['X-Query-Count'])
+    assert count <= QUERY_BUDGETS[endpoint], f'{endpoint} issued {count} queries'
+    return count
+
+
+def test_location_list(app, client):
+    populate(app)
+    assert_within_budget(client.get('/api/locations'), 'locationlist')
+    assert_within_budget(client.get('/api/locations?limit=5&fields=id,name'), 'locationlist')
+
+
+def test_location_by_id(app, client):
+    _, location_id, _ = populate(app)
+    assert_within_budget(client.get(f'/api/locations/{location_id}'), 'locationbyid')
+
+
+def test_location_changes(app, client):
+    populate(app)
+    response = client.get('/api/locations/changes?since=0')
+    assert_within_budget(response, 'locationchanges')
+    assert len(response.get_json()['locations']) == 12
+
+
+def test_discover_locations(app, client):
+    user_id, _, _ = populate(app)
+    query = '/api/discover/locations?latitude=40.755&longitude=-73.975&radius=3000'
+    # The first call also builds the spatial and aura indexes
+    assert_within_budget(client.get(query), 'discoverlocations')
+    assert_within_budget(client.get(f'{query}&user_id={user_id}&limit=5'), 'discoverlocations')
+    assert_within_budget(client.get(f'{query}&place_type=cafe'), 'discoverlocations')
+
+
+def test_personalized_suggestions(app, client):
+    user_id, _, _ = populate(app)
+    assert_within_budget(client.get(f'/api/discover/suggestions/{user_id}'), 'personalizedsuggestions')
+
+
+def test_user_collections(app, client):
+    user_id, _, _ = populate(app)
+    assert_within_budget(client.get(f'/api/discover/collections/{user_id}'), 'usercollections')
+
+
+def test_collection_by_id(app, client):
+    user_id, _, collection_id = populate(app)
+    assert_within_budget(client.get(f'/api/users/{user_id}/collections'), 'collectionbyid')
+    assert_within_budget(client.get(f'/api/users/{user_id}/collections/{collection_id}'), 'collectionbyid')
+
+
+def test_single_collection(app, client):
+    _, _, collection_id = populate(app)
+    assert_within_budget(client.get(f'/api/collections/{collection_id}'), 'singlecollection')
+
+
+class FakePlacesResponse:
+    status_code = 200
+
+    def __init__(self, payload):
+        self.payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+
+def nearby_payload(start, count):
+    return {
+        'status': 'OK',
+        'results': [
+            {
+                'place_id': f'place-{i}',
+                'name': f'Place {i}',
+                'geometry': {'location': {'lat': 40.75 + i * 0.001, 'lng': -73.98}},
+                'types': ['cafe'],
+                'rating': 4.0,
+                'vicinity': f'{i} Main St',
+            }
+            for i in range(start, start + count)
+        ],
+    }
+
+
+def test_fetch_nearby_locations(app, client, monkeypatch):
+    populate(app)
+    monkeypatch.setattr(location_routes, 'GOOGLE_PLACES_API_KEY', 'test-key')
+    monkeypatch.delenv('FLASK_ENV', raising=False)
+
+    # Half the page is already stored, half is new; the statement count must not grow with the page
+    for start, count in ((6, 20), (0, 60)):
+        payload = nearby_payload(start, count)
+        monkeypatch.setattr(location_routes.requests, 'get', lambda *args, **kwargs: FakePlacesResponse(payload))
+        response = client.get('/api/fetch-nearby-locations?latitude=40.75&longitude=-73.98')
+        assert_within_budget(response, 'fetchnearbylocations')
+        assert len(response.get_json()) == count
+
+
+def test_every_budget_is_covered():
+    tested = {
+        'locationlist', 'locationbyid', 'locationchanges', 'discoverlocations', 'personalizedsuggestions',
+        'usercollections', 'collectionbyid', 'singlecollection', 'fetchnearbylocations',
+    }
+    assert set(QUERY_BUDGETS) == tested
+
+
+def test_strict_mode_rejects_an_endpoint_over_budget(app, client, monkeypatch):
+    populate(app)
+    monkeypatch.setitem(QUERY_BUDGETS, 'locationlist', 0)
+    response = client.get('/api/locations')
+    assert response.status_code == 500
+    assert response.get_json() == {'error': 'Query budget exceeded'}
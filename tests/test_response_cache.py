@@ -0,0 +1,71 @@
+import pytest
+from sqlalchemy import insert
+from conftest import make_location, make_user
+
+from server.extensions import db
+from server.models.collection import Collection, collection_locations
+from server.models.location import Location
+from server.models.tag import Tag
+from server.utils import response_cache as response_cache_module
+from server.utils.response_cache import MemoryResponseCache
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = MemoryResponseCache()
+    monkeypatch.setattr(response_cache_module, 'response_cache', cache)
+    return cache
+
+
+def test_copying_a_collection_links_its_locations(app, client, cache):
+    with app.app_context():
+        owner = make_user('owner')
+        friend = make_user('friend')
+        collection = Collection(name='Favourites', user_id=owner.id)
+        collection.locations = [make_location('Corner Cafe')]
+        db.session.add(collection)
+        db.session.commit()
+        owner_id, friend_id, collection_id = owner.id, friend.id, collection.id
+
+    response = client.post(f'/api/users/{friend_id}/collections/copy', json={
+        'sourceUserId': owner_id, 'collectionId': collection_id,
+    })
+    assert response.status_code == 201, response.get_json()
+    copy_id = response.get_json()['id']
+    copied = client.get(f'/api/users/{friend_id}/collections/{copy_id}').get_json()
+    assert [location['name'] for location in copied['locations']] == ['Corner Cafe']
+
+
+def test_core_writes_bump_their_tables(app, cache):
+    with app.app_context():
+        user = make_user()
+        collection = Collection(name='Favourites', user_id=user.id)
+        db.session.add(collection)
+        db.session.commit()
+        collection_id = collection.id
+
+        before = cache.versions(['collections', 'collection_locations', 'locations'])
+        location_id = db.session.execute(
+            insert(Location).values(name='Corner Cafe', latitude=40.75, longitude=-73.98).returning(Location.id)
+        ).scalar_one()
+        db.session.execute(collection_locations.insert().values(collection_id=collection_id, location_id=location_id))
+        db.session.commit()
+        after = cache.versions(['collections', 'collection_locations', 'locations'])
+        assert after == [before[0], before[1] + 1, before[2] + 1]
+
+
+def test_tagging_a_location_bumps_location_tags(app, cache):
+    with app.app_context():
+        location = make_location('Corner Cafe')
+        tag = Tag(name='Calm', color='#33A1FF', shape='flowing')
+        db.session.add(tag)
+        db.session.commit()
+
+        before = cache.versions(['location_tags'])[0]
+        db.session.get(Location, location.id).tags.append(db.session.get(Tag, tag.id))
+        db.session.commit()
+        assert cache.versions(['location_tags'])[0] == before + 1
+
+        db.session.get(Tag, tag.id).locations.remove(db.session.get(Location, location.id))
+        db.session.commit()
+        assert cache.versions(['location_tags'])[0] == before + 2
@@ -0,0 +1,60 @@
+from conftest import make_location, make_user
+
+from server.extensions import db
+from server.models.location import Location
+
+
+def setup_ids(app):
+    with app.app_context():
+        user = make_user()
+        location = make_location('Corner Cafe')
+        db.session.commit()
+        return user.id, location.id
+
+
+def test_create_review_updates_location_stats(app, client):
+    user_id, location_id = setup_ids(app)
+    response = client.post('/api/reviews', json={
+        'body': 'Great espresso and friendly staff.', 'rating': 4,
+        'user_id': user_id, 'location_id': location_id,
+    })
+    assert response.status_code == 201
+    assert response.get_json()['rating'] == 4
+    with app.app_context():
+        location = db.session.get(Location, location_id)
+        assert location.review_count == 1
+        assert location.avg_user_rating == 4
+
+
+def test_create_review_without_rating_is_a_validation_error(app, client):
+    user_id, location_id = setup_ids(app)
+    response = client.post('/api/reviews', json={
+        'body': 'Great espresso and friendly staff.', 'user_id': user_id, 'location_id': location_id,
+    })
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Rating must be an integer'}
+
+
+def test_create_review_rejects_invalid_fields(app, client):
+    user_id, location_id = setup_ids(app)
+    response = client.post('/api/reviews', json={
+        'body': 'Great espresso and friendly staff.', 'rating': 9,
+        'user_id': user_id, 'location_id': location_id,
+    })
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Rating must be between 1 and 5'}
+
+    response = client.post('/api/reviews', json={'rating': 3, 'user_id': user_id, 'location_id': location_id})
+    assert response.status_code == 400
+    assert client.post('/api/reviews').status_code == 400
+
+
+def test_patch_review_rejects_invalid_rating(app, client):
+    user_id, location_id = setup_ids(app)
+    review = client.post('/api/reviews', json={
+        'body': 'Great espresso and friendly staff.', 'rating': 4,
+        'user_id': user_id, 'location_id': location_id,
+    }).get_json()
+    response = client.patch(f"/api/reviews/{review['id']}", json={'rating': 0})
+    assert response.status_code == 400
+    assert client.get(f"/api/reviews/{review['id']}").get_json()['rating'] == 4
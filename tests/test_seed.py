@@ -0,0 +1,179 @@
+import threading
+import time
+
+import pytest
+from conftest import make_user
+
+import server.seed as seed
+from server.extensions import db
+from server.models.location import Location
+from server.models.seed_checkpoint import SeedCheckpoint
+from server.utils.rate_limit import TokenBucket
+
+AREAS = seed.NYC_AREAS[:3]
+PLACE_TYPES = seed.PLACE_TYPES[:2]
+
+
+class FakeGmaps:
+    """
+    Stands in for googlemaps.Client. Every search returns a few places shared
+    by all searches plus its own; `failing` place ids raise on their first
+    details call, like a dropped connection.
+    """
+
+    def __init__(self, per_search=6, shared=2, failing=(), latency=0.005):
+        self.per_search = per_search
+        self.shared = shared
+        self.failing = set(failing)
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.searches = []
+        self.details = []
+        self.active = 0
+        self.max_active = 0
+
+    def _call(self):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.latency)
+        with self.lock:
+            self.active -= 1
+
+    def places_nearby(self, location, radius, type, language):
+        self._call()
+        with self.lock:
+            self.searches.append((location['lat'], type))
+        own = [f"{location['lat']}-{type}-{i}" for i in range(self.per_search - self.shared)]
+        return {'results': [{'place_id': place_id, 'name': place_id} for place_id in
+                            [f'shared-{i}' for i in range(self.shared)] + own]}
+
+    def place(self, place_id, fields):
+        self._call()
+        with self.lock:
+            self.details.append(place_id)
+            if place_id in self.failing:
+                self.failing.discard(place_id)
+                raise ConnectionError(f'connection reset fetching {place_id}')
+        offset = sum(map(ord, place_id)) % 100 / 1000
+        return {'result': {
+            'name': place_id,
+            'formatted_address': f'{place_id} Street',
+            'rating': 4.0,
+            'geometry': {'location': {'lat': 40.70 + offset, 'lng': -73.95 - offset}},
+            'reviews': [
+                {'text': f'Cozy and lively spot, visit number {i}', 'rating': 4 + i % 2}
+                for i in range(3)
+            ],
+        }}
+
+
+def search_count():
+    return len(AREAS) * len(PLACE_TYPES)
+
+
+def place_count(fake):
+    return fake.shared + search_count() * (fake.per_search - fake.shared)
+
+
+@pytest.fixture
+def fake_pipeline(monkeypatch):
+    def install(fake):
+        monkeypatch.setattr(seed, 'gmaps', fake)
+        monkeypatch.setattr(seed, 'NYC_AREAS', AREAS)
+        monkeypatch.setattr(seed, 'PLACE_TYPES', PLACE_TYPES)
+        monkeypatch.setattr(seed, 'WRITE_BATCH_SIZE', 5)
+        monkeypatch.setattr(seed, 'places_rate_limiter', TokenBucket(1000))
+        return fake
+    return install
+
+
+def test_seed_fetches_each_place_once_across_workers(app, fake_pipeline):
+    fake = fake_pipeline(FakeGmaps())
+    with app.app_context():
+        make_user()
+        db.session.commit()
+        seed.seed_database(workers=4)
+
+        assert fake.max_active > 1
+        assert len(fake.searches) == search_count()
+        assert sorted(fake.details) == sorted(set(fake.details))
+        assert Location.query.count() == place_count(fake)
+        assert SeedCheckpoint.query.count() == search_count()
+        assert all(location.review_count == 3 for location in Location.query)
+
+
+def test_failed_fetches_are_retried_by_the_next_run(app, fake_pipeline):
+    area, place_type = AREAS[1], PLACE_TYPES[0]
+    flaky = f"{area['center']['lat']}-{place_type}-0"
+    fake = fake_pipeline(FakeGmaps(failing=[flaky]))
+    with app.app_context():
+        seed.seed_database(workers=4)
+        checkpoints = set(db.session.query(SeedCheckpoint.area, SeedCheckpoint.place_type))
+        assert (area['name'], place_type) not in checkpoints
+        assert len(checkpoints) == search_count() - 1
+        assert Location.query.count() == place_count(fake) - 1
+
+        # The rerun repeats only the unfinished search and only fetches the missing place
+        rerun = fake_pipeline(FakeGmaps())
+        seed.seed_database(workers=4)
+        assert rerun.searches == [(area['center']['lat'], place_type)]
+        assert rerun.details == [flaky]
+        assert SeedCheckpoint.query.count() == search_count()
+        assert Location.query.count() == place_count(fake)
+
+
+def test_searches_in_a_failed_batch_are_not_checkpointed(app, fake_pipeline, monkeypatch):
+    fake = fake_pipeline(FakeGmaps())
+    upsert_locations = seed.upsert_locations
+    lost = []
+
+    def fail_first_batch(rows):
+        if not lost:
+            lost.extend((row['area'], row['place_type'], row['google_place_id']) for row in rows)
+            raise RuntimeError('database is locked')
+        upsert_locations(rows)
+
+    monkeypatch.setattr(seed, 'upsert_locations', fail_first_batch)
+    with app.app_context():
+        seed.seed_database(workers=4)
+
+        checkpoints = set(db.session.query(SeedCheckpoint.area, SeedCheckpoint.place_type))
+        stored = {place_id for (place_id,) in db.session.query(Location.google_place_id)}
+        assert lost
+        for area_name, place_type, place_id in lost:
+            # Either another search fetched the place again, or its search is left for a rerun
+            assert place_id in stored or (area_name, place_type) not in checkpoints
+
+        fake_pipeline(FakeGmaps())
+        seed.seed_database(workers=4)
+        assert SeedCheckpoint.query.count() == search_count()
+        assert Location.query.count() == place_count(fake)
+
+
+def test_token_bucket_limits_the_rate_across_threads():
+    bucket = TokenBucket(rate=100, capacity=5)
+    calls = 40
+
+    def worker():
+        for _ in range(calls // 8):
+            bucket.acquire()
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    # The burst is free, every call after it waits for a token
+    assert elapsed >= (calls - 5) / 100 * 0.9
+
+
+def test_token_bucket_allows_a_burst():
+    bucket = TokenBucket(rate=1, capacity=5)
+    started = time.monotonic()
+    for _ in range(5):
+        bucket.acquire()
+    assert time.monotonic() - started < 0.5